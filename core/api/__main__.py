@@ -0,0 +1,8 @@
+import uvicorn
+from core.api.server import create_app
+from core.configs import settings
+
+
+if __name__ == "__main__":
+    # Um único processo: as sessões do Selenium vivem na memória do CronosManager.
+    uvicorn.run(create_app(), host=settings.API_HOST, port=settings.API_PORT)
@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+from fastapi import Depends, FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect, WebSocketException
+from fastapi.requests import HTTPConnection
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from core.configs import settings
+from core.cronos.jobs import JobDispatcher, JobQueueFull, SendJob
+from core.utils.logger import log_info
+
+
+class SendRequest(BaseModel):
+    """
+    Corpo do pedido de envio.
+
+    Os anexos (image_path, audio_path, document_path) são nomes devolvidos por PUT /uploads/{name},
+    relativos a settings.UPLOAD_DIR; caminhos fora desse diretório são recusados.
+    """
+    target: str
+    non_contact: bool = False
+    text_message: str = ""
+    image_path: Optional[str] = None
+    audio_path: Optional[str] = None
+    document_path: Optional[str] = None
+    use_vpn: bool = False
+    priority: str = settings.DEFAULT_JOB_PRIORITY
+
+
+class LoginRequest(BaseModel):
+    """Corpo do pedido de login."""
+    use_vpn: bool = False
+
+
+def resolve_upload(name: Optional[str], upload_dir: Optional[Path] = None) -> Optional[str]:
+    """
+    Resolve o nome de um anexo dentro do diretório de uploads.
+
+    :param name: Nome (ou caminho relativo) do anexo em upload_dir.
+    :param upload_dir: Diretório de uploads. Se None, usa settings.UPLOAD_DIR.
+    :return: Caminho absoluto do anexo, ou None se name for vazio.
+    :raises HTTPException: 422 se o caminho sair de upload_dir ou se o arquivo não existir.
+    """
+    if not name:
+        return None
+    root = Path(upload_dir or settings.UPLOAD_DIR).resolve()
+    path = (root / name).resolve()
+    if root not in path.parents:
+        raise HTTPException(status_code=422, detail=f"Anexo fora do diretório de uploads: {name}")
+    if not path.is_file():
+        raise HTTPException(status_code=422, detail=f"Anexo não encontrado: {name}")
+    return str(path)
+
+
+def create_app(manager=None, dispatcher: Optional[JobDispatcher] = None, token: Optional[str] = None) -> FastAPI:
+    """
+    Cria a aplicação FastAPI do serviço de envio.
+
+    Os envios são aceitos com HTTP 202 e executados em segundo plano pelo dispatcher;
+    o status pode ser consultado por polling, SSE ou websocket. Todas as rotas exigem o
+    cabeçalho "Authorization: Bearer <token>".
+
+    :param manager: Instância de CronosManager. Se None, cria uma nova.
+    :param dispatcher: Dispatcher de jobs. Se None, cria um JobDispatcher sobre o manager.
+    :param token: Token de acesso. Se None, usa settings.API_TOKEN.
+    :return: Aplicação FastAPI.
+    :raises Exception: Se nenhum token estiver configurado.
+    """
+    token = token or settings.API_TOKEN
+    if not token:
+        raise Exception("Token da API não configurado (defina CRONOS_API_TOKEN).")
+    expected = f"Bearer {token}".encode("utf-8")
+
+    def require_token(connection: HTTPConnection) -> None:
+        header = connection.headers.get("authorization", "").encode("utf-8")
+        if hmac.compare_digest(header, expected):
+            return
+        if connection.scope["type"] == "websocket":
+            raise WebSocketException(code=1008)
+        raise HTTPException(status_code=401, detail="Token inválido ou ausente.",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+    if manager is None:
+        from core.cronos.manager import CronosManager
+        manager = CronosManager()
+    if dispatcher is None:
+        dispatcher = JobDispatcher(manager)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        log_info("Serviço HTTP do Cronos iniciado.", name="CronosAPI")
+        yield
+        dispatcher.stop()
+        manager.shutdown()
+        log_info("Serviço HTTP do Cronos encerrado.", name="CronosAPI")
+
+    app = FastAPI(title="Cronos", lifespan=lifespan, dependencies=[Depends(require_token)])
+    app.state.manager = manager
+    app.state.dispatcher = dispatcher
+
+    def _accept(job: SendJob) -> JSONResponse:
+        try:
+            dispatcher.submit(job)
+        except JobQueueFull as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        return JSONResponse(status_code=202, content={"job_id": job.id, "status": job.status})
+
+    def _get_job(job_id: str) -> SendJob:
+        job = dispatcher.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job não encontrado.")
+        return job
+
+    @app.put("/uploads/{name}", status_code=201)
+    async def upload(name: str, request: Request):
+        """
+        Recebe um anexo (corpo da requisição) e o grava em settings.UPLOAD_DIR.
+
+        O arquivo é nomeado pelo sha256 do conteúdo, mantendo a extensão de name; o nome
+        devolvido é o que deve ser usado em image_path/audio_path/document_path. O corpo é lido
+        de forma assíncrona; as escritas em disco rodam no threadpool para não travar o event loop.
+        """
+        suffix = Path(name).suffix.lower()
+        if not suffix[1:].isalnum():
+            suffix = ""
+        upload_dir = Path(settings.UPLOAD_DIR)
+        temporary = upload_dir / f".{uuid.uuid4().hex}.tmp"
+        digest, size = hashlib.sha256(), 0
+        file = await run_in_threadpool(open, temporary, "wb")
+        try:
+            try:
+                async for chunk in request.stream():
+                    size += len(chunk)
+                    if size > settings.API_UPLOAD_MAX_BYTES:
+                        raise HTTPException(status_code=413, detail="Anexo maior que o permitido.")
+                    digest.update(chunk)
+                    await run_in_threadpool(file.write, chunk)
+            finally:
+                await run_in_threadpool(file.close)
+            stored = digest.hexdigest() + suffix
+            await run_in_threadpool(os.replace, temporary, upload_dir / stored)
+        finally:
+            await run_in_threadpool(temporary.unlink, missing_ok=True)
+        return {"name": stored, "size": size}
+
+    @app.post("/sessions/{phone}/messages", status_code=202)
+    def send_message(phone: str, request: SendRequest):
+        """Aceita um envio para a sessão e retorna imediatamente o id do job."""
+        if request.priority not in settings.JOB_PRIORITIES:
+            raise HTTPException(status_code=422, detail=f"Prioridade inválida: {request.priority}")
+        job = SendJob(phone, kind="non_contact" if request.non_contact else "contact", target=request.target,
+                      text_message=request.text_message, image_path=resolve_upload(request.image_path),
+                      audio_path=resolve_upload(request.audio_path),
+                      document_path=resolve_upload(request.document_path),
+                      use_vpn=request.use_vpn, priority=request.priority)
+        return _accept(job)
+
+    @app.post("/sessions/{phone}/login", status_code=202)
+    def login(phone: str, request: Optional[LoginRequest] = None):
+        """Inicia (ou atualiza) o login da sessão; o resultado do job traz o status e o QR Code."""
+        return _accept(SendJob(phone, kind="login", use_vpn=request.use_vpn if request else False))
+
+    @app.get("/sessions/{phone}/qr")
+    def qr_code(phone: str):
+        """Retorna a última imagem de QR Code capturada para a sessão."""
+        qr_file = Path(settings.QR_CODE_DIR) / f"{phone}_qr_code.png"
+        if not qr_file.exists():
+            raise HTTPException(status_code=404, detail="QR Code não disponível.")
+        return FileResponse(qr_file, media_type="image/png")
+
+    @app.get("/sessions/{phone}")
+    def session_status(phone: str):
+        """Informa se a sessão está aberta e quantos jobs aguardam na sua fila."""
+        return {"phone": phone, "active": phone in manager.sessions, "queued": dispatcher.queue_size(phone)}
+
+    @app.get("/sessions/{phone}/timeouts")
+    def session_timeouts(phone: str):
+        """Latências observadas (p50/p99) e timeouts atuais da sessão, por etapa."""
+        return {"phone": phone, "steps": manager.timeout_metrics().get(phone, {})}
+
+    @app.get("/jobs/{job_id}")
+    def job_status(job_id: str):
+        """Consulta (polling) do status de um job."""
+        return _get_job(job_id).to_dict()
+
+    @app.get("/jobs/{job_id}/events")
+    async def job_events(job_id: str):
+        """Transmite as mudanças de status do job via Server-Sent Events."""
+        job = _get_job(job_id)
+
+        async def stream():
+            last = None
+            while True:
+                if job.status != last:
+                    last = job.status
+                    yield f"event: status\ndata: {json.dumps(job.to_dict())}\n\n"
+                if job.finished:
+                    return
+                await asyncio.sleep(settings.JOB_EVENTS_INTERVAL)
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.websocket("/jobs/{job_id}/ws")
+    async def job_websocket(websocket: WebSocket, job_id: str):
+        """Transmite as mudanças de status do job via websocket."""
+        await websocket.accept()
+        job = dispatcher.get(job_id)
+        if job is None:
+            await websocket.close(code=4404)
+            return
+        last = None
+        try:
+            while True:
+                if job.status != last:
+                    last = job.status
+                    await websocket.send_json(job.to_dict())
+                if job.finished:
+                    break
+                await asyncio.sleep(settings.JOB_EVENTS_INTERVAL)
+            await websocket.close()
+        except WebSocketDisconnect:
+            pass
+
+    return app
@@ -10,4 +10,77 @@ SEND_BUTTON = '//div[@aria-label="Enviar"]'
 NEW_CHAT_NEXT_BUTTON = '//button[@aria-label="Nova conversa"]'
 NEW_CHAT_PHONE_INPUT = '//div[@aria-label="Pesquisar nome ou número"]'
 QR_CODE = '//canvas[@aria-label="Scan this QR code to link a device!"]'
-LOGGED_IN = '//*[@id="side"]'
\ No newline at end of file
+LOGGED_IN = '//*[@id="side"]'
+PHONE_DISCONNECTED = '//*[contains(text(), "Celular não conectado") or contains(text(), "Phone not connected")]'
+UNREAD_BADGE = 'span[aria-label*="não lida"], span[aria-label*="unread"]'  # Seletor CSS (usado no observador de mensagens)
+AUDIO_INPUT = "//input[@type='file' and contains(@accept, 'audio')]"
+CHAT_PANE = '//div[@id="main"]'  # Painel da conversa aberta (destino dos anexos soltos via drop)
+
+# Cadeias de seletores: para cada elemento, localizadores alternativos em ordem de preferência (o
+# primeiro é o seletor acima). Todos são testados numa única chamada JS e o vencedor é lembrado por
+# sessão e idioma da interface (core/cronos/locators.py). Inclua aqui os seletores de outros idiomas.
+SELECTOR_CHAINS = {
+    "CAIXA_RESEARCH_CONTACT": [
+        CAIXA_RESEARCH_CONTACT,
+        '//div[@aria-label="Search input textbox"]',
+        '//div[@id="side"]//div[@contenteditable="true"]',
+    ],
+    "MESSAGE_TEXT_BOX": [
+        MESSAGE_TEXT_BOX,
+        '//div[@aria-label="Type a message"]',
+        '//footer//div[@contenteditable="true"]',
+    ],
+    "CONTACT_ROW": [
+        CONTACT_ROW,
+        "//div[@role='listitem' and .//span[@title='{contact_name}']]",
+        FIND_CONTACT,
+    ],
+    "ATTACH_BUTTON": [
+        ATTACH_BUTTON,
+        '//div[@title="Attach" or @title="Anexar"]',
+        '//span[@data-icon="plus" or @data-icon="clip"]/ancestor::*[self::button or @role="button"][1]',
+    ],
+    "DOCUMENT_INPUT": [
+        DOCUMENT_INPUT,
+        "//input[@type='file' and not(contains(@accept, 'image'))]",
+    ],
+    "IMAGE_INPUT": [
+        IMAGE_INPUT,
+        "//input[@type='file' and contains(@accept, 'video')]",
+    ],
+    "AUDIO_INPUT": [
+        AUDIO_INPUT,
+        DOCUMENT_INPUT,
+    ],
+    "SEND_BUTTON": [
+        SEND_BUTTON,
+        '//div[@aria-label="Send"]',
+        '//span[@data-icon="send"]/ancestor::*[self::button or @role="button"][1]',
+    ],
+    "NEW_CHAT_NEXT_BUTTON": [
+        NEW_CHAT_NEXT_BUTTON,
+        '//button[@aria-label="New chat"]',
+        '//div[@title="Nova conversa" or @title="New chat"]',
+    ],
+    "NEW_CHAT_PHONE_INPUT": [
+        NEW_CHAT_PHONE_INPUT,
+        '//div[@aria-label="Search name or number"]',
+    ],
+    "QR_CODE": [
+        QR_CODE,
+        '//canvas[contains(@aria-label, "QR")]',
+        '//div[@data-ref]//canvas',
+    ],
+    "CHAT_PANE": [
+        CHAT_PANE,
+        '//footer/parent::div',
+    ],
+    "LOGGED_IN": [
+        LOGGED_IN,
+        '//*[@id="pane-side"]',
+    ],
+    "PHONE_DISCONNECTED": [
+        PHONE_DISCONNECTED,
+        '//*[contains(text(), "Telefone não conectado") or contains(text(), "Computer not connected")]',
+    ],
+}
@@ -0,0 +1,274 @@
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+from core.configs import settings
+from core.cronos.jobs import JobQueueFull, SendJob
+from core.cronos.recipients import NumberSet, SuppressionIndex, normalize_e164
+from core.cronos.scheduler import SendScheduler
+from core.utils.logger import log_info, log_error
+
+
+class CampaignError(Exception):
+    """Levantada quando a lista ou o checkpoint da campanha não podem ser usados."""
+
+
+class CampaignItem:
+    """Uma linha da lista de destinatários ao longo do pipeline (leitura, validação, texto, envio)."""
+
+    __slots__ = ("offset", "row", "record", "target", "text", "error")
+
+    def __init__(self, offset: int, row: int, record: Optional[Dict[str, Any]] = None,
+                 error: Optional[str] = None) -> None:
+        self.offset = offset  # Posição (bytes) do arquivo logo após esta linha
+        self.row = row        # Número da linha de dados (a partir de 1, sem o cabeçalho)
+        self.record = record
+        self.target: Optional[str] = None
+        self.text: Optional[str] = None
+        self.error = error
+
+
+def _csv_lines(handle) -> Iterator[Tuple[int, str]]:
+    """Registros CSV completos (campos entre aspas podem conter quebras de linha)."""
+    buffer = b""
+    for line in iter(handle.readline, b""):
+        buffer += line
+        if buffer.count(b'"') % 2:
+            continue
+        yield handle.tell(), buffer.decode("utf-8")
+        buffer = b""
+    if buffer:
+        yield handle.tell(), buffer.decode("utf-8")
+
+
+def read_recipients(path: str, offset: int = 0, row: int = 0) -> Iterator[CampaignItem]:
+    """
+    Lê a lista de destinatários em fluxo, uma linha por vez, a partir da posição informada.
+
+    :param path: Arquivo .csv (com cabeçalho) ou .jsonl/.ndjson (um objeto JSON por linha).
+    :param offset: Posição (bytes) onde retomar; 0 lê desde o início.
+    :param row: Número da última linha já processada (para numerar as seguintes).
+    :return: Gerador de CampaignItem; linhas inválidas vêm com error preenchido.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix not in (".csv", ".jsonl", ".ndjson"):
+        raise CampaignError(f"Formato de lista não suportado: {suffix}")
+    if offset > os.path.getsize(path):
+        raise CampaignError(f"Checkpoint além do fim do arquivo {path}; a lista foi alterada?")
+    with open(path, "rb") as handle:
+        if suffix == ".csv":
+            header = next(csv.reader([handle.readline().decode("utf-8-sig")]), [])
+            header = [name.strip() for name in header]
+            if offset > handle.tell():
+                handle.seek(offset)
+            lines = _csv_lines(handle)
+        else:
+            handle.seek(offset)
+            lines = ((handle.tell(), line.decode("utf-8")) for line in iter(handle.readline, b""))
+        for end, text in lines:
+            if not text.strip():
+                continue
+            row += 1
+            try:
+                if suffix == ".csv":
+                    values = next(csv.reader(text.splitlines(keepends=True)))
+                    record = dict(zip(header, values))
+                else:
+                    record = json.loads(text)
+                    if not isinstance(record, dict):
+                        raise ValueError("a linha não é um objeto JSON")
+                yield CampaignItem(end, row, record)
+            except Exception as e:
+                yield CampaignItem(end, row, error=f"linha inválida: {e}")
+
+
+def validate_recipients(items: Iterator[CampaignItem], phone_field: str = "phone",
+                        suppression: Optional[SuppressionIndex] = None,
+                        seen: Optional[NumberSet] = None) -> Iterator[CampaignItem]:
+    """
+    Normaliza o número de destino de cada linha para E.164 e rejeita, antes de qualquer acesso ao
+    navegador, os números inválidos, repetidos na campanha (se seen for informado) e descadastrados.
+    O destino do job é o número E.164 sem o "+" (ex.: "5532988967108").
+    """
+    for item in items:
+        if item.error is None:
+            e164 = normalize_e164(item.record.get(phone_field))
+            if e164 is None:
+                item.error = f"número inválido em '{phone_field}': {item.record.get(phone_field)!r}"
+            elif suppression is not None and e164 in suppression:
+                item.error = f"número descadastrado: {e164}"
+            elif seen is not None and not seen.add(e164):
+                item.error = f"número repetido na campanha: {e164}"
+            else:
+                item.target = e164[1:]
+        yield item
+
+
+def render_messages(items: Iterator[CampaignItem], template: str) -> Iterator[CampaignItem]:
+    """Monta o texto de cada destinatário a partir do modelo (ex.: "Olá {nome}")."""
+    for item in items:
+        if item.error is None:
+            try:
+                item.text = template.format_map(item.record)
+            except (KeyError, IndexError, ValueError) as e:
+                item.error = f"modelo sem o campo {e}"
+        yield item
+
+
+class CampaignRunner:
+    """
+    Executa uma campanha a partir de uma lista CSV/JSONL lida em fluxo.
+
+    O pipeline (read_recipients -> validate_recipients -> render_messages -> envio) trabalha uma
+    linha por vez, com no máximo max_in_flight jobs pendentes, de modo que a memória não depende
+    do tamanho da lista. O checkpoint (posição em bytes e número da linha) só avança até a última
+    linha cujo job terminou, e é gravado em settings.CAMPAIGN_DIR; ao reiniciar, a campanha retoma
+    desse ponto (linhas em andamento no momento da falha podem ser reenviadas).
+    """
+
+    def __init__(self, dispatcher, source: str, template: str, session_phone: Optional[str] = None,
+                 name: Optional[str] = None, phone_field: str = "phone", image_path: str = None,
+                 audio_path: str = None, document_path: str = None,
+                 priority: str = settings.DEFAULT_JOB_PRIORITY,
+                 suppression: Optional[SuppressionIndex] = None, deduplicate: bool = True,
+                 max_in_flight: int = settings.CAMPAIGN_MAX_IN_FLIGHT,
+                 checkpoint_every: int = settings.CAMPAIGN_CHECKPOINT_EVERY) -> None:
+        """
+        :param dispatcher: JobDispatcher ou SendScheduler que executará os envios.
+        :param source: Caminho da lista de destinatários (.csv, .jsonl ou .ndjson).
+        :param template: Modelo do texto, com campos da linha entre chaves (ex.: "Olá {nome}").
+        :param session_phone: Sessão que enviará as mensagens. Se None, o SendScheduler distribui
+                              os envios entre as sessões.
+        :param name: Nome da campanha (nome do checkpoint). Se None, usa o nome do arquivo.
+        :param phone_field: Coluna/chave com o número de destino.
+        :param image_path: Imagem enviada a todos os destinatários (opcional).
+        :param audio_path: Áudio enviado a todos os destinatários (opcional).
+        :param document_path: Documento enviado a todos os destinatários (opcional).
+        :param priority: Prioridade dos jobs (ver settings.JOB_PRIORITIES).
+        :param suppression: Lista de descadastro. Se None, usa a do CronosManager do dispatcher.
+        :param deduplicate: Se True, cada número recebe no máximo uma mensagem por execução
+                            (ao retomar, a verificação vale a partir do checkpoint).
+        :param max_in_flight: Máximo de jobs enfileirados e ainda não concluídos.
+        :param checkpoint_every: Linhas concluídas entre duas gravações do checkpoint.
+        """
+        if session_phone is None and not isinstance(dispatcher, SendScheduler):
+            raise CampaignError("Sem session_phone, a campanha precisa de um SendScheduler.")
+        self.dispatcher = dispatcher
+        self.source = str(source)
+        self.template = template
+        self.session_phone = session_phone
+        self.name = name or Path(source).stem
+        self.phone_field = phone_field
+        self.image_path = image_path
+        self.audio_path = audio_path
+        self.document_path = document_path
+        self.priority = priority
+        self.suppression = suppression if suppression is not None else getattr(dispatcher.manager, "suppression", None)
+        self.deduplicate = deduplicate
+        self.max_in_flight = max_in_flight
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_path = Path(settings.CAMPAIGN_DIR) / f"{self.name}.checkpoint.json"
+        self.checkpoint = self.load_checkpoint()
+
+    def load_checkpoint(self) -> Dict[str, Any]:
+        """Carrega o checkpoint salvo, ou um checkpoint inicial se a campanha nunca rodou."""
+        initial = {"source": self.source, "offset": 0, "row": 0, "sent": 0, "failed": 0,
+                   "rejected": 0, "done": False}
+        if not self.checkpoint_path.exists():
+            return initial
+        with open(self.checkpoint_path, "r", encoding="utf-8") as file:
+            checkpoint = json.load(file)
+        if checkpoint.get("source") != self.source:
+            raise CampaignError(f"O checkpoint {self.checkpoint_path} pertence a outra lista "
+                                f"({checkpoint.get('source')}).")
+        return {**initial, **checkpoint}
+
+    def _save_checkpoint(self) -> None:
+        self.checkpoint["updated_at"] = time.time()
+        temporary = self.checkpoint_path.with_suffix(".tmp")
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(self.checkpoint, file, indent=4)
+        os.replace(temporary, self.checkpoint_path)  # Gravação atômica: nunca deixa um checkpoint pela metade
+
+    def items(self) -> Iterator[CampaignItem]:
+        """Pipeline de leitura, validação e montagem do texto, a partir do checkpoint."""
+        items = read_recipients(self.source, self.checkpoint["offset"], self.checkpoint["row"])
+        seen = NumberSet() if self.deduplicate else None
+        items = validate_recipients(items, self.phone_field, self.suppression, seen)
+        return render_messages(items, self.template)
+
+    def _submit(self, item: CampaignItem, stop: threading.Event) -> Optional[SendJob]:
+        job = SendJob(self.session_phone, kind="non_contact", target=item.target, text_message=item.text,
+                      image_path=self.image_path, audio_path=self.audio_path,
+                      document_path=self.document_path, priority=self.priority,
+                      campaign=self.name)
+        while not stop.is_set():
+            try:
+                return self.dispatcher.submit(job)
+            except JobQueueFull:
+                stop.wait(settings.CAMPAIGN_RETRY_INTERVAL)  # Backpressure: aguarda a fila esvaziar
+        return None
+
+    def _advance(self, window: Deque[Tuple[CampaignItem, Optional[SendJob]]]) -> int:
+        """Avança o checkpoint pelas linhas concluídas no início da janela."""
+        advanced = 0
+        while window and (window[0][1] is None or window[0][1].finished):
+            item, job = window.popleft()
+            if job is None:
+                self.checkpoint["rejected"] += 1
+                log_error(f"Campanha {self.name}, linha {item.row}: {item.error}", name="CampaignRunner")
+            elif job.status == "done":
+                self.checkpoint["sent"] += 1
+            else:
+                self.checkpoint["failed"] += 1
+            self.checkpoint["offset"] = item.offset
+            self.checkpoint["row"] = item.row
+            advanced += 1
+        return advanced
+
+    def run(self, stop: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Executa (ou retoma) a campanha até o fim da lista ou até stop ser sinalizado.
+
+        :param stop: Evento para interromper a campanha; o checkpoint é gravado antes de retornar.
+        :return: O checkpoint final (offset, row, sent, failed, rejected, done).
+        """
+        stop = stop or threading.Event()
+        if self.checkpoint["done"]:
+            log_info(f"Campanha {self.name} já concluída.", name="CampaignRunner")
+            return self.checkpoint
+        log_info(f"Campanha {self.name} iniciada a partir da linha {self.checkpoint['row'] + 1}.",
+                 name="CampaignRunner")
+        window: Deque[Tuple[CampaignItem, Optional[SendJob]]] = deque()
+        pending = 0
+        for item in self.items():
+            if stop.is_set():
+                break
+            job = None
+            if item.error is None:
+                job = self._submit(item, stop)
+                if job is None:
+                    break
+            window.append((item, job))
+            pending += self._advance(window)
+            while len(window) >= self.max_in_flight and not stop.is_set():
+                window[0][1].wait(settings.CAMPAIGN_RETRY_INTERVAL)
+                pending += self._advance(window)
+            if pending >= self.checkpoint_every:
+                self._save_checkpoint()
+                pending = 0
+        else:
+            for _, job in window:
+                while job is not None and not job.wait(settings.CAMPAIGN_RETRY_INTERVAL) and not stop.is_set():
+                    pass
+            self.checkpoint["done"] = not stop.is_set()
+        self._advance(window)
+        self._save_checkpoint()
+        log_info(f"Campanha {self.name}: {self.checkpoint['sent']} enviadas, {self.checkpoint['failed']} "
+                 f"falharam, {self.checkpoint['rejected']} rejeitadas (linha {self.checkpoint['row']}).",
+                 name="CampaignRunner")
+        return self.checkpoint
@@ -0,0 +1,418 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+import redis
+from core.configs import settings
+from core.utils.logger import log_info, log_error
+
+
+def _decode(value: Any) -> Optional[str]:
+    """Converte respostas do Redis (bytes ou str) para str."""
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value
+
+
+def _key(prefix: str, *parts: str) -> str:
+    return ":".join((prefix,) + parts)
+
+
+# Métodos do CronosManager que um job do cluster pode chamar. Qualquer um que escreva na fila do
+# Redis escolhe o método: os que fecham, apagam ou substituem perfis nunca podem ser chamados por ela.
+JOB_METHODS = frozenset({"send_complete_message", "send_complete_message_to_non_contact", "check_session_health"})
+
+
+def submit_job(client, phone_number: str, method: str, kwargs: Dict[str, Any],
+               prefix: str = settings.CLUSTER_KEY_PREFIX) -> str:
+    """
+    Enfileira um envio para a sessão informada, seja qual for o nó que a hospeda.
+
+    :param client: Cliente Redis (ou compatível).
+    :param phone_number: Número da sessão que fará o envio.
+    :param method: Método do CronosManager (ex.: "send_complete_message").
+    :param kwargs: Argumentos do método.
+    :param prefix: Prefixo das chaves do cluster.
+    :return: Identificador do job, usado em get_job_result().
+    :raises ValueError: Se o método não estiver em JOB_METHODS.
+    """
+    if method not in JOB_METHODS:
+        raise ValueError(f"Método {method} não permitido em jobs do cluster.")
+    job_id = uuid.uuid4().hex
+    payload = json.dumps({"id": job_id, "method": method, "kwargs": kwargs})
+    client.rpush(_key(prefix, "jobs", phone_number), payload)
+    return job_id
+
+
+def get_job_result(client, job_id: str, prefix: str = settings.CLUSTER_KEY_PREFIX) -> Optional[dict]:
+    """
+    Retorna o resultado de um job, ou None se ele ainda não foi executado.
+
+    :param client: Cliente Redis (ou compatível).
+    :param job_id: Identificador devolvido por submit_job().
+    :param prefix: Prefixo das chaves do cluster.
+    :return: Dicionário {"ok": bool, "result": ..., "node": ...} ou None.
+    """
+    raw = _decode(client.get(_key(prefix, "result", job_id)))
+    return json.loads(raw) if raw else None
+
+
+def session_owner(client, phone_number: str, prefix: str = settings.CLUSTER_KEY_PREFIX) -> Optional[str]:
+    """
+    Retorna o nó que detém a posse da sessão, ou None se ela está livre.
+
+    :param client: Cliente Redis (ou compatível).
+    :param phone_number: Número da sessão.
+    :param prefix: Prefixo das chaves do cluster.
+    """
+    return _decode(client.get(_key(prefix, "lease", phone_number)))
+
+
+class ClusterNode:
+    """
+    Nó do modo cluster: garante que cada sessão seja dirigida por um único host.
+
+    A posse de uma sessão é um lease com expiração no Redis (SET NX PX), renovado em
+    segundo plano. O nó publica as sessões que hospeda e consome apenas as filas de jobs
+    dessas sessões; se perder o lease, para de dirigir o navegador imediatamente. Cada job
+    retirado da fila passa por uma lista de processamento do nó (BLMOVE) até o resultado ser
+    gravado, de modo que a queda do nó não perde o envio. Antes de executar, o nó marca o job
+    como iniciado (SET NX): um job devolvido à fila depois de iniciado é registrado como falho em
+    vez de ser enviado de novo, pois os envios do WhatsApp não são idempotentes.
+    """
+
+    def __init__(self, manager=None, client=None, node_id: Optional[str] = None,
+                 lease_ttl: int = settings.CLUSTER_LEASE_TTL,
+                 max_sessions: int = settings.CLUSTER_MAX_SESSIONS,
+                 prefix: str = settings.CLUSTER_KEY_PREFIX) -> None:
+        """
+        Inicializa o nó do cluster.
+
+        :param manager: CronosManager local. Se None, cria um novo.
+        :param client: Cliente Redis (ou compatível, ex.: fake em memória). Se None, conecta em settings.REDIS_URL.
+        :param node_id: Identificador do nó. Se None, usa settings.CLUSTER_NODE_ID ou hostname-pid.
+        :param lease_ttl: Validade (s) do lease de cada sessão.
+        :param max_sessions: Quantidade máxima de sessões assumidas por este nó.
+        :param prefix: Prefixo das chaves no Redis.
+        """
+        if manager is None:
+            from core.cronos.manager import CronosManager
+            manager = CronosManager()
+        self.manager = manager
+        self.client = client if client is not None else redis.Redis.from_url(settings.REDIS_URL)
+        self.node_id: str = node_id or settings.CLUSTER_NODE_ID or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_ttl = lease_ttl
+        self.max_sessions = max_sessions
+        self.prefix = prefix
+        self._owned: Dict[str, float] = {}  # número -> prazo (monotonic) em que o lease expira
+        self._lock = threading.Lock()
+        self._running = False
+        self._stop = threading.Event()
+        self._renewer: Optional[threading.Thread] = None
+        self._threads: Dict[str, threading.Thread] = {}
+
+    # ---------------------------------------------------------------- leases
+
+    def _lease_key(self, phone: str) -> str:
+        return _key(self.prefix, "lease", phone)
+
+    def _compare_and(self, key: str, action) -> bool:
+        """
+        Executa 'action' numa transação somente se a chave ainda pertencer a este nó.
+        """
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if _decode(pipe.get(key)) != self.node_id:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                action(pipe)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    def owns(self, phone_number: str) -> bool:
+        """
+        Indica se este nó ainda detém um lease válido para a sessão.
+
+        :param phone_number: Número da sessão.
+        """
+        with self._lock:
+            deadline = self._owned.get(phone_number)
+        return deadline is not None and time.monotonic() < deadline
+
+    def claim_session(self, phone_number: str, use_vpn: bool = False) -> bool:
+        """
+        Tenta assumir a sessão e, se conseguir, a abre no CronosManager local.
+
+        :param phone_number: Número da sessão.
+        :param use_vpn: Indica se a VPN deve ser aplicada para esta sessão.
+        :return: True se o nó passou a (ou já) hospedar a sessão; False se outro nó a detém
+                 ou se a capacidade do nó foi atingida.
+        """
+        if self.owns(phone_number):
+            return True
+        with self._lock:
+            if len(self._owned) >= self.max_sessions:
+                return False
+        ttl_ms = int(self.lease_ttl * 1000)
+        acquired_at = time.monotonic()
+        key = self._lease_key(phone_number)
+        if not self.client.set(key, self.node_id, nx=True, px=ttl_ms):
+            # O lease já pode ser deste nó (ex.: reinício com o mesmo node_id): renova o TTL somente
+            # se a chave ainda for nossa, para que o prazo local não ultrapasse o do Redis.
+            if not self._compare_and(key, lambda pipe: pipe.pexpire(key, ttl_ms)):
+                return False
+        with self._lock:
+            self._owned[phone_number] = acquired_at + self.lease_ttl
+        # Abrir a sessão (Chrome, WhatsApp Web, QR Code) pode levar mais que o TTL: o lease já é
+        # renovado enquanto isso, mesmo antes de start().
+        self._start_renewer()
+        self._requeue_orphans(phone_number)
+        try:
+            self.manager.get_session(phone_number, use_vpn=use_vpn)
+        except Exception as e:
+            log_error(f"Erro ao abrir sessão {phone_number} após obter o lease: {e}", name="ClusterNode")
+            self.release_session(phone_number)
+            return False
+        self._publish()
+        if self._running:
+            self._start_job_loop(phone_number)
+        log_info(f"Nó {self.node_id} assumiu a sessão {phone_number}.", name="ClusterNode")
+        return True
+
+    def claim_available(self, phones: Iterable[str], use_vpn: bool = False) -> List[str]:
+        """
+        Assume, até o limite de capacidade, as sessões da lista que não têm dono.
+
+        Útil para redistribuir sessões órfãs quando um nó sai do cluster.
+
+        :param phones: Números candidatos.
+        :param use_vpn: Indica se a VPN deve ser aplicada às sessões assumidas.
+        :return: Lista dos números assumidos nesta chamada.
+        """
+        claimed = []
+        for phone in phones:
+            with self._lock:
+                if len(self._owned) >= self.max_sessions:
+                    break
+            if not self.owns(phone) and self.claim_session(phone, use_vpn=use_vpn):
+                claimed.append(phone)
+        return claimed
+
+    def _drop(self, phone_number: str) -> None:
+        """Esquece a sessão localmente e fecha o navegador."""
+        with self._lock:
+            self._owned.pop(phone_number, None)
+        try:
+            self.manager.close_session(phone_number)
+        except Exception as e:
+            log_error(f"Erro ao fechar sessão {phone_number}: {e}", name="ClusterNode")
+
+    def release_session(self, phone_number: str) -> None:
+        """
+        Libera a sessão: fecha o navegador local e remove o lease (se ainda for deste nó).
+
+        :param phone_number: Número da sessão.
+        """
+        self._drop(phone_number)
+        try:
+            self._compare_and(self._lease_key(phone_number), lambda pipe: pipe.delete(self._lease_key(phone_number)))
+        except Exception as e:
+            log_error(f"Erro ao remover lease de {phone_number}: {e}", name="ClusterNode")
+        self._publish()
+        log_info(f"Nó {self.node_id} liberou a sessão {phone_number}.", name="ClusterNode")
+
+    def _start_renewer(self) -> None:
+        renewer = self._renewer
+        if renewer and renewer.is_alive():
+            if not self._stop.is_set():
+                return
+            renewer.join()  # Encerrando após stop(): espera antes de iniciar outro
+        with self._lock:
+            if self._renewer is not renewer:
+                return  # Outra thread já iniciou a renovação
+            self._stop.clear()
+            self._renewer = threading.Thread(target=self._renew_leases, daemon=True, name="cronos-leases")
+            self._renewer.start()
+
+    def _renew_leases(self) -> None:
+        """Renova os leases periodicamente (até stop()); sessões cujo lease foi perdido são fechadas."""
+        ttl_ms = int(self.lease_ttl * 1000)
+        while not self._stop.wait(self.lease_ttl / 3):
+            with self._lock:
+                phones = list(self._owned)
+            for phone in phones:
+                renewed_at = time.monotonic()
+                key = self._lease_key(phone)
+                try:
+                    renewed = self._compare_and(key, lambda pipe, key=key: pipe.pexpire(key, ttl_ms))
+                except Exception as e:
+                    log_error(f"Falha ao renovar lease de {phone}: {e}", name="ClusterNode")
+                    if not self.owns(phone):
+                        log_error(f"Lease de {phone} expirou sem renovação; parando a sessão.", name="ClusterNode")
+                        self._drop(phone)
+                    continue
+                if renewed:
+                    with self._lock:
+                        if phone in self._owned:
+                            self._owned[phone] = renewed_at + self.lease_ttl
+                else:
+                    log_error(f"Lease de {phone} perdido para outro nó; parando a sessão.", name="ClusterNode")
+                    self._drop(phone)
+            try:
+                self._publish()
+            except Exception as e:
+                log_error(f"Falha ao publicar sessões do nó {self.node_id}: {e}", name="ClusterNode")
+
+    def _publish(self) -> None:
+        """Publica o conjunto de sessões hospedadas por este nó (com expiração)."""
+        with self._lock:
+            phones = list(self._owned)
+        key = _key(self.prefix, "node", self.node_id, "sessions")
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        if phones:
+            pipe.sadd(key, *phones)
+            pipe.expire(key, int(self.lease_ttl))
+        pipe.hset(_key(self.prefix, "nodes"), self.node_id, int(time.time()))
+        pipe.execute()
+
+    def hosted_sessions(self, node_id: Optional[str] = None) -> List[str]:
+        """
+        Retorna as sessões publicadas por um nó.
+
+        :param node_id: Nó a consultar. Se None, usa este nó.
+        """
+        members = self.client.smembers(_key(self.prefix, "node", node_id or self.node_id, "sessions"))
+        return sorted(_decode(m) for m in members)
+
+    # ------------------------------------------------------------------ jobs
+
+    def _processing_key(self, phone_number: str, node_id: Optional[str] = None) -> str:
+        return _key(self.prefix, "processing", phone_number, node_id or self.node_id)
+
+    def _requeue_orphans(self, phone_number: str) -> None:
+        """
+        Devolve à fila da sessão os jobs que ficaram nas listas de processamento de nós anteriores
+        (ex.: nó que caiu depois de retirar o job da fila e antes de gravar o resultado).
+
+        O nó anterior pode ter apenas perdido o lease e ainda estar executando o job; a marca de
+        início (_execute) impede que ele seja executado duas vezes.
+        """
+        thread = self._threads.get(phone_number)
+        if thread and thread.is_alive():
+            return
+        queue_key = _key(self.prefix, "jobs", phone_number)
+        requeued = 0
+        for key in self.client.scan_iter(match=self._processing_key(phone_number, "*")):
+            # Do fim para o início da lista de processamento, sempre para a frente da fila: mantém a ordem.
+            while self.client.lmove(key, queue_key, "RIGHT", "LEFT") is not None:
+                requeued += 1
+        if requeued:
+            log_info(f"{requeued} job(s) interrompido(s) de {phone_number} devolvido(s) à fila.", name="ClusterNode")
+
+    def _start_job_loop(self, phone_number: str) -> None:
+        thread = self._threads.get(phone_number)
+        if thread and thread.is_alive():
+            return
+        thread = threading.Thread(target=self._job_loop, args=(phone_number,), daemon=True)
+        self._threads[phone_number] = thread
+        thread.start()
+
+    def _job_loop(self, phone_number: str) -> None:
+        """Consome a fila de jobs da sessão enquanto o nó detiver o lease."""
+        queue_key = _key(self.prefix, "jobs", phone_number)
+        processing_key = self._processing_key(phone_number)
+        while self._running and self.owns(phone_number):
+            try:
+                # O job fica na lista de processamento do nó até o resultado ser gravado; se o nó
+                # cair antes disso, o próximo dono da sessão o devolve à fila (_requeue_orphans).
+                raw = _decode(self.client.blmove(queue_key, processing_key, 1, "LEFT", "RIGHT"))
+            except Exception as e:
+                log_error(f"Erro ao ler fila de {phone_number}: {e}", name="ClusterNode")
+                time.sleep(1)
+                continue
+            if raw is None:
+                continue
+            if not self.owns(phone_number):
+                # Lease perdido enquanto aguardava: devolve o job para o novo dono.
+                self.client.lmove(processing_key, queue_key, "RIGHT", "LEFT")
+                break
+            try:
+                self._execute(raw, processing_key)
+            except Exception as e:
+                # O job continua na lista de processamento e é devolvido à fila pelo próximo dono.
+                log_error(f"Erro ao registrar job de {phone_number}: {e}", name="ClusterNode")
+                time.sleep(1)
+
+    def _execute(self, raw: str, processing_key: Optional[str] = None) -> None:
+        job = json.loads(raw)
+        result_key = _key(self.prefix, "result", job["id"])
+        replace = True
+        try:
+            # A fila pode ter sido escrita sem passar por submit_job: o método é conferido de novo.
+            if job.get("method") not in JOB_METHODS or not isinstance(job.get("kwargs"), dict):
+                raise ValueError(f"Método {job.get('method')} não permitido em jobs do cluster.")
+            started = self.client.set(_key(self.prefix, "started", job["id"]), self.node_id, nx=True,
+                                      ex=settings.CLUSTER_JOB_RESULT_TTL)
+            if not started:
+                # Já iniciado por outro nó (ou por este, antes de perder o lease): não é repetido.
+                replace = False
+                raise RuntimeError("Job interrompido depois de iniciado; não é repetido para evitar envio duplicado.")
+            result = getattr(self.manager, job["method"])(**job["kwargs"])
+            outcome = {"ok": True, "result": result, "node": self.node_id}
+        except Exception as e:
+            log_error(f"Erro ao executar job {job.get('id')}: {e}", name="ClusterNode")
+            outcome = {"ok": False, "error": str(e), "node": self.node_id}
+        pipe = self.client.pipeline()
+        # Um job repetido não sobrescreve o resultado gravado pelo nó que o executou.
+        pipe.set(result_key, json.dumps(outcome), ex=settings.CLUSTER_JOB_RESULT_TTL, nx=not replace)
+        if processing_key:
+            pipe.lrem(processing_key, 1, raw)
+        pipe.execute()
+
+    def submit(self, phone_number: str, method: str, **kwargs) -> str:
+        """
+        Atalho para submit_job() usando o cliente e o prefixo deste nó.
+
+        :return: Identificador do job.
+        """
+        return submit_job(self.client, phone_number, method, kwargs, self.prefix)
+
+    # -------------------------------------------------------------- ciclo
+
+    def start(self) -> None:
+        """
+        Inicia a renovação de leases e o consumo das filas das sessões já assumidas.
+        """
+        if self._running:
+            return
+        self._running = True
+        self._start_renewer()
+        with self._lock:
+            phones = list(self._owned)
+        for phone in phones:
+            self._start_job_loop(phone)
+        log_info(f"Nó {self.node_id} iniciado no cluster.", name="ClusterNode")
+
+    def stop(self) -> None:
+        """
+        Para o nó, liberando todas as sessões para que outros nós possam assumi-las.
+        """
+        self._running = False
+        self._stop.set()
+        with self._lock:
+            phones = list(self._owned)
+        for phone in phones:
+            self.release_session(phone)
+        try:
+            self.client.hdel(_key(self.prefix, "nodes"), self.node_id)
+        except Exception as e:
+            log_error(f"Erro ao remover o nó {self.node_id} do cluster: {e}", name="ClusterNode")
+        log_info(f"Nó {self.node_id} saiu do cluster.", name="ClusterNode")
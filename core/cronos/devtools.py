@@ -0,0 +1,192 @@
+import itertools
+import json
+import threading
+import urllib.request
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional
+import websocket
+from core.configs import settings
+from core.utils.logger import log_info, log_error
+
+
+class DevToolsError(Exception):
+    """Levantada quando o canal DevTools está fechado ou o navegador recusa o comando."""
+
+
+class DevToolsTimeout(DevToolsError):
+    """Levantada quando o comando foi enviado mas a resposta não chegou a tempo (ele pode ter sido executado)."""
+
+
+class DevToolsScriptError(DevToolsError):
+    """Levantada quando o script avaliado lança uma exceção na página; o canal continua utilizável."""
+
+
+class DevToolsChannel:
+    """
+    Canal websocket persistente com a aba do WhatsApp Web (Chrome DevTools Protocol).
+
+    Cada comando do WebDriver clássico é uma requisição HTTP ao chromedriver, que o repassa ao
+    navegador. Pelo canal, os comandos vão direto ao navegador: send() não espera a resposta, de
+    modo que vários comandos podem ser enviados em sequência (pipeline) e aguardados juntos, e os
+    eventos da página (ex.: Runtime.bindingCalled) chegam por push, sem polling.
+    """
+
+    def __init__(self, ws_url: str, timeout: float = settings.DEVTOOLS_TIMEOUT) -> None:
+        """
+        :param ws_url: URL websocket da aba (webSocketDebuggerUrl).
+        :param timeout: Tempo máximo (s) de espera por uma resposta em call().
+        """
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self._ws = websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True)
+        self._ws.settimeout(None)
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._handlers: Dict[str, List[Callable[[dict], None]]] = {}
+        self._bindings: Dict[str, Callable[[str], None]] = {}
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.closed = False
+        self._thread = threading.Thread(target=self._read, daemon=True, name="cronos-devtools")
+        self._thread.start()
+
+    @classmethod
+    def for_driver(cls, driver, debug_address: Optional[str] = None) -> Optional["DevToolsChannel"]:
+        """
+        Abre o canal com a aba do driver local.
+
+        :param driver: Driver do Selenium (Chrome local).
+        :param debug_address: "host:porta" de depuração. Se None, usa o endereço informado pelo
+                              chromedriver (goog:chromeOptions.debuggerAddress).
+        :return: DevToolsChannel, ou None se o navegador não expõe a porta de depuração (ex.: Grid).
+        """
+        address = debug_address or (getattr(driver, "capabilities", None) or {}).get(
+            "goog:chromeOptions", {}).get("debuggerAddress")
+        if not address:
+            return None
+        with urllib.request.urlopen(f"http://{address}/json/list", timeout=settings.DEVTOOLS_TIMEOUT) as response:
+            pages = [t for t in json.load(response) if t.get("type") == "page" and t.get("webSocketDebuggerUrl")]
+        if not pages:
+            return None
+        page = next((t for t in pages if "web.whatsapp.com" in t.get("url", "")), pages[0])
+        return cls(page["webSocketDebuggerUrl"])
+
+    def _read(self) -> None:
+        try:
+            while True:
+                message = json.loads(self._ws.recv())
+                if "id" in message:
+                    with self._lock:
+                        future = self._pending.pop(message["id"], None)
+                    if future is None:
+                        continue
+                    if "error" in message:
+                        future.set_exception(DevToolsError(message["error"].get("message", str(message["error"]))))
+                    else:
+                        future.set_result(message.get("result", {}))
+                    continue
+                self._dispatch(message.get("method"), message.get("params", {}))
+        except Exception as e:
+            if not self.closed:
+                log_error(f"Canal DevTools encerrado: {e}", name="DevToolsChannel")
+        finally:
+            self._fail_pending()
+
+    def _dispatch(self, method: str, params: dict) -> None:
+        if method == "Runtime.bindingCalled":
+            callback = self._bindings.get(params.get("name"))
+            if callback:
+                try:
+                    callback(params.get("payload", ""))
+                except Exception as e:
+                    log_error(f"Erro no binding {params.get('name')}: {e}", name="DevToolsChannel")
+        for handler in list(self._handlers.get(method, ())):
+            try:
+                handler(params)
+            except Exception as e:
+                log_error(f"Erro no tratamento do evento {method}: {e}", name="DevToolsChannel")
+
+    def _fail_pending(self) -> None:
+        self.closed = True
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(DevToolsError("Canal DevTools encerrado."))
+
+    def send(self, method: str, params: Optional[dict] = None) -> Future:
+        """
+        Envia um comando sem esperar a resposta.
+
+        :return: Future com o resultado do comando.
+        :raises DevToolsError: Se o canal estiver fechado.
+        """
+        if self.closed:
+            raise DevToolsError("Canal DevTools encerrado.")
+        future: Future = Future()
+        with self._send_lock:
+            command_id = next(self._ids)
+            with self._lock:
+                self._pending[command_id] = future
+            try:
+                self._ws.send(json.dumps({"id": command_id, "method": method, "params": params or {}}))
+            except Exception as e:
+                with self._lock:
+                    self._pending.pop(command_id, None)
+                self.close()
+                raise DevToolsError(f"Falha ao enviar {method}: {e}")
+        return future
+
+    def call(self, method: str, params: Optional[dict] = None) -> dict:
+        """Envia um comando e aguarda o resultado (até timeout segundos)."""
+        try:
+            return self.send(method, params).result(self.timeout)
+        except FutureTimeout:
+            raise DevToolsTimeout(f"Sem resposta para {method} em {self.timeout}s.")
+
+    @staticmethod
+    def result_value(result: dict) -> Any:
+        if result.get("exceptionDetails"):
+            details = result["exceptionDetails"]
+            raise DevToolsScriptError(details.get("exception", {}).get("description") or details.get("text"))
+        return result.get("result", {}).get("value")
+
+    def evaluate_send(self, script: str, *args) -> Future:
+        """
+        Envia um script no formato do execute_script (corpo de função com arguments e return)
+        sem esperar o resultado; os argumentos e o retorno devem ser serializáveis em JSON.
+        """
+        expression = f"(function() {{\n{script}\n}}).apply(null, {json.dumps(list(args))})"
+        return self.send("Runtime.evaluate", {"expression": expression, "returnByValue": True,
+                                              "awaitPromise": True})
+
+    def evaluate(self, script: str, *args) -> Any:
+        """Equivalente a driver.execute_script para scripts que retornam valores (não elementos)."""
+        try:
+            result = self.evaluate_send(script, *args).result(self.timeout)
+        except FutureTimeout:
+            raise DevToolsTimeout(f"Sem resposta para o script em {self.timeout}s.")
+        return self.result_value(result)
+
+    def on(self, method: str, handler: Callable[[dict], None]) -> None:
+        """Registra um tratador para um evento do protocolo (ex.: "Page.loadEventFired")."""
+        self._handlers.setdefault(method, []).append(handler)
+
+    def add_binding(self, name: str, callback: Callable[[str], None]) -> None:
+        """
+        Cria window.<name>(texto) na página (inclusive após recarregar); cada chamada é entregue a
+        callback por push.
+        """
+        self._bindings[name] = callback
+        self.send("Runtime.enable")
+        self.call("Runtime.addBinding", {"name": name})
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+        self._fail_pending()
+        log_info("Canal DevTools fechado.", name="DevToolsChannel")
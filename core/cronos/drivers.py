@@ -0,0 +1,185 @@
+import base64
+import io
+import json
+import os
+import posixpath
+import threading
+import urllib.request
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.file_detector import UselessFileDetector
+from webdriver_manager.chrome import ChromeDriverManager
+from core.configs import settings
+from core.cronos.media import file_digest
+from core.utils.logger import log_info, log_error
+
+
+class LocalChromeFactory:
+    """
+    Fábrica de drivers que inicia o Chrome na própria máquina (comportamento padrão).
+    """
+
+    supports_reattach = True  # Navegadores locais podem ser reanexados pela porta de depuração
+
+    def user_data_dir(self, phone_number: str, profile_path: Path) -> str:
+        """Diretório do perfil do Chrome visto pelo navegador (local)."""
+        return str(profile_path)
+
+    def __call__(self, options: Options) -> webdriver.Remote:
+        return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+
+
+class RemoteChromeFactory:
+    """
+    Fábrica de drivers que cria o Chrome num Selenium Grid (ou Selenium standalone) remoto.
+
+    Os perfis ficam no sistema de arquivos do nó, em settings.SELENIUM_REMOTE_PROFILE_DIR.
+    """
+
+    supports_reattach = False
+
+    def __init__(self, command_executor: Optional[str] = None, profile_root: Optional[str] = None) -> None:
+        """
+        :param command_executor: URL do Grid. Se None, usa settings.SELENIUM_REMOTE_URL.
+        :param profile_root: Diretório dos perfis no nó. Se None, usa settings.SELENIUM_REMOTE_PROFILE_DIR.
+        """
+        self.command_executor = command_executor or settings.SELENIUM_REMOTE_URL
+        self.profile_root = profile_root or settings.SELENIUM_REMOTE_PROFILE_DIR
+        if not self.command_executor:
+            raise Exception("URL do Selenium Grid não configurada (settings.SELENIUM_REMOTE_URL).")
+        self.uploader = UploadCache(self.node_uri)  # Compartilhado pelas sessões criadas por esta fábrica
+
+    def node_uri(self, driver) -> str:
+        """
+        Retorna o endereço do nó do Grid que executa a sessão do driver (consulta GraphQL do Grid).
+
+        :param driver: Driver remoto.
+        :return: URI do nó, ou o id da sessão se o Grid não informar o nó (cache restrito à sessão).
+        """
+        base = self.command_executor.rstrip("/")
+        if base.endswith("/wd/hub"):
+            base = base[:-len("/wd/hub")]
+        query = json.dumps({"query": f'{{ session (id: "{driver.session_id}") {{ nodeUri }} }}'}).encode("utf-8")
+        request = urllib.request.Request(f"{base}/graphql", data=query, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                node = ((json.load(response).get("data") or {}).get("session") or {}).get("nodeUri")
+        except Exception as e:
+            log_error(f"Não foi possível identificar o nó da sessão {driver.session_id}: {e}", name="UploadCache")
+            node = None
+        return node or driver.session_id
+
+    def user_data_dir(self, phone_number: str, profile_path: Path) -> str:
+        """Diretório do perfil do Chrome visto pelo navegador (no nó remoto)."""
+        return posixpath.join(self.profile_root, phone_number)
+
+    def __call__(self, options: Options) -> webdriver.Remote:
+        return webdriver.Remote(command_executor=self.command_executor, options=options)
+
+
+_remote_factory: Optional[RemoteChromeFactory] = None
+_remote_factory_lock = threading.Lock()
+
+
+def default_driver_factory():
+    """
+    Retorna a fábrica de drivers conforme a configuração: remota se settings.SELENIUM_REMOTE_URL
+    estiver definida, local caso contrário.
+
+    A fábrica remota é única no processo, para que todas as sessões compartilhem o mesmo
+    UploadCache (por nó do Grid).
+    """
+    global _remote_factory
+    if settings.SELENIUM_REMOTE_URL:
+        with _remote_factory_lock:
+            if _remote_factory is None or _remote_factory.command_executor != settings.SELENIUM_REMOTE_URL:
+                _remote_factory = RemoteChromeFactory()
+            return _remote_factory
+    return LocalChromeFactory()
+
+
+class UploadCache:
+    """
+    Envia arquivos para cada nó remoto uma única vez por conteúdo.
+
+    Com um driver remoto, cada send_keys(caminho) num input de arquivo compacta e envia o arquivo
+    inteiro em base64. Este cache guarda, por nó do Grid e hash do conteúdo, o caminho do arquivo
+    já existente no nó e o reaproveita nos envios seguintes de qualquer sessão desse nó. O arquivo
+    fica no diretório temporário da sessão que o enviou e some quando ela termina; por isso cada
+    caminho guarda a sessão dona e é descartado em forget(). Com drivers locais o caminho é usado
+    diretamente.
+    """
+
+    def __init__(self, node_resolver: Optional[Callable] = None) -> None:
+        """
+        :param node_resolver: Função driver -> identificador do nó. Se None, usa o id da sessão do
+                              driver (cache por sessão).
+        """
+        self.node_resolver = node_resolver or (lambda driver: driver.session_id)
+        self._paths: Dict[Tuple[str, str], Tuple[str, str]] = {}  # (nó, hash) -> (caminho no nó, sessão dona)
+        self._nodes: Dict[str, str] = {}  # sessão -> nó
+        self._lock = threading.Lock()
+
+    def _node(self, driver) -> str:
+        with self._lock:
+            node = self._nodes.get(driver.session_id)
+        if node is None:
+            node = self.node_resolver(driver)
+            with self._lock:
+                self._nodes[driver.session_id] = node
+        return node
+
+    def remote_path(self, driver, path: str) -> str:
+        """
+        Retorna o caminho do arquivo no nó do driver, enviando-o apenas se necessário.
+
+        :param driver: Driver remoto.
+        :param path: Caminho local do arquivo.
+        :return: Caminho do arquivo no nó.
+        """
+        key = (self._node(driver), file_digest(path))
+        with self._lock:
+            cached = self._paths.get(key)
+        if cached:
+            return cached[0]
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zipped:
+            zipped.write(path, os.path.basename(path))
+        content = base64.encodebytes(buffer.getvalue()).decode("utf-8")
+        remote = driver.execute(Command.UPLOAD_FILE, {"file": content})["value"]
+        with self._lock:
+            self._paths[key] = (remote, driver.session_id)
+        log_info(f"Arquivo {path} enviado ao nó remoto {key[0]} ({remote}).", name="UploadCache")
+        return remote
+
+    def send_file(self, driver, file_input, path: str) -> None:
+        """
+        Seleciona o arquivo no input, reaproveitando o upload anterior quando o driver é remoto.
+
+        :param driver: Driver do Selenium.
+        :param file_input: Elemento <input type="file">.
+        :param path: Caminho local do arquivo.
+        """
+        if not getattr(driver, "_is_remote", False):
+            file_input.send_keys(path)
+            return
+        remote = self.remote_path(driver, path)
+        with driver.file_detector_context(UselessFileDetector):
+            file_input.send_keys(remote)
+
+    def forget(self, driver) -> None:
+        """
+        Descarta os caminhos enviados pela sessão do driver (os arquivos no nó somem quando ela termina).
+
+        :param driver: Driver cuja sessão foi (ou será) encerrada.
+        """
+        session_id = getattr(driver, "session_id", None)
+        with self._lock:
+            self._nodes.pop(session_id, None)
+            for key in [k for k, (_, owner) in self._paths.items() if owner == session_id]:
+                self._paths.pop(key)
@@ -0,0 +1,271 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Optional
+from core.configs import settings
+from core.utils.logger import log_info, log_error
+
+_PROBE_SCRIPT = """
+const has = (xpath) => document.evaluate(xpath, document, null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue !== null;
+return {
+    ready: document.readyState,
+    logged_in: has(arguments[0]),
+    qr: has(arguments[1]),
+    disconnected: has(arguments[2])
+};
+"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de uma sessão.
+
+    - "closed": envios liberados.
+    - "open": envios falham imediatamente até passar settings.CIRCUIT_RESET_TIMEOUT.
+    - "half_open": um único envio de teste é liberado; sucesso fecha o circuito, falha o reabre.
+    """
+
+    def __init__(self, failure_threshold: int = settings.CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = settings.CIRCUIT_RESET_TIMEOUT) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.reason: Optional[str] = None
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Indica se um envio pode ser tentado agora."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    @property
+    def blocked(self) -> bool:
+        """Indica, sem alterar o estado, se um envio seria recusado agora."""
+        with self._lock:
+            if self.state == "open":
+                return time.monotonic() - self._opened_at < self.reset_timeout
+            return self.state == "half_open"
+
+    def retry_at(self) -> Optional[float]:
+        """Instante (time.monotonic) em que o circuito aberto libera um envio de teste, ou None."""
+        with self._lock:
+            if self.state == "open":
+                return self._opened_at + self.reset_timeout
+            return None
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self.reason = None
+
+    def record_failure(self, reason: str = "falha no envio") -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self._open(reason)
+
+    def release(self, reason: str) -> None:
+        """
+        Devolve o envio de teste que não chegou a ser feito (ex.: sessão não autenticada): o
+        circuito meio aberto volta a "open" e libera outro teste após reset_timeout. Nos demais
+        estados, nada muda, pois a recusa não é uma falha de envio.
+        """
+        with self._lock:
+            if self.state == "half_open":
+                self._open(reason)
+
+    def trip(self, reason: str) -> None:
+        """Abre o circuito imediatamente (ex.: sessão detectada como quebrada)."""
+        with self._lock:
+            self._open(reason)
+
+    def _open(self, reason: str) -> None:
+        self.state = "open"
+        self.reason = reason
+        self._opened_at = time.monotonic()
+
+
+class SessionHealthMonitor:
+    """
+    Verifica periodicamente (e sob demanda) a saúde das sessões do CronosManager.
+
+    Detecta driver morto, página travada e celular desconectado. Sessões quebradas têm o circuito
+    aberto (os envios falham na hora) e são reiniciadas em segundo plano a partir do perfil salvo.
+    """
+
+    def __init__(self, manager, interval: float = settings.HEALTH_CHECK_INTERVAL,
+                 probe_timeout: float = settings.HEALTH_PROBE_TIMEOUT) -> None:
+        """
+        :param manager: CronosManager cujas sessões serão monitoradas.
+        :param interval: Intervalo (s) entre verificações periódicas.
+        :param probe_timeout: Tempo máximo (s) de resposta da página.
+        """
+        self.manager = manager
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._restarting: set = set()
+        self._probes: Dict[str, Future] = {}  # Verificação em andamento por sessão
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cronos-health")
+
+    def breaker(self, phone_number: str) -> CircuitBreaker:
+        """Retorna (criando se necessário) o circuit breaker da sessão."""
+        with self._lock:
+            if phone_number not in self._breakers:
+                self._breakers[phone_number] = CircuitBreaker()
+            return self._breakers[phone_number]
+
+    def probe(self, session) -> dict:
+        """
+        Executa a verificação de saúde de uma sessão.
+
+        :param session: Instância de WhatsAppSession.
+        :return: {"healthy": bool, "reason": str | None}. Motivos possíveis: "driver_missing",
+                 "driver_dead", "page_stuck", "logged_out", "phone_disconnected".
+        """
+        driver = session.driver
+        if driver is None:
+            return {"healthy": False, "reason": "driver_missing"}
+        future = self._submit_probe(session)
+        try:
+            state = future.result(timeout=self.probe_timeout)
+        except FutureTimeout:
+            return {"healthy": False, "reason": "page_stuck"}
+        except Exception as e:
+            return {"healthy": False, "reason": "driver_dead", "error": str(e)}
+        if state.get("disconnected"):
+            return {"healthy": False, "reason": "phone_disconnected"}
+        if not state.get("logged_in"):
+            if state.get("qr"):
+                return {"healthy": False, "reason": "logged_out"}
+            if state.get("ready") != "complete":
+                return {"healthy": False, "reason": "page_stuck"}
+        return {"healthy": True, "reason": None}
+
+    def _submit_probe(self, session) -> Future:
+        """
+        Executa o script de verificação numa thread própria, fora do pool de check(): uma página
+        travada prende apenas a thread da sua sessão. Enquanto a verificação anterior da sessão não
+        responde, a mesma Future é reaproveitada em vez de abrir outra thread.
+        """
+        with self._lock:
+            future = self._probes.get(session.phone_number)
+            if future is not None and not future.done():
+                return future
+            future = self._probes[session.phone_number] = Future()
+        locators = session.locators
+        args = (_PROBE_SCRIPT, locators.union("LOGGED_IN"), locators.union("QR_CODE"),
+                locators.union("PHONE_DISCONNECTED"))
+
+        def run() -> None:
+            try:
+                future.set_result(session.evaluate(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, daemon=True, name=f"cronos-probe-{session.phone_number}").start()
+        return future
+
+    def check(self, phone_number: str) -> dict:
+        """
+        Verificação sob demanda: abre o circuito e agenda o reinício se a sessão estiver quebrada.
+
+        :param phone_number: Número da sessão.
+        :return: Resultado de probe().
+        """
+        session = self.manager.sessions.get(phone_number)
+        if session is None:
+            return {"healthy": False, "reason": "no_session"}
+        result = self.probe(session)
+        breaker = self.breaker(phone_number)
+        if result["healthy"]:
+            if breaker.state != "closed" and phone_number not in self._restarting:
+                breaker.record_success()
+            return result
+        log_error(f"Sessão {phone_number} não saudável: {result['reason']}", name="SessionHealthMonitor")
+        breaker.trip(result["reason"])
+        # Sessões deslogadas ou com o celular desconectado dependem de ação no aparelho.
+        if result["reason"] in ("driver_missing", "driver_dead", "page_stuck"):
+            self.restart(phone_number)
+        return result
+
+    def record_success(self, phone_number: str) -> None:
+        self.breaker(phone_number).record_success()
+
+    def record_failure(self, phone_number: str, reason: str = "falha no envio") -> None:
+        """
+        Registra a falha de um envio e dispara uma verificação de saúde em segundo plano.
+        """
+        self.breaker(phone_number).record_failure(reason)
+        self._executor.submit(self.check, phone_number)
+
+    def restart(self, phone_number: str) -> None:
+        """
+        Reinicia a sessão em segundo plano (fecha o driver e reabre a partir do perfil).
+
+        :param phone_number: Número da sessão.
+        """
+        with self._lock:
+            if phone_number in self._restarting:
+                return
+            self._restarting.add(phone_number)
+        threading.Thread(target=self._restart, args=(phone_number,), daemon=True,
+                         name=f"cronos-restart-{phone_number}").start()
+
+    def _restart(self, phone_number: str) -> None:
+        try:
+            session = self.manager.sessions.get(phone_number)
+            if session is None:
+                return
+            log_info(f"Reiniciando sessão {phone_number}.", name="SessionHealthMonitor")
+            # O circuito já está aberto (novos envios falham na hora); aguarda o envio em andamento
+            # terminar antes de fechar o driver.
+            with self.manager.session_lock(phone_number):
+                session.close()
+                status = session.ensure_logged_in()
+            if status.get("status") == "logged_in":
+                self.breaker(phone_number).record_success()
+                log_info(f"Sessão {phone_number} reiniciada com sucesso.", name="SessionHealthMonitor")
+            else:
+                self.breaker(phone_number).trip("logged_out")
+                log_error(f"Sessão {phone_number} reiniciada, mas requer novo login.", name="SessionHealthMonitor")
+        except Exception as e:
+            log_error(f"Erro ao reiniciar sessão {phone_number}: {e}", name="SessionHealthMonitor")
+        finally:
+            with self._lock:
+                self._restarting.discard(phone_number)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            for phone in list(self.manager.sessions):
+                # Sessões ocupadas com um envio estão respondendo; evita falsos "travamentos".
+                if self.manager.session_lock(phone).locked() or phone in self._restarting:
+                    continue
+                try:
+                    self.check(phone)
+                except Exception as e:
+                    log_error(f"Erro na verificação de saúde de {phone}: {e}", name="SessionHealthMonitor")
+
+    def start(self) -> None:
+        """Inicia as verificações periódicas."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="cronos-health")
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Interrompe as verificações periódicas."""
+        self._stop.set()
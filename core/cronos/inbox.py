@@ -0,0 +1,205 @@
+import asyncio
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+from core.configs import settings
+from core.utils.logger import log_info, log_error
+
+
+class InboundMessage:
+    """
+    Mensagem recebida numa sessão.
+
+    source="chat" indica uma mensagem lida na conversa aberta (com id, remetente e mídia);
+    source="chat_list" indica uma conversa da lista lateral que recebeu uma mensagem não lida
+    (somente o título da conversa e a prévia do texto).
+    """
+
+    def __init__(self, session_phone: str, item: Dict[str, Any]) -> None:
+        """
+        :param session_phone: Número da sessão que recebeu a mensagem.
+        :param item: Dicionário produzido pelo observador da página (ver WhatsAppSession.read_inbox).
+        """
+        self.session_phone = session_phone
+        self.id: Optional[str] = item.get("id")
+        self.chat: str = item.get("chat") or ""
+        self.title: str = item.get("title") or ""
+        self.sender: str = item.get("sender") or ""
+        self.sent_at: str = item.get("sent_at") or ""
+        self.text: str = item.get("text") or ""
+        self.media: Optional[str] = item.get("media")
+        self.timestamp: float = (item.get("timestamp") or 0) / 1000
+        self.source: str = item.get("source") or "chat"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_phone": self.session_phone,
+            "id": self.id,
+            "chat": self.chat,
+            "title": self.title,
+            "sender": self.sender,
+            "sent_at": self.sent_at,
+            "text": self.text,
+            "media": self.media,
+            "timestamp": self.timestamp,
+            "source": self.source,
+        }
+
+
+class InboxSubscription:
+    """
+    Fila limitada de mensagens recebidas de um assinante.
+
+    Pode ser consumida com get(), como gerador (for message in subscription) ou como
+    iterador assíncrono (async for message in subscription). Quando a fila enche, as
+    mensagens mais antigas são descartadas (contadas em dropped).
+    """
+
+    def __init__(self, feed: "InboundFeed", phone: Optional[str], limit: int) -> None:
+        self.feed = feed
+        self.phone = phone
+        self.dropped = 0
+        self._queue: "queue.Queue[InboundMessage]" = queue.Queue(maxsize=limit)
+        self._closed = threading.Event()
+
+    def _offer(self, message: InboundMessage) -> None:
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[InboundMessage]:
+        """
+        Retira a próxima mensagem.
+
+        :param timeout: Tempo máximo de espera (s). Se None, espera indefinidamente.
+        :return: A mensagem, ou None se o prazo acabou ou a assinatura foi encerrada.
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def __iter__(self):
+        while not self._closed.is_set():
+            message = self.get(timeout=settings.INBOX_POLL_INTERVAL)
+            if message is not None:
+                yield message
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        while not self._closed.is_set():
+            message = await loop.run_in_executor(None, self.get, settings.INBOX_POLL_INTERVAL)
+            if message is not None:
+                yield message
+
+    def close(self) -> None:
+        """Encerra a assinatura; geradores e iteradores em andamento terminam."""
+        self._closed.set()
+        self.feed.unsubscribe(self)
+
+
+class InboundFeed:
+    """
+    Distribui as mensagens recebidas pelas sessões do CronosManager aos assinantes.
+
+    Cada sessão mantém na própria página um observador (MutationObserver) que acumula as
+    mensagens novas; uma única thread retira esse buffer de todas as sessões a cada
+    settings.INBOX_POLL_INTERVAL segundos, numa chamada por sessão, e entrega cada mensagem
+    às assinaturas correspondentes. Sessões com canal DevTools entregam as mensagens por push,
+    assim que detectadas; a leitura periódica continua reinstalando o observador após recargas.
+    """
+
+    def __init__(self, manager, poll_interval: float = settings.INBOX_POLL_INTERVAL,
+                 queue_limit: int = settings.INBOX_QUEUE_LIMIT) -> None:
+        """
+        :param manager: CronosManager cujas sessões serão lidas.
+        :param poll_interval: Intervalo (s) entre leituras do buffer das páginas.
+        :param queue_limit: Tamanho padrão da fila de cada assinatura.
+        """
+        self.manager = manager
+        self.poll_interval = poll_interval
+        self.queue_limit = queue_limit
+        self._subscriptions: List[InboxSubscription] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._push_callbacks: dict = {}
+
+    def subscribe(self, phone: Optional[str] = None, limit: Optional[int] = None) -> InboxSubscription:
+        """
+        Cria uma assinatura e inicia a leitura das sessões, se ainda não iniciada.
+
+        :param phone: Número da sessão. Se None, recebe as mensagens de todas as sessões.
+        :param limit: Máximo de mensagens pendentes. Se None, usa queue_limit.
+        :return: InboxSubscription.
+        """
+        subscription = InboxSubscription(self, phone, limit or self.queue_limit)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription: InboxSubscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, message: InboundMessage) -> None:
+        """Entrega a mensagem às assinaturas da sessão e às assinaturas gerais."""
+        with self._lock:
+            targets = [s for s in self._subscriptions if s.phone in (None, message.session_phone)]
+        for subscription in targets:
+            subscription._offer(message)
+
+    def poll(self, phone: str, session) -> int:
+        """
+        Lê o buffer de mensagens da página de uma sessão.
+
+        :return: Quantidade de mensagens publicadas.
+        """
+        callback = self._push_callbacks.get(phone)
+        if callback is None:
+            callback = self._push_callbacks[phone] = lambda item: self.publish(InboundMessage(phone, item))
+        session.enable_inbox_push(callback)
+        items = session.read_inbox()
+        for item in items:
+            self.publish(InboundMessage(phone, item))
+        return len(items)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            with self._lock:
+                phones = {s.phone for s in self._subscriptions}
+            for phone, session in list(self.manager.sessions.items()):
+                if None not in phones and phone not in phones:
+                    continue
+                if self.manager.health.breaker(phone).blocked:
+                    continue  # Sessão quebrada ou reiniciando; o buffer é lido quando ela voltar
+                try:
+                    self.poll(phone, session)
+                except Exception as e:
+                    log_error(f"Erro ao ler mensagens recebidas de {phone}: {e}", name="InboundFeed")
+
+    def start(self) -> None:
+        """Inicia a leitura periódica das sessões."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="cronos-inbox")
+        self._thread.start()
+        log_info("Leitura de mensagens recebidas iniciada.", name="InboundFeed")
+
+    def stop(self) -> None:
+        """Interrompe a leitura e encerra todas as assinaturas."""
+        self._stop.set()
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.close()
@@ -0,0 +1,328 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional
+from core.configs import settings
+from core.cronos.results import send_context
+from core.utils.logger import log_info, log_error
+
+
+class JobQueueFull(Exception):
+    """Levantada quando a fila de jobs de uma sessão atingiu o limite configurado."""
+
+
+class SendJob:
+    """
+    Representa um pedido de envio (ou de login) aguardando execução numa sessão.
+
+    O status evolui de "queued" para "running" e termina em "done" (sucesso) ou "failed".
+    """
+
+    TERMINAL_STATUSES = ("done", "failed")
+
+    def __init__(self, session_phone: str, kind: str = "contact", target: Optional[str] = None,
+                 text_message: str = "", image_path: str = None, audio_path: str = None,
+                 document_path: str = None, use_vpn: bool = False,
+                 priority: str = settings.DEFAULT_JOB_PRIORITY, campaign: Optional[str] = None) -> None:
+        """
+        Cria o job.
+
+        :param session_phone: Número da sessão que executará o job.
+        :param kind: "contact" (send_complete_message), "non_contact"
+                     (send_complete_message_to_non_contact) ou "login" (get_session).
+        :param target: Contato (kind="contact") ou número de destino (kind="non_contact").
+        :param text_message: Mensagem de texto a ser enviada.
+        :param image_path: Caminho para imagem (opcional).
+        :param audio_path: Caminho para áudio (opcional).
+        :param document_path: Caminho para documento (opcional).
+        :param use_vpn: Indica se a VPN deve ser utilizada para essa sessão.
+        :param priority: "high" (transacional) ou "bulk" (campanhas); ver settings.JOB_PRIORITIES.
+        :param campaign: Campanha do job, registrada junto dos resultados do envio (opcional).
+        """
+        if kind not in ("contact", "non_contact", "login"):
+            raise Exception(f"Tipo de job inválido: {kind}")
+        if priority not in settings.JOB_PRIORITIES:
+            raise Exception(f"Prioridade inválida: {priority}")
+        self.id: str = uuid.uuid4().hex
+        self.session_phone = session_phone
+        self.kind = kind
+        self.target = target
+        self.text_message = text_message
+        self.image_path = image_path
+        self.audio_path = audio_path
+        self.document_path = document_path
+        self.use_vpn = use_vpn
+        self.priority = priority
+        self.campaign = campaign
+        self.status: str = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at: float = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in self.TERMINAL_STATUSES
+
+    def run(self, manager) -> None:
+        """
+        Executa o job no CronosManager informado, atualizando status e resultado.
+
+        :param manager: Instância de CronosManager.
+        """
+        self.status = "running"
+        self.started_at = time.time()
+        try:
+            with send_context(job_id=self.id, campaign=self.campaign):
+                ok = self._execute(manager)
+            if not ok and self.error is None:
+                self.error = "Envio não concluído; consulte os logs da sessão."
+            self.status = "done" if ok else "failed"
+        except Exception as e:
+            self.error = str(e)
+            self.status = "failed"
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+
+    def _execute(self, manager) -> bool:
+        if self.kind == "login":
+            _, self.result = manager.get_session(self.session_phone, use_vpn=self.use_vpn)
+            return self.result.get("status") != "error"
+        if self.kind == "non_contact":
+            self.result = manager.send_complete_message_to_non_contact(
+                self.session_phone, self.target, self.text_message, image_path=self.image_path,
+                audio_path=self.audio_path, document_path=self.document_path, use_vpn=self.use_vpn)
+        else:
+            self.result = manager.send_complete_message(
+                self.session_phone, self.target, self.text_message, image_path=self.image_path,
+                audio_path=self.audio_path, document_path=self.document_path, use_vpn=self.use_vpn)
+        return self.result
+
+    def fail(self, error: str) -> None:
+        """Marca o job como falho sem executá-lo."""
+        self.error = error
+        self.status = "failed"
+        self.finished_at = time.time()
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Aguarda o término do job.
+
+        :param timeout: Tempo máximo de espera (s). Se None, espera indefinidamente.
+        :return: True se o job terminou dentro do prazo.
+        """
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "session_phone": self.session_phone,
+            "kind": self.kind,
+            "priority": self.priority,
+            "campaign": self.campaign,
+            "target": self.target,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class LaneQueue:
+    """
+    Fila com uma faixa (lane) por prioridade.
+
+    No modo "strict", jobs de maior prioridade são sempre atendidos primeiro. No modo "weighted",
+    cada faixa recebe uma cota de atendimentos por rodada (settings.PRIORITY_WEIGHTS), o que
+    mantém a latência dos jobs "high" baixa sem deixar os "bulk" parados indefinidamente.
+    Cada faixa tem o seu próprio limite, de modo que uma campanha não bloqueia jobs transacionais.
+    """
+
+    def __init__(self, limit: int, mode: str = settings.PRIORITY_MODE,
+                 weights: Optional[Dict[str, int]] = None) -> None:
+        """
+        :param limit: Máximo de jobs pendentes em cada faixa.
+        :param mode: "strict" ou "weighted".
+        :param weights: Cota por faixa no modo weighted. Se None, usa settings.PRIORITY_WEIGHTS.
+        """
+        self.limit = limit
+        self.mode = mode
+        self.weights = weights or settings.PRIORITY_WEIGHTS
+        self._lanes: Dict[str, Deque[SendJob]] = {p: deque() for p in settings.JOB_PRIORITIES}
+        self._credits: Dict[str, int] = dict(self.weights)
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def qsize(self) -> int:
+        return len(self)
+
+    def put_nowait(self, job: SendJob) -> None:
+        """
+        Enfileira o job na faixa da sua prioridade.
+
+        :raises JobQueueFull: Se a faixa estiver cheia.
+        """
+        with self._cond:
+            lane = self._lanes[job.priority]
+            if len(lane) >= self.limit:
+                raise JobQueueFull(f"Fila {job.priority} cheia ({self.limit} jobs).")
+            lane.append(job)
+            self._cond.notify()
+
+    def peek_priority(self) -> Optional[str]:
+        """Prioridade do job que seria retirado agora, ou None se a fila estiver vazia."""
+        with self._cond:
+            return self._select()
+
+    def _select(self) -> Optional[str]:
+        pending = [p for p in settings.JOB_PRIORITIES if self._lanes[p]]
+        if not pending:
+            return None
+        if self.mode == "strict" or len(pending) == 1:
+            return pending[0]
+        for priority in pending:
+            if self._credits.get(priority, 0) > 0:
+                return priority
+        # Rodada encerrada: renova as cotas.
+        self._credits = dict(self.weights)
+        return pending[0]
+
+    def pop_nowait(self) -> Optional[SendJob]:
+        """Retira o próximo job segundo a política de prioridade, ou None se vazia."""
+        with self._cond:
+            priority = self._select()
+            if priority is None:
+                return None
+            # As cotas só são consumidas quando há disputa entre faixas.
+            if sum(1 for lane in self._lanes.values() if lane) > 1:
+                self._credits[priority] = self._credits.get(priority, 1) - 1
+            return self._lanes[priority].popleft()
+
+    def get(self) -> Optional[SendJob]:
+        """Bloqueia até haver um job; retorna None quando a fila é fechada."""
+        with self._cond:
+            while not len(self) and not self._closed:
+                self._cond.wait()
+            if self._closed and not len(self):
+                return None
+            return self.pop_nowait()
+
+    def drain(self) -> list:
+        """Remove e retorna todos os jobs pendentes."""
+        with self._cond:
+            pending = [job for lane in self._lanes.values() for job in lane]
+            for lane in self._lanes.values():
+                lane.clear()
+            return pending
+
+    def close(self) -> None:
+        """Libera os consumidores bloqueados em get()."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class JobDispatcher:
+    """
+    Recebe jobs de forma assíncrona e os executa em uma thread por sessão.
+
+    Cada sessão tem uma fila limitada por prioridade (settings.SESSION_QUEUE_LIMIT por faixa, ver
+    LaneQueue); quando ela está cheia, submit() levanta JobQueueFull para que o chamador aplique
+    backpressure (ex.: HTTP 429). Um job "high" é o próximo a ser enviado quando o atual terminar.
+    """
+
+    def __init__(self, manager, queue_limit: int = settings.SESSION_QUEUE_LIMIT,
+                 history_limit: int = settings.JOB_HISTORY_LIMIT) -> None:
+        """
+        Inicializa o dispatcher.
+
+        :param manager: Instância de CronosManager usada para executar os jobs.
+        :param queue_limit: Máximo de jobs pendentes por sessão.
+        :param history_limit: Máximo de jobs mantidos em memória para consulta.
+        """
+        self.manager = manager
+        self.queue_limit = queue_limit
+        self.history_limit = history_limit
+        self._queues: Dict[str, LaneQueue] = {}
+        self._jobs: "OrderedDict[str, SendJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._running = True
+
+    def _queue_for(self, phone: str) -> LaneQueue:
+        jobs = self._queues.get(phone)
+        if jobs is None:
+            jobs = self._queues[phone] = LaneQueue(self.queue_limit)
+            threading.Thread(target=self._worker, args=(phone, jobs), daemon=True,
+                             name=f"cronos-dispatch-{phone}").start()
+        return jobs
+
+    def _remember(self, job: SendJob) -> None:
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.history_limit:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if not oldest.finished:
+                break
+            self._jobs.pop(oldest_id)
+
+    def submit(self, job: SendJob) -> SendJob:
+        """
+        Enfileira o job na sessão correspondente sem bloquear.
+
+        :param job: Job a ser executado.
+        :return: O próprio job (para consulta do id/status).
+        :raises JobQueueFull: Se a fila da sessão estiver cheia.
+        """
+        if not self._running:
+            raise Exception("Dispatcher encerrado.")
+        with self._lock:
+            try:
+                self._queue_for(job.session_phone).put_nowait(job)
+            except JobQueueFull:
+                raise JobQueueFull(f"Fila {job.priority} da sessão {job.session_phone} cheia ({self.queue_limit} jobs).")
+            self._remember(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[SendJob]:
+        """Retorna o job pelo id, ou None se desconhecido."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_size(self, phone: str) -> int:
+        """Quantidade de jobs pendentes na fila da sessão."""
+        jobs = self._queues.get(phone)
+        return jobs.qsize() if jobs else 0
+
+    def _worker(self, phone: str, jobs: LaneQueue) -> None:
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            if not self._running:
+                job.fail("Dispatcher encerrado.")
+                continue
+            job.run(self.manager)
+            if job.status == "failed":
+                log_error(f"Job {job.id} da sessão {phone} falhou: {job.error}", name="JobDispatcher")
+            else:
+                log_info(f"Job {job.id} da sessão {phone} concluído.", name="JobDispatcher")
+
+    def stop(self) -> None:
+        """
+        Para de aceitar jobs; os pendentes são marcados como falhos.
+        """
+        self._running = False
+        with self._lock:
+            for jobs in self._queues.values():
+                for pending in jobs.drain():
+                    pending.fail("Dispatcher encerrado.")
+                jobs.close()
@@ -0,0 +1,79 @@
+from typing import Dict, List, Optional
+from core.configs import settings
+
+# Testa os XPaths na ordem recebida e retorna [posição, elemento, idioma da página] do primeiro que
+# existir (e, com clickable, estiver visível e habilitado); [-1, null, idioma] se nenhum existir.
+_FIND_SCRIPT = """
+const xpaths = arguments[0], clickable = arguments[1];
+const lang = document.documentElement.lang || '';
+for (let i = 0; i < xpaths.length; i++) {
+    let el = null;
+    try {
+        el = document.evaluate(xpaths[i], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    } catch (e) {
+        continue;
+    }
+    if (!el) continue;
+    if (clickable && (el.disabled || !el.getClientRects().length)) continue;
+    return [i, el, lang];
+}
+return [-1, null, lang];
+"""
+
+
+class LocatorCache:
+    """
+    Localiza os elementos lógicos da interface (settings.SELECTOR_CHAINS) a partir de cadeias de
+    seletores alternativos.
+
+    Cada busca testa toda a cadeia numa única chamada JS. O seletor vencedor é lembrado por idioma
+    da página e passa a ser testado primeiro nas próximas buscas; assim, uma busca sem resultado
+    custa uma ida e volta ao navegador, e uma mudança de idioma ou de markup apenas promove outro
+    seletor da cadeia.
+    """
+
+    def __init__(self, winners: Optional[Dict[str, Dict[str, str]]] = None,
+                 chains: Optional[Dict[str, List[str]]] = None) -> None:
+        """
+        :param winners: Dicionário idioma -> {elemento: seletor vencedor}, atualizado no lugar
+                        (WhatsAppSession passa o dos metadados, para persistir entre execuções).
+        :param chains: Cadeias de seletores. Se None, usa settings.SELECTOR_CHAINS.
+        """
+        self.winners = winners if winners is not None else {}
+        self.chains = chains or settings.SELECTOR_CHAINS
+        self.locale = ""
+
+    def candidates(self, name: str) -> List[str]:
+        """Seletores (ainda sem formatação) do elemento, com o vencedor do idioma atual primeiro."""
+        chain = self.chains.get(name) or [getattr(settings, name)]
+        winner = self.winners.get(self.locale, {}).get(name)
+        if winner in chain:
+            return [winner] + [xpath for xpath in chain if xpath != winner]
+        return list(chain)
+
+    def union(self, name: str, **fields) -> str:
+        """XPath único (união da cadeia), para verificações de presença que não precisam do vencedor."""
+        return " | ".join(xpath.format(**fields) for xpath in self.candidates(name))
+
+    def find(self, driver, name: str, clickable: bool = False, **fields):
+        """
+        Busca o elemento numa única chamada JS.
+
+        :param driver: Instância do webdriver do Selenium.
+        :param name: Elemento em settings.SELECTOR_CHAINS (ex.: "MESSAGE_TEXT_BOX").
+        :param clickable: Se True, ignora elementos invisíveis ou desabilitados.
+        :param fields: Valores dos campos dos seletores (ex.: contact_name).
+        :return: WebElement, ou None se nenhum seletor da cadeia encontrar o elemento.
+        """
+        candidates = self.candidates(name)
+        index, element, locale = driver.execute_script(
+            _FIND_SCRIPT, [xpath.format(**fields) for xpath in candidates], clickable)
+        self.locale = locale or ""
+        if element is None:
+            return None
+        self.winners.setdefault(self.locale, {})[name] = candidates[index]
+        return element
+
+    def condition(self, name: str, clickable: bool = False, **fields):
+        """Condição para WebDriverWait: retorna o elemento quando algum seletor da cadeia o encontrar."""
+        return lambda driver: self.find(driver, name, clickable, **fields) or False
@@ -1,9 +1,22 @@
 from core.cronos.session import WhatsAppSession
 from core.cronos.messaging import WhatsAppMessenger
+from core.cronos.media import MediaCache, MediaError
+from core.cronos.health import SessionHealthMonitor
+from core.cronos.inbox import InboundFeed, InboxSubscription
+from core.cronos.profiles import prune_profiles
+from core.cronos.proxy_manager import ProxyManager
+from core.cronos.recipients import SuppressionIndex, normalize_e164
+from core.cronos.results import ResultStore
+from core.cronos.timeouts import AdaptiveTimeouts
+from core.cronos.watchdog import MemoryWatchdog
 from core.utils.logger import log_info, log_error
+from core.configs import settings
 from core.configs.settings import CLOSE_TIMEOUT
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
 
 class CronosManager:
     """
@@ -15,12 +28,99 @@ class CronosManager:
     
     def __init__(self):
         """
-        Inicializa o CronosManager com um dicionário vazio de sessões.
+        Inicializa o CronosManager com um dicionário vazio de sessões, o cache de mídias
+        usado para validar e preparar os anexos antes do envio, o monitor de saúde das sessões,
+        o feed de mensagens recebidas, o gerenciador de proxies (settings.PROXIES), o watchdog
+        de memória, que recicla os navegadores acima do orçamento entre dois envios, a lista de
+        descadastro consultada antes dos envios para não contatos, o registro dos resultados
+        de cada envio (etapas, tempos e erros), gravado em lotes em segundo plano, e os timeouts
+        adaptativos de cada sessão, derivados da latência observada nas esperas.
         """
         self.sessions: dict[str, WhatsAppSession] = {}
         self._timers: dict[str, threading.Timer] = {}
+        self.media = MediaCache()
+        self._session_locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.health = SessionHealthMonitor(self)
+        self.health.start()
+        self.inbox = InboundFeed(self)
+        self.proxies = ProxyManager(list(settings.PROXIES), on_degraded=self._on_proxy_degraded)
+        if self.proxies.proxies:
+            self.proxies.start()
+        self.watchdog = MemoryWatchdog(self)
+        self.watchdog.start()
+        self.suppression = SuppressionIndex()
+        self.results = ResultStore()
+        self.results.start()
+        self.timeouts = AdaptiveTimeouts()
 
 
+    def session_lock(self, phone: str) -> threading.Lock:
+        """
+        Retorna o lock da sessão, mantido durante cada envio. Operações de manutenção
+        (reinício, reciclagem) o adquirem para agir somente entre um envio e outro.
+        """
+        with self._locks_guard:
+            if phone not in self._session_locks:
+                self._session_locks[phone] = threading.Lock()
+            return self._session_locks[phone]
+
+    def _circuit_allows(self, phone: str) -> bool:
+        """Falha rápido quando o circuito da sessão está aberto (sessão quebrada ou reiniciando)."""
+        breaker = self.health.breaker(phone)
+        if breaker.allow():
+            return True
+        log_error(f"Circuito aberto para a sessão {phone} ({breaker.reason}); envio recusado.", name="CronosManager")
+        return False
+
+    def check_session_health(self, phone_number: str) -> dict:
+        """
+        Verifica sob demanda a saúde da sessão; se estiver quebrada, o circuito é aberto e a
+        sessão é reiniciada em segundo plano.
+
+        :param phone_number: Número da sessão.
+        :return: Dicionário {"healthy": bool, "reason": str | None}.
+        """
+        return self.health.check(phone_number)
+
+    def subscribe_inbox(self, phone_number: str = None, limit: int = None) -> InboxSubscription:
+        """
+        Assina as mensagens recebidas, entregues assim que o observador da página as detecta.
+
+        Uso: ``for message in manager.subscribe_inbox(phone): ...`` ou
+        ``async for message in manager.subscribe_inbox(phone): ...``.
+
+        :param phone_number: Número da sessão. Se None, recebe as mensagens de todas as sessões.
+        :param limit: Máximo de mensagens pendentes na assinatura. Se None, usa settings.INBOX_QUEUE_LIMIT.
+        :return: InboxSubscription (chame close() para encerrar).
+        """
+        return self.inbox.subscribe(phone_number, limit)
+
+    def timeout_metrics(self) -> dict:
+        """
+        Latências observadas e timeouts atuais de cada sessão, por etapa.
+
+        :return: {"<número>": {"<etapa>": {"samples": int, "p50": s, "p99": s, "timeout": s}}}
+        """
+        return self.timeouts.snapshot()
+
+    def _on_proxy_degraded(self, proxy: str) -> None:
+        """Move as sessões que usam o proxy degradado para o melhor proxy saudável, em segundo plano."""
+        for phone, session in list(self.sessions.items()):
+            if session.proxy == proxy:
+                threading.Thread(target=self._move_session_proxy, args=(phone, session), daemon=True,
+                                 name=f"cronos-proxy-{phone}").start()
+
+    def _move_session_proxy(self, phone: str, session: WhatsAppSession) -> None:
+        with self.session_lock(phone):
+            if self.proxies.is_healthy(session.proxy):
+                return  # O proxy se recuperou enquanto aguardava o envio em andamento
+            try:
+                session.change_proxy()
+                log_info(f"Sessão {phone} movida para o proxy {session.proxy}.", name="CronosManager")
+            except Exception as e:
+                log_error(f"Erro ao trocar o proxy da sessão {phone}: {e}", name="CronosManager")
+
     def _schedule_close(self, phone: str):
         """Agenda o fechamento da sessão se ela ainda estiver pendente."""
         def _close_if_pending():
@@ -40,6 +140,21 @@ class CronosManager:
         t.start()
         self._timers[phone] = t
 
+    def _session_proxy(self, stored: Optional[str]) -> Optional[str]:
+        """
+        Escolhe o proxy de uma nova sessão: mantém o proxy salvo nos metadados enquanto ele
+        estiver no pool e saudável (trocar de IP sem motivo chama a atenção do WhatsApp) e só
+        recorre a get_best_proxy() quando ele está degradado, fora do pool ou ausente.
+
+        :param stored: Proxy salvo nos metadados da sessão (ou None).
+        :return: Proxy a usar, ou o salvo/None se não houver pool configurado.
+        """
+        if not self.proxies.proxies:
+            return stored
+        if stored in self.proxies.proxies and self.proxies.is_healthy(stored):
+            return stored
+        return self.proxies.get_best_proxy()
+
     def get_session(self, phone_number: str, use_vpn: bool = False) -> tuple[WhatsAppSession, dict]:
         """
         Recupera ou cria uma sessão do WhatsApp para o número fornecido.
@@ -56,7 +171,9 @@ class CronosManager:
         """
         if phone_number not in self.sessions:
             log_info(f"Criando nova sessão para {phone_number}", name="CronosManager")
-            session = WhatsAppSession(phone_number, use_vpn=use_vpn)
+            session = WhatsAppSession(phone_number, use_vpn=use_vpn, proxy_manager=self.proxies,
+                                      timeouts=self.timeouts.for_session(phone_number))
+            session.proxy = self._session_proxy(session.proxy)
             status = session.ensure_logged_in()  # {'status': 'qr_required', 'qr_code': '<path>'} ou {'status':'logged_in'}
             self.sessions[phone_number] = session
 
@@ -94,6 +211,8 @@ class CronosManager:
 
         :param session_phone_number: Número do telefone da sessão que será utilizada.
         :param target_phone_number: Número de telefone de destino (não contato, ex: 5511999998888).
+                                    É normalizado para E.164; números inválidos ou descadastrados
+                                    são recusados sem abrir o navegador.
         :param text_message: Mensagem de texto a ser enviada.
         :param image_path: Caminho para imagem (opcional).
         :param audio_path: Caminho para áudio (opcional).
@@ -101,38 +220,56 @@ class CronosManager:
         :param use_vpn: Indica se a VPN deve ser utilizada para essa sessão.
         :return: True se a mensagem completa foi enviada com sucesso; False caso contrário.
         """
+        trace = self.results.trace(session_phone_number, target_phone_number, "non_contact")
+        e164 = normalize_e164(target_phone_number)
+        if e164 is None:
+            log_error(f"Número de destino inválido: {target_phone_number!r}; envio recusado.", name="CronosManager")
+            trace.reject("number", "número inválido")
+            return False
+        if e164 in self.suppression:
+            log_error(f"Número {e164} descadastrado; envio recusado.", name="CronosManager")
+            trace.reject("suppressed", "número descadastrado")
+            return False
+        target_phone_number = trace.fields["target"] = e164[1:]
         try:
-            session, login_status = self.get_session(session_phone_number, use_vpn=use_vpn)
-            if login_status.get("status") != "logged_in":
-                log_error("Sessão não autenticada; não é possível enviar mensagem completa.", name="CronosManager")
+            # Valida/prepara os anexos antes de tocar no navegador: anexos inválidos falham aqui.
+            image_path = self.media.prepare(image_path, "image")
+            audio_path = self.media.prepare(audio_path, "audio")
+            document_path = self.media.prepare(document_path, "document")
+            if not self._circuit_allows(session_phone_number):
+                trace.reject("circuit", self.health.breaker(session_phone_number).reason or "circuito aberto")
                 return False
-            messenger = WhatsAppMessenger(session.driver)
-            time.sleep(5)
-            
-            # Abre o chat para o número não contato.
-            # Aqui você pode chamar um método específico, por exemplo: open_chat_non_contact(target_phone_number)
-            # Se esse método não existir, você pode usar send_message_to_non_contact para abrir o chat sem enviar mensagem.
-            messenger.open_chat_non_contact(target_phone_number)
-            time.sleep(5)
-            
-            if image_path:
-                messenger.send_image(image_path)
-                time.sleep(5)
-            if text_message:
-                messenger.send_message(text_message)
-                time.sleep(5)
-            if audio_path:
-                messenger.send_audio(audio_path)
-                time.sleep(5)
-            if document_path:
-                messenger.send_document(document_path)
+            with self.session_lock(session_phone_number):
+                with trace.step("session"):
+                    session, login_status = self.get_session(session_phone_number, use_vpn=use_vpn)
+                if login_status.get("status") != "logged_in":
+                    log_error("Sessão não autenticada; não é possível enviar mensagem completa.", name="CronosManager")
+                    trace.reject("login", login_status.get("status"))
+                    self.health.breaker(session_phone_number).release(f"login: {login_status.get('status')}")
+                    return False
+                messenger = WhatsAppMessenger(session.driver, uploader=session.uploader, timeouts=session.timeouts,
+                                              locators=session.locators, devtools=session.devtools)
                 time.sleep(5)
             
-            messenger.exit_chat()
-            log_info(f"Mensagem completa enviada para o número não contato {target_phone_number} usando o número {session_phone_number}", name="CronosManager")
+                # Abre o chat para o número não contato.
+                with trace.step("open_chat"):
+                    messenger.open_chat_non_contact(target_phone_number)
+                time.sleep(5)
+                self._send_contents(messenger, trace, text_message, image_path, audio_path, document_path)
+                with trace.step("exit_chat"):
+                    messenger.exit_chat()
+                log_info(f"Mensagem completa enviada para o número não contato {target_phone_number} usando o número {session_phone_number}", name="CronosManager")
+            self.health.record_success(session_phone_number)
+            trace.finish(True)
             return True
+        except MediaError as e:
+            log_error(f"Anexo inválido; envio cancelado antes de abrir a sessão: {e}", name="CronosManager")
+            trace.reject("media", str(e))
+            return False
         except Exception as e:
             log_error(f"Erro ao enviar mensagem completa para o número não contato {target_phone_number} usando {session_phone_number}: {e}", name="CronosManager")
+            self.health.record_failure(session_phone_number, str(e))
+            trace.finish(False)
             return False
         
 
@@ -151,57 +288,242 @@ class CronosManager:
         :param use_vpn: Indica se a VPN deve ser utilizada para esta sessão.
         :return: True se a mensagem completa foi enviada com sucesso; False caso contrário.
         """
+        trace = self.results.trace(phone_number, chat_id, "contact")
         try:
-            session, login_status = self.get_session(phone_number, use_vpn=use_vpn)
-            if login_status.get("status") != "logged_in":
-                log_error("Sessão não autenticada; não é possível enviar mensagem completa.", name="CronosManager")
+            # Valida/prepara os anexos antes de tocar no navegador: anexos inválidos falham aqui.
+            image_path = self.media.prepare(image_path, "image")
+            audio_path = self.media.prepare(audio_path, "audio")
+            document_path = self.media.prepare(document_path, "document")
+            if not self._circuit_allows(phone_number):
+                trace.reject("circuit", self.health.breaker(phone_number).reason or "circuito aberto")
                 return False
-            messenger = WhatsAppMessenger(session.driver)
-            time.sleep(5)
-            messenger.open_chat(chat_id)
-            
-            if image_path:
-                messenger.send_image(image_path)
+            with self.session_lock(phone_number):
+                with trace.step("session"):
+                    session, login_status = self.get_session(phone_number, use_vpn=use_vpn)
+                if login_status.get("status") != "logged_in":
+                    log_error("Sessão não autenticada; não é possível enviar mensagem completa.", name="CronosManager")
+                    trace.reject("login", login_status.get("status"))
+                    self.health.breaker(phone_number).release(f"login: {login_status.get('status')}")
+                    return False
+                messenger = WhatsAppMessenger(session.driver, uploader=session.uploader, timeouts=session.timeouts,
+                                              locators=session.locators, devtools=session.devtools)
                 time.sleep(5)
-            if text_message:
-                messenger.send_message(text_message)
-                time.sleep(5)
-            if audio_path:
-                messenger.send_audio(audio_path)
-                time.sleep(5)
-            if document_path:
-                messenger.send_document(document_path)
-                time.sleep(5)
-                
-            messenger.exit_chat()
-            log_info(f"Mensagem completa enviada para {chat_id} usando o número {phone_number}", name="CronosManager")
+                with trace.step("open_chat"):
+                    messenger.open_chat(chat_id)
+                self._send_contents(messenger, trace, text_message, image_path, audio_path, document_path)
+                with trace.step("exit_chat"):
+                    messenger.exit_chat()
+                log_info(f"Mensagem completa enviada para {chat_id} usando o número {phone_number}", name="CronosManager")
+            self.health.record_success(phone_number)
+            trace.finish(True)
             return True
+        except MediaError as e:
+            log_error(f"Anexo inválido; envio cancelado antes de abrir a sessão: {e}", name="CronosManager")
+            trace.reject("media", str(e))
+            return False
         except Exception as e:
             log_error(f"Erro ao enviar mensagem completa para {chat_id} usando {phone_number}: {e}", name="CronosManager")
+            self.health.record_failure(phone_number, str(e))
+            trace.finish(False)
             return False
 
-    def close_all_sessions(self):
+    def _send_contents(self, messenger: WhatsAppMessenger, trace, text_message: str, image_path: str,
+                       audio_path: str, document_path: str) -> None:
+        """Envia imagem, texto, áudio e documento (nessa ordem) no chat aberto, registrando cada etapa."""
+        if image_path:
+            with trace.step("image"):
+                messenger.send_image(image_path)
+            time.sleep(5)
+        if text_message:
+            with trace.step("text"):
+                messenger.send_message(text_message)
+            time.sleep(5)
+        if audio_path:
+            with trace.step("audio"):
+                messenger.send_audio(audio_path)
+            time.sleep(5)
+        if document_path:
+            with trace.step("document"):
+                messenger.send_document(document_path)
+            time.sleep(5)
+
+    def start_sessions(self, phones: list[str], use_vpn: bool = False,
+                       max_workers: int = None) -> dict[str, dict]:
+        """
+        Inicia (ou consulta) várias sessões em paralelo, num pool limitado de threads.
+
+        :param phones: Números das sessões.
+        :param use_vpn: Indica se a VPN deve ser aplicada às sessões.
+        :param max_workers: Máximo de sessões iniciadas ao mesmo tempo. Se None, usa settings.SESSION_POOL_WORKERS.
+        :return: Dicionário número -> status do login (mesmo formato de get_session) ou
+                 {"status": "error", "error": "<mensagem>"} para as sessões que falharam.
+        """
+        results: dict[str, dict] = {}
+        unique = list(dict.fromkeys(phones))
+
+        def _start(phone: str) -> tuple[WhatsAppSession, dict]:
+            # Mesmo lock dos envios: um envio ou login simultâneo não cria um segundo navegador no perfil.
+            with self.session_lock(phone):
+                return self.get_session(phone, use_vpn)
+
+        with ThreadPoolExecutor(max_workers=max_workers or settings.SESSION_POOL_WORKERS) as pool:
+            futures = {pool.submit(_start, phone): phone for phone in unique}
+            for future in as_completed(futures):
+                phone = futures[future]
+                try:
+                    _, results[phone] = future.result()
+                except Exception as e:
+                    log_error(f"Erro ao iniciar sessão {phone}: {e}", name="CronosManager")
+                    results[phone] = {"status": "error", "error": str(e)}
+        log_info(f"{len(unique)} sessão(ões) iniciada(s) em paralelo.", name="CronosManager")
+        return results
+
+    def close_all_sessions(self, max_workers: int = None) -> dict[str, bool]:
         """
         Encerra todas as sessões ativas e limpa o dicionário de sessões.
         
-        Para cada sessão, tenta encerrar o driver de forma segura e registra o sucesso
-        ou eventuais erros ocorridos durante o encerramento.
+        Os drivers são encerrados em paralelo, num pool limitado de threads; para cada sessão
+        registra o sucesso ou eventuais erros ocorridos durante o encerramento.
+
+        :param max_workers: Máximo de sessões encerradas ao mesmo tempo. Se None, usa settings.SESSION_POOL_WORKERS.
+        :return: Dicionário número -> True se a sessão foi encerrada sem erros.
         """
-        for phone, session in self.sessions.items():
+        def _close(phone: str, session: WhatsAppSession) -> bool:
             try:
-                session.close()
-                log_info(f"Encerrada sessão para o número {phone}", name="CronosManager")
+                closed = session.close()
             except Exception as e:
                 log_error(f"Erro ao encerrar sessão para {phone}: {e}", name="CronosManager")
+                return False
+            if closed:
+                log_info(f"Encerrada sessão para o número {phone}", name="CronosManager")
+            else:
+                log_error(f"Sessão {phone} encerrada com erro no driver.", name="CronosManager")
+            return closed
+
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        sessions = list(self.sessions.items())
         self.sessions.clear()
+        results: dict[str, bool] = {}
+        if sessions:
+            with ThreadPoolExecutor(max_workers=max_workers or settings.SESSION_POOL_WORKERS) as pool:
+                futures = {pool.submit(_close, phone, session): phone for phone, session in sessions}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
         log_info("Todas as sessões foram encerradas.", name="CronosManager")
+        return results
+
+    def shutdown(self) -> dict[str, bool]:
+        """
+        Encerra o gerenciador: para as verificações de saúde, o watchdog, a verificação dos
+        proxies e a leitura de mensagens, fecha todas as sessões e grava os resultados de envio
+        ainda na fila (as threads de segundo plano são daemon: sem shutdown(), o que estiver na
+        fila ao fim do processo é perdido).
+
+        :return: Resultado de close_all_sessions().
+        """
+        self.health.stop()
+        self.watchdog.stop()
+        self.proxies.stop()
+        self.inbox.stop()
+        closed = self.close_all_sessions()
+        self.results.stop(settings.RESULTS_STOP_TIMEOUT)
+        self.suppression.close()
+        log_info("CronosManager encerrado.", name="CronosManager")
+        return closed
+
+    def restore_sessions(self, cold_start: bool = False) -> dict[str, dict]:
+        """
+        Recupera as sessões cujos navegadores continuam em execução após o reinício do processo
+        (ex.: deploy), reanexando o driver em vez de iniciar um novo Chrome.
 
-    def close_session(self, phone_number: str):
-        """Método público para encerrar manualmente a sessão."""
+        :param cold_start: Se True, sessões cujo navegador não está mais em execução também são
+                           reabertas (a frio); se False, são ignoradas.
+        :return: Dicionário número -> status do login das sessões recuperadas.
+        """
+        restored = {}
+        for metadata_file in Path(settings.COOKIE_DIR).glob(f"*/*{settings.METADATA_FILENAME}"):
+            phone = metadata_file.parent.name
+            if phone in self.sessions:
+                continue
+            try:
+                session = WhatsAppSession(phone, proxy_manager=self.proxies, timeouts=self.timeouts.for_session(phone))
+                if not session.browser_alive() and not cold_start:
+                    continue
+                status = session.ensure_logged_in()
+                self.sessions[phone] = session
+                if status.get("status") == "qr_required":
+                    self._schedule_close(phone)
+                restored[phone] = status
+                how = "reanexada" if session.attached else "reaberta"
+                log_info(f"Sessão {phone} {how} ({status.get('status')}).", name="CronosManager")
+            except Exception as e:
+                log_error(f"Erro ao recuperar sessão {phone}: {e}", name="CronosManager")
+        return restored
+
+    def detach_all_sessions(self):
+        """
+        Desconecta todas as sessões sem fechar os navegadores, para que um novo processo
+        as recupere com restore_sessions() (reinício sem derrubar os envios).
+        """
+        for phone, session in self.sessions.items():
+            timer = self._timers.pop(phone, None)
+            if timer:
+                timer.cancel()
+            session.detach()
+        self.sessions.clear()
+        log_info("Todas as sessões foram desanexadas.", name="CronosManager")
+
+    def close_session(self, phone_number: str) -> bool:
+        """
+        Método público para encerrar manualmente a sessão.
+
+        :return: False se o driver da sessão não encerrou corretamente; True caso contrário.
+        """
         sess = self.sessions.pop(phone_number, None)
         timer = self._timers.pop(phone_number, None)
         if timer:
             timer.cancel()
-        if sess:
-            sess.close()
-            log_info(f"Sessão {phone_number} fechada manualmente.", name="CronosManager")
+        if not sess:
+            return True
+        closed = sess.close()
+        log_info(f"Sessão {phone_number} fechada manualmente.", name="CronosManager")
+        return closed
+
+    def export_session(self, phone_number: str, archive_path, incremental: bool = True) -> dict:
+        """
+        Encerra a sessão (entre dois envios) e exporta o seu estado de login, para movê-la a outro host.
+
+        :param phone_number: Número da sessão.
+        :param archive_path: Arquivo de destino (.tar.gz).
+        :param incremental: Se True, inclui apenas os arquivos alterados desde a última exportação.
+        :return: Manifesto da exportação.
+        """
+        with self.session_lock(phone_number):
+            self.close_session(phone_number)
+            session = WhatsAppSession(phone_number, proxy_manager=self.proxies)
+            return session.export_profile(archive_path, incremental)
+
+    def import_session(self, phone_number: str, *archive_paths) -> dict:
+        """
+        Importa o estado de login exportado em outro host; a sessão é aberta no próximo get_session.
+
+        :param phone_number: Número da sessão.
+        :param archive_paths: Arquivos exportados (o completo seguido dos incrementais, em ordem).
+        :return: Manifesto do estado importado.
+        """
+        with self.session_lock(phone_number):
+            if phone_number in self.sessions:
+                raise Exception(f"A sessão {phone_number} está aberta neste host; encerre-a antes de importar.")
+            session = WhatsAppSession(phone_number, proxy_manager=self.proxies)
+            return session.import_profile(*archive_paths)
+
+    def prune_profiles(self) -> dict:
+        """
+        Remove os caches do Chrome (settings.PROFILE_PRUNE_PATHS) dos perfis sem navegador em
+        execução; as sessões abertas são ignoradas.
+
+        :return: Dicionário número -> bytes liberados.
+        """
+        return prune_profiles(skip=list(self.sessions))
@@ -0,0 +1,260 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from core.configs import settings
+from core.utils.logger import log_info, log_error
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow é opcional: sem ele as imagens são apenas validadas.
+    Image = ImageOps = None
+
+# Tag EXIF de orientação: valores diferentes de 1 indicam que a imagem precisa ser rotacionada.
+_EXIF_ORIENTATION = 0x0112
+
+_digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+def file_digest(path: str) -> str:
+    """
+    Retorna o SHA-256 do arquivo, memorizado por (caminho, tamanho, mtime) para que o mesmo
+    anexo não seja lido novamente a cada envio.
+
+    :param path: Caminho do arquivo.
+    :return: Hash hexadecimal do conteúdo.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        cached = _digests.get(key)
+        if cached:
+            _digests.move_to_end(key)
+            return cached
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    value = sha.hexdigest()
+    with _digests_lock:
+        _digests[key] = value
+        while len(_digests) > settings.MEDIA_DIGEST_MEMO_SIZE:
+            _digests.popitem(last=False)
+    return value
+
+
+class MediaError(Exception):
+    """Levantada quando um anexo é inválido (inexistente, grande demais ou de tipo incorreto)."""
+
+
+def _is_image(head: bytes) -> bool:
+    return (head.startswith(b"\xff\xd8\xff") or head.startswith(b"\x89PNG\r\n\x1a\n")
+            or head[:6] in (b"GIF87a", b"GIF89a") or (head[:4] == b"RIFF" and head[8:12] == b"WEBP"))
+
+
+def _is_audio(head: bytes) -> bool:
+    return (head.startswith(b"OggS") or head.startswith(b"ID3") or head.startswith(b"#!AMR")
+            or head.startswith(b"fLaC") or (head[:4] == b"RIFF" and head[8:12] == b"WAVE")
+            or head[4:8] == b"ftyp" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0))
+
+
+class MediaCache:
+    """
+    Valida e prepara os anexos antes do envio, guardando os resultados num cache endereçado
+    pelo hash (SHA-256) do conteúdo.
+
+    - Tamanho e tipo (assinatura do arquivo) são verificados antes de qualquer etapa no navegador.
+    - Imagens grandes ou com rotação EXIF podem ser reduzidas/recodificadas (Pillow) e áudios
+      convertidos para OGG/Opus (ffmpeg); cada conteúdo distinto é processado uma única vez.
+      Imagens já dentro dos limites e imagens animadas são enviadas sem alteração.
+    - O cache tem tamanho limitado e descarta os arquivos usados há mais tempo (LRU), exceto os
+      usados nos últimos settings.MEDIA_CACHE_EVICT_GRACE segundos.
+    """
+
+    def __init__(self, cache_dir: Path = settings.MEDIA_CACHE_DIR,
+                 max_bytes: int = settings.MEDIA_CACHE_MAX_BYTES,
+                 optimize_images: bool = settings.MEDIA_OPTIMIZE_IMAGES,
+                 convert_audio: bool = settings.MEDIA_CONVERT_AUDIO) -> None:
+        """
+        Inicializa o cache.
+
+        :param cache_dir: Diretório do cache.
+        :param max_bytes: Tamanho máximo ocupado pelo cache.
+        :param optimize_images: Se True, reduz/recodifica imagens (quando o Pillow estiver instalado).
+        :param convert_audio: Se True, converte áudios para OGG/Opus (quando o ffmpeg estiver disponível).
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.optimize_images = optimize_images and Image is not None
+        self.convert_audio = convert_audio and shutil.which("ffmpeg") is not None
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._size = sum(f.stat().st_size for f in self.cache_dir.rglob("*") if f.is_file())
+
+    def digest(self, path: str) -> str:
+        """
+        Retorna o SHA-256 do arquivo (ver file_digest()).
+
+        :param path: Caminho do arquivo.
+        :return: Hash hexadecimal do conteúdo.
+        """
+        return file_digest(path)
+
+    def validate(self, path: str, kind: str) -> None:
+        """
+        Verifica existência, tamanho e tipo do anexo.
+
+        :param path: Caminho do arquivo.
+        :param kind: "image", "audio" ou "document".
+        :raises MediaError: Se o anexo for inválido.
+        """
+        if kind not in settings.MEDIA_MAX_SIZE:
+            raise MediaError(f"Tipo de anexo desconhecido: {kind}")
+        if not os.path.isfile(path):
+            raise MediaError(f"Arquivo não encontrado: {path}")
+        size = os.path.getsize(path)
+        if size == 0:
+            raise MediaError(f"Arquivo vazio: {path}")
+        limit = settings.MEDIA_MAX_SIZE[kind]
+        if size > limit and not (kind == "image" and self.optimize_images):
+            raise MediaError(f"Arquivo {path} excede o limite de {limit} bytes para {kind} ({size} bytes).")
+        with open(path, "rb") as f:
+            head = f.read(16)
+        if kind == "image" and not _is_image(head):
+            raise MediaError(f"Arquivo {path} não é uma imagem suportada (JPEG, PNG, GIF ou WEBP).")
+        if kind == "audio" and not _is_audio(head):
+            raise MediaError(f"Arquivo {path} não é um áudio suportado.")
+
+    def prepare(self, path: Optional[str], kind: str) -> Optional[str]:
+        """
+        Valida o anexo e devolve o caminho a ser enviado (processado e em cache, se aplicável).
+
+        :param path: Caminho do arquivo (None é devolvido sem alterações).
+        :param kind: "image", "audio" ou "document".
+        :return: Caminho do arquivo a ser usado no envio.
+        :raises MediaError: Se o anexo for inválido ou o processamento falhar.
+        """
+        if not path:
+            return path
+        self.validate(path, kind)
+        if kind == "image" and self.optimize_images:
+            if not self._needs_processing(path):
+                return path
+            variant, suffix = f"img{settings.MEDIA_IMAGE_MAX_SIDE}q{settings.MEDIA_IMAGE_QUALITY}", None
+        elif kind == "audio" and self.convert_audio:
+            variant, suffix = "opus", ".ogg"
+        else:
+            return path
+        digest = self.digest(path)
+        with self._lock:
+            key_lock = self._locks.setdefault(f"{digest}-{variant}", threading.Lock())
+        target_dir = self.cache_dir / digest[:2]
+        with key_lock:
+            target_dir.mkdir(parents=True, exist_ok=True)
+            existing = next((f for f in target_dir.glob(f"{digest}-{variant}.*") if ".tmp" not in f.name), None)
+            if existing:
+                os.utime(existing)  # Marca como usado recentemente (LRU)
+                return str(existing)
+            if kind == "image":
+                output = self._process_image(path, target_dir / f"{digest}-{variant}")
+            else:
+                output = self._process_audio(path, target_dir / f"{digest}-{variant}{suffix}")
+        self._track(output)
+        log_info(f"Anexo {path} processado e armazenado em cache ({output}).", name="MediaCache")
+        return str(output)
+
+    def _needs_processing(self, path: str) -> bool:
+        """
+        Indica se a imagem precisa ser recodificada: acima do limite de tamanho ou de dimensão, ou
+        com rotação EXIF. Imagens animadas (GIF/WEBP) nunca são recodificadas, para não perderem
+        os quadros; se estiverem acima do limite, são recusadas.
+
+        :raises MediaError: Se a imagem estiver corrompida ou for animada e acima do limite.
+        """
+        try:
+            with Image.open(path) as img:  # Lê apenas o cabeçalho
+                animated = getattr(img, "is_animated", False)
+                orientation = img.getexif().get(_EXIF_ORIENTATION, 1)
+                width, height = img.size
+        except Exception as e:
+            log_error(f"Imagem inválida ou corrompida {path}: {e}", name="MediaCache")
+            raise MediaError(f"Imagem inválida ou corrompida: {path}")
+        too_big = os.path.getsize(path) > settings.MEDIA_MAX_SIZE["image"]
+        if animated:
+            if too_big:
+                raise MediaError(f"Imagem animada {path} excede o limite de {settings.MEDIA_MAX_SIZE['image']} bytes.")
+            return False
+        return too_big or orientation != 1 or max(width, height) > settings.MEDIA_IMAGE_MAX_SIDE
+
+    def _process_image(self, path: str, base: Path) -> Path:
+        """Aplica a rotação EXIF, reduz e recodifica a imagem; mantém PNG quando há transparência."""
+        tmp = None
+        try:
+            try:
+                with Image.open(path) as img:
+                    img = ImageOps.exif_transpose(img)
+                    img.thumbnail((settings.MEDIA_IMAGE_MAX_SIDE, settings.MEDIA_IMAGE_MAX_SIDE))
+                    has_alpha = img.mode in ("RGBA", "LA") or "transparency" in img.info
+                    output = base.with_suffix(".png" if has_alpha else ".jpg")
+                    tmp = output.with_name(output.name + ".tmp")
+                    if has_alpha:
+                        img.save(tmp, format="PNG", optimize=True)
+                    else:
+                        img.convert("RGB").save(tmp, format="JPEG", quality=settings.MEDIA_IMAGE_QUALITY,
+                                                optimize=True)
+            except Exception as e:
+                log_error(f"Imagem inválida ou corrompida {path}: {e}", name="MediaCache")
+                raise MediaError(f"Imagem inválida ou corrompida: {path}")
+            if tmp.stat().st_size > settings.MEDIA_MAX_SIZE["image"]:
+                raise MediaError(f"Imagem {path} continua acima do limite após a redução.")
+            os.replace(tmp, output)
+            return output
+        finally:
+            if tmp is not None:
+                tmp.unlink(missing_ok=True)
+
+    def _process_audio(self, path: str, output: Path) -> Path:
+        """Converte o áudio para OGG/Opus mono, o formato das mensagens de voz."""
+        tmp = output.with_name(output.name + ".tmp.ogg")
+        cmd = ["ffmpeg", "-y", "-loglevel", "error", "-i", str(path), "-vn", "-ac", "1", "-ar", "48000",
+               "-c:a", "libopus", "-b:a", "32k", str(tmp)]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, timeout=120)
+        except Exception as e:
+            tmp.unlink(missing_ok=True)
+            log_error(f"Erro ao converter áudio {path}: {e}", name="MediaCache")
+            raise MediaError(f"Áudio inválido ou não conversível: {path}")
+        os.replace(tmp, output)
+        return output
+
+    def _track(self, added: Path) -> None:
+        """Contabiliza o novo arquivo e descarta os menos usados se o limite for excedido."""
+        with self._lock:
+            self._size += added.stat().st_size
+            if self._size <= self.max_bytes:
+                return
+            # Arquivos temporários e usados recentemente podem estar sendo gerados ou enviados.
+            recent = time.time() - settings.MEDIA_CACHE_EVICT_GRACE
+            files = sorted((f for f in self.cache_dir.rglob("*")
+                            if f.is_file() and f != added and ".tmp" not in f.name),
+                           key=lambda f: f.stat().st_mtime)
+            for f in files:
+                if self._size <= self.max_bytes:
+                    break
+                if f.stat().st_mtime > recent:
+                    log_error("Cache de mídia acima do limite, mas os arquivos restantes estão em uso.",
+                              name="MediaCache")
+                    break
+                try:
+                    size = f.stat().st_size
+                    f.unlink()
+                    self._size -= size
+                except OSError as e:
+                    log_error(f"Erro ao remover {f} do cache: {e}", name="MediaCache")
@@ -1,24 +1,280 @@
+import base64
+import json
 import logging
-from selenium.webdriver.common.by import By
+import mimetypes
+import os
+import time
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from core.configs import settings
+from core.cronos.devtools import DevToolsError
+from core.cronos.locators import LocatorCache
+
+# Cola o texto no campo de mensagem numa única operação (evento "paste" tratado pelo editor do
+# WhatsApp Web). Se o editor não tratar o evento, recorre ao execCommand("insertText").
+_INSERT_TEXT_SCRIPT = """
+const box = arguments[0], text = arguments[1];
+box.focus();
+const data = new DataTransfer();
+data.setData('text/plain', text);
+box.dispatchEvent(new ClipboardEvent('paste', {clipboardData: data, bubbles: true, cancelable: true}));
+if (!box.textContent.trim()) {
+    document.execCommand('insertText', false, text);
+}
+return box.innerText;
+"""
+
+# Foca o campo de mensagem (primeiro XPath da cadeia encontrado) para o Input.insertText do canal
+# DevTools; com arguments[1], retorna o texto do campo em vez de focá-lo.
+_FOCUS_TEXT_BOX_SCRIPT = """
+for (const xpath of arguments[0]) {
+    const box = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (!box) continue;
+    if (arguments[1]) return box.innerText;
+    box.focus();
+    return true;
+}
+return null;
+"""
+
+# Expressão avaliada via DevTools (Runtime.evaluate): primeiro nó encontrado pela cadeia de XPaths.
+_FIND_NODE_EXPRESSION = """
+(() => {
+    for (const xpath of %s) {
+        const node = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        if (node) return node;
+    }
+    return null;
+})()
+"""
+
+# Solta o arquivo (conteúdo em base64) sobre o painel da conversa, como um arrastar e soltar do
+# usuário: o WhatsApp Web abre a pré-visualização do anexo sem passar pelo menu de anexos.
+_DROP_FILE_SCRIPT = """
+const target = arguments[0];
+const bytes = Uint8Array.from(atob(arguments[1]), c => c.charCodeAt(0));
+const data = new DataTransfer();
+data.items.add(new File([bytes], arguments[2], {type: arguments[3]}));
+for (const type of ['dragenter', 'dragover', 'drop']) {
+    target.dispatchEvent(new DragEvent(type, {dataTransfer: data, bubbles: true, cancelable: true}));
+}
+return true;
+"""
+
+# Inputs que aceitam o caminho por drop: o WhatsApp Web decide o tipo do anexo solto pelo conteúdo
+# (uma imagem vira mídia comprimida), então documentos só são anexados pelo input de documento.
+_DROP_INPUTS = ("IMAGE_INPUT", "AUDIO_INPUT")
 
 
 class WhatsAppMessenger:
-    def __init__(self, driver, wait_time=10):
+    def __init__(self, driver, wait_time=10, uploader=None, timeouts=None, locators=None, devtools=None):
         """
         Inicializa o objeto WhatsAppMessenger com um driver do Selenium e tempo de espera padrão.
         
         :param driver: Instância do webdriver do Selenium
         :param wait_time: Tempo máximo para espera explícita de elementos (em segundos)
+        :param uploader: UploadCache da sessão, para reaproveitar arquivos já enviados a um nó remoto (opcional)
+        :param timeouts: SessionTimeouts da sessão; se informado, substitui wait_time pelo timeout adaptativo (opcional)
+        :param locators: LocatorCache da sessão, com os seletores vencedores já conhecidos (opcional)
+        :param devtools: DevToolsChannel da sessão, para inserir texto e definir anexos sem passar pelo chromedriver (opcional)
         """
         self.driver = driver
         self.wait_time = wait_time
+        self.uploader = uploader
+        self.timeouts = timeouts
+        self.locators = locators or LocatorCache()
+        self.devtools = devtools
         self.logger = logging.getLogger(self.__class__.__name__)
     
     
+    def _wait(self, name, clickable=False, **fields):
+        """
+        Aguarda o elemento da cadeia de seletores com o timeout da etapa e registra a latência observada.
+
+        Cada seletor é uma etapa própria (ex.: "SEND_BUTTON", "CONTACT_ROW"), com histograma e timeout
+        próprios. Esperas que estouram o timeout não entram no histograma; são apenas contadas.
+
+        :param name: Nome da cadeia em settings.SELECTOR_CHAINS (também usado como etapa do timeout).
+        :param clickable: Se True, aguarda o elemento ficar clicável.
+        :param fields: Valores dos campos dos seletores (ex.: contact_name).
+        """
+        timeout = self.timeouts.timeout(name) if self.timeouts else self.wait_time
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(self.driver, timeout).until(self.locators.condition(name, clickable, **fields))
+        except TimeoutException:
+            if self.timeouts:
+                self.timeouts.record_timeout(name)
+            raise
+        if self.timeouts:
+            self.timeouts.observe(name, time.monotonic() - started)
+        return result
+
+    def _find(self, name, **fields):
+        """
+        Localiza o elemento pela cadeia de seletores (settings.SELECTOR_CHAINS), sem espera.
+
+        :raises NoSuchElementException: Se nenhum seletor da cadeia encontrar o elemento.
+        """
+        element = self.locators.find(self.driver, name, **fields)
+        if element is None:
+            raise NoSuchElementException(f"Elemento {name} não encontrado.")
+        return element
+
+    def _devtools_open(self):
+        return self.devtools is not None and not self.devtools.closed
+
+    def _cdp(self):
+        """
+        Função que executa comandos DevTools: o canal da sessão, se aberto; senão, o execute_cdp_cmd
+        do Chrome local. None se nenhum está disponível (ex.: Selenium Grid).
+        """
+        if self._devtools_open():
+            return self.devtools.call
+        if not getattr(self.driver, "_is_remote", True) and hasattr(self.driver, "execute_cdp_cmd"):
+            return self.driver.execute_cdp_cmd
+        return None
+
+    def _insert_text_devtools(self, message):
+        """
+        Insere o texto pelo canal DevTools: foco no campo, Input.insertText e leitura do campo são
+        enviados juntos (pipeline) e aguardados numa única ida e volta.
+
+        :return: Texto do campo após a inserção.
+        """
+        xpaths = self.locators.candidates("MESSAGE_TEXT_BOX")
+        focus = self.devtools.evaluate_send(_FOCUS_TEXT_BOX_SCRIPT, xpaths, False)
+        insert = self.devtools.send("Input.insertText", {"text": message})
+        composed = self.devtools.evaluate_send(_FOCUS_TEXT_BOX_SCRIPT, xpaths, True)
+        timeout = self.devtools.timeout
+        if not self.devtools.result_value(focus.result(timeout)):
+            raise DevToolsError("Campo de mensagem não encontrado.")
+        insert.result(timeout)
+        return self.devtools.result_value(composed.result(timeout)) or ""
+
+    def _inject_file(self, path, input_name):
+        """
+        Seleciona o arquivo sem navegar pelo menu de anexos.
+
+        Com um Chrome local (canal DevTools da sessão ou execute_cdp_cmd) e o input de arquivo já
+        presente na página, define o arquivo direto no input via DOM.setFileInputFiles. Caso contrário, solta o arquivo sobre o painel da
+        conversa (evento drop), se ele não passar de settings.ATTACH_DROP_MAX_BYTES e input_name
+        estiver em _DROP_INPUTS. Com um driver remoto (Selenium Grid) o drop não é usado: ele
+        enviaria o arquivo inteiro a cada envio, enquanto o menu de anexos reaproveita o arquivo já
+        enviado ao nó (UploadCache).
+
+        :return: "cdp" ou "drop", conforme o caminho usado; None se nenhum se aplica.
+        """
+        cdp = self._cdp()
+        if cdp:
+            node = cdp("Runtime.evaluate", {
+                "expression": _FIND_NODE_EXPRESSION % json.dumps(self.locators.candidates(input_name))})
+            object_id = node.get("result", {}).get("objectId")
+            if object_id:
+                cdp("DOM.setFileInputFiles", {
+                    "files": [os.path.abspath(path)], "objectId": object_id})
+                return "cdp"
+        if getattr(self.driver, "_is_remote", True) or input_name not in _DROP_INPUTS:
+            return None
+        if os.path.getsize(path) > settings.ATTACH_DROP_MAX_BYTES:
+            return None
+        pane = self.locators.find(self.driver, "CHAT_PANE")
+        if pane is None:
+            return None
+        with open(path, "rb") as file:
+            content = base64.b64encode(file.read()).decode("ascii")
+        mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.driver.execute_script(_DROP_FILE_SCRIPT, pane, content, os.path.basename(path), mime)
+        return "drop"
+
+    def _attach_direct(self, path, input_name):
+        """
+        Anexa o arquivo pelo caminho direto (_inject_file) quando settings.ATTACH_MODE é "direct".
+
+        Se o arquivo já foi injetado, a pré-visualização pode abrir a qualquer momento: recorrer ao
+        menu anexaria o arquivo de novo. Por isso, se o botão de enviar não aparecer, a
+        pré-visualização é fechada e a etapa falha.
+
+        :return: Botão de enviar da pré-visualização; None se o caminho direto não se aplica ou a
+                 injeção falhou, casos em que o envio segue pelo menu de anexos.
+        :raises TimeoutException: Se o arquivo foi injetado mas a pré-visualização não abriu.
+        """
+        if settings.ATTACH_MODE != "direct":
+            return None
+        try:
+            method = self._inject_file(path, input_name)
+        except Exception as e:
+            self.logger.warning(f"Anexo direto falhou ({e}); usando o menu de anexos.")
+            return None
+        if method is None:
+            return None
+        try:
+            send_button = self._wait("SEND_BUTTON", clickable=True)
+        except TimeoutException:
+            self.logger.error(f"Pré-visualização do anexo não abriu após injeção via {method}: {path}")
+            self._close_preview()
+            raise
+        self.logger.info(f"Arquivo anexado via {method}: {path}")
+        return send_button
+
+    def _close_preview(self):
+        """Fecha a pré-visualização de anexo que possa ter aberto (ESC no elemento ativo)."""
+        try:
+            self.driver.switch_to.active_element.send_keys(Keys.ESCAPE)
+        except Exception as e:
+            self.logger.warning(f"Não foi possível fechar a pré-visualização do anexo: {e}")
+
+    def _send_file(self, file_input, path):
+        """
+        Seleciona o arquivo no input, usando o UploadCache quando disponível.
+        """
+        if self.uploader:
+            self.uploader.send_file(self.driver, file_input, path)
+        else:
+            file_input.send_keys(path)
+
+    def _type_text(self, message_box, message):
+        """
+        Digita o texto tecla a tecla, usando SHIFT+ENTER nas quebras de linha para não dividir a mensagem.
+        """
+        for index, line in enumerate(message.split("\n")):
+            if index:
+                message_box.send_keys(Keys.SHIFT, Keys.ENTER)
+            if line:
+                message_box.send_keys(line)
+
+    def _insert_text(self, message_box, message):
+        """
+        Insere o texto no campo de mensagem.
+
+        No modo "paste" (settings.TEXT_INPUT_MODE) o texto é inserido numa única chamada, com custo
+        independente do tamanho da mensagem: pelo canal DevTools (Input.insertText), se disponível,
+        ou colando via execute_script. Se o campo não refletir o texto, ele é limpo e a mensagem é
+        digitada com _type_text.
+        """
+        if settings.TEXT_INPUT_MODE == "paste" and self._devtools_open():
+            try:
+                composed = self._insert_text_devtools(message)
+                if "".join(message.split()) == "".join(composed.split()):
+                    return
+                self.logger.warning("Texto não inserido por completo via DevTools; tentando colar.")
+            except Exception as e:
+                self.logger.warning(f"Falha ao inserir o texto via DevTools: {e}. Tentando colar.")
+            message_box.send_keys(Keys.CONTROL + 'a')
+            message_box.send_keys(Keys.DELETE)
+        if settings.TEXT_INPUT_MODE == "paste":
+            try:
+                composed = self.driver.execute_script(_INSERT_TEXT_SCRIPT, message_box, message) or ""
+                if "".join(message.split()) == "".join(composed.split()):
+                    return
+                self.logger.warning("Texto não inserido por completo via paste; digitando a mensagem.")
+            except Exception as e:
+                self.logger.warning(f"Falha ao colar o texto: {e}. Digitando a mensagem.")
+            message_box.send_keys(Keys.CONTROL + 'a')
+            message_box.send_keys(Keys.DELETE)
+        self._type_text(message_box, message)
+
     def open_chat(self, contact_name):
         """
         Abre o chat com o contato especificado.
@@ -28,7 +284,7 @@ class WhatsAppMessenger:
         """
         try:
             # Limpa a barra de pesquisa
-            search_box = self.driver.find_element(By.XPATH, settings.CAIXA_RESEARCH_CONTACT)
+            search_box = self._find("CAIXA_RESEARCH_CONTACT")
             search_box.send_keys(Keys.CONTROL + 'a')
             search_box.send_keys(Keys.DELETE)
             
@@ -37,19 +293,14 @@ class WhatsAppMessenger:
             self.logger.info(f"Buscando contato: {contact_name}")
             
             # Aguarda que o resultado da pesquisa apareça
-            wait = WebDriverWait(self.driver, self.wait_time)
-            #search_result_xpath = settings.FIND_CONTACT.format(contact_name=contact_name)
-            search_result_xpath = settings.CONTACT_ROW.format(contact_name=contact_name)
-            wait = WebDriverWait(self.driver, self.wait_time)
-            chat = wait.until(EC.presence_of_element_located((By.XPATH, search_result_xpath)))
+            chat = self._wait("CONTACT_ROW", contact_name=contact_name)
             
             try:
                 chat.click()
             except Exception as click_error:
                 self.logger.warning(f"Click interceptado: {click_error}. Usando ENTER fallback.")
                 # rola até o elemento
-                elems = self.driver.find_elements(By.XPATH, search_result_xpath)
-                if not elems:
+                if self.locators.find(self.driver, "CONTACT_ROW", contact_name=contact_name) is None:
                     raise Exception(f"Contato '{contact_name}' não encontrado; abortando ENTER fallback")
                 
                 # 4b) só aí mando o ENTER
@@ -74,18 +325,13 @@ class WhatsAppMessenger:
         :raises Exception: Se ocorrer erro ao abrir a conversa.
         """
         try:
-            wait = WebDriverWait(self.driver, self.wait_time)
             # Clica no botão "Nova conversa" usando o atributo aria-label (ou outro seletor definido)
-            new_chat_button = wait.until(
-                EC.element_to_be_clickable((By.XPATH, settings.NEW_CHAT_NEXT_BUTTON))
-            )
+            new_chat_button = self._wait("NEW_CHAT_NEXT_BUTTON", clickable=True)
             new_chat_button.click()
             self.logger.info("Botão 'Nova conversa' clicado.")
 
             # Aguarda o campo para digitar o número
-            phone_input = wait.until(
-                EC.presence_of_element_located((By.XPATH, settings.NEW_CHAT_PHONE_INPUT))
-            )
+            phone_input = self._wait("NEW_CHAT_PHONE_INPUT")
             phone_input.send_keys(phone_number)
             self.logger.info(f"Número digitado: {phone_number}")
             settings.time.sleep(2)
@@ -106,9 +352,8 @@ class WhatsAppMessenger:
         :raises Exception: Se houver erro no envio da mensagem
         """
         try:
-            wait = WebDriverWait(self.driver, self.wait_time)
-            message_box = wait.until(EC.presence_of_element_located((By.XPATH, settings.MESSAGE_TEXT_BOX)))
-            message_box.send_keys(message)
+            message_box = self._wait("MESSAGE_TEXT_BOX")
+            self._insert_text(message_box, message)
             settings.time.sleep(1)
             message_box.send_keys(Keys.RETURN)
             settings.time.sleep(20)
@@ -125,20 +370,20 @@ class WhatsAppMessenger:
         :raises Exception: Se houver erro no envio do documento
         """
         try:
-            wait = WebDriverWait(self.driver, self.wait_time)
-            
-            # Clica no botão de anexar
-            attach_button = wait.until(EC.element_to_be_clickable((By.XPATH, settings.ATTACH_BUTTON)))
-            attach_button.click()
-            self.logger.info("Botão de anexar clicado.")
+            send_button = self._attach_direct(document_path, "DOCUMENT_INPUT")
+            if send_button is None:
+                # Clica no botão de anexar
+                attach_button = self._wait("ATTACH_BUTTON", clickable=True)
+                attach_button.click()
+                self.logger.info("Botão de anexar clicado.")
             
-            # Encontra o input para enviar arquivos e envia o caminho do documento
-            document_input = wait.until(EC.presence_of_element_located((By.XPATH, settings.DOCUMENT_INPUT)))
-            document_input.send_keys(document_path)
-            self.logger.info(f"Documento selecionado: {document_path}")
+                # Encontra o input para enviar arquivos e envia o caminho do documento
+                document_input = self._wait("DOCUMENT_INPUT")
+                self._send_file(document_input, document_path)
+                self.logger.info(f"Documento selecionado: {document_path}")
             
-            # Aguarda e clica no botão de enviar
-            send_button = wait.until(EC.element_to_be_clickable((By.XPATH, settings.SEND_BUTTON)))
+                # Aguarda e clica no botão de enviar
+                send_button = self._wait("SEND_BUTTON", clickable=True)
             send_button.click()
             self.logger.info("Documento enviado com sucesso.")
         except Exception as e:
@@ -153,20 +398,20 @@ class WhatsAppMessenger:
         :raises Exception: Se houver erro no envio do imagem
         """
         try:
-            wait = WebDriverWait(self.driver, self.wait_time)
-            
-            # Clica no botão de anexar
-            attach_button = wait.until(EC.element_to_be_clickable((By.XPATH, settings.ATTACH_BUTTON)))
-            attach_button.click()
-            self.logger.info("Botão de anexar clicado.")
+            send_button = self._attach_direct(document_path, "IMAGE_INPUT")
+            if send_button is None:
+                # Clica no botão de anexar
+                attach_button = self._wait("ATTACH_BUTTON", clickable=True)
+                attach_button.click()
+                self.logger.info("Botão de anexar clicado.")
             
-            # Encontra o input para enviar arquivos e envia o caminho da imagem
-            document_input = wait.until(EC.presence_of_element_located((By.XPATH, settings.IMAGE_INPUT)))
-            document_input.send_keys(document_path)
-            self.logger.info(f"Imagem selecionada: {document_path}")
+                # Encontra o input para enviar arquivos e envia o caminho da imagem
+                document_input = self._wait("IMAGE_INPUT")
+                self._send_file(document_input, document_path)
+                self.logger.info(f"Imagem selecionada: {document_path}")
             
-            # Aguarda e clica no botão de enviar
-            send_button = wait.until(EC.element_to_be_clickable((By.XPATH, settings.SEND_BUTTON)))
+                # Aguarda e clica no botão de enviar
+                send_button = self._wait("SEND_BUTTON", clickable=True)
             send_button.click()
             self.logger.info("Imagem enviada com sucesso.")
         except Exception as e:
@@ -181,19 +426,20 @@ class WhatsAppMessenger:
         :raises Exception: Se houver erro no envio do áudio.
         """
         try:
-            wait = WebDriverWait(self.driver, self.wait_time)
-            # Clica no botão de anexar
-            attach_button = wait.until(EC.element_to_be_clickable((By.XPATH, settings.ATTACH_BUTTON)))
-            attach_button.click()
-            self.logger.info("Botão de anexar clicado para áudio.")
+            send_button = self._attach_direct(audio_path, "AUDIO_INPUT")
+            if send_button is None:
+                # Clica no botão de anexar
+                attach_button = self._wait("ATTACH_BUTTON", clickable=True)
+                attach_button.click()
+                self.logger.info("Botão de anexar clicado para áudio.")
             
-            # Encontra o input para enviar áudio (defina settings.AUDIO_INPUT no seu settings)
-            audio_input = wait.until(EC.presence_of_element_located((By.XPATH, settings.AUDIO_INPUT)))
-            audio_input.send_keys(audio_path)
-            self.logger.info(f"Áudio selecionado: {audio_path}")
+                # Encontra o input para enviar áudio (cadeia AUDIO_INPUT em settings.SELECTOR_CHAINS)
+                audio_input = self._wait("AUDIO_INPUT")
+                self._send_file(audio_input, audio_path)
+                self.logger.info(f"Áudio selecionado: {audio_path}")
             
-            # Aguarda e clica no botão de enviar
-            send_button = wait.until(EC.element_to_be_clickable((By.XPATH, settings.SEND_BUTTON)))
+                # Aguarda e clica no botão de enviar
+                send_button = self._wait("SEND_BUTTON", clickable=True)
             send_button.click()
             self.logger.info("Áudio enviado com sucesso.")
         except Exception as e:
@@ -207,7 +453,7 @@ class WhatsAppMessenger:
         :raises Exception: Se houver erro ao sair do chat
         """
         try:
-            search_box = self.driver.find_element(By.XPATH, settings.CAIXA_RESEARCH_CONTACT)
+            search_box = self._find("CAIXA_RESEARCH_CONTACT")
             search_box.send_keys(Keys.CONTROL + 'a')
             search_box.send_keys(Keys.DELETE)
             search_box.send_keys(Keys.ESCAPE)
@@ -0,0 +1,436 @@
+import errno
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import time
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, Optional
+from core.configs import settings
+from core.utils.logger import log_info, log_error
+from core.utils.procfs import find_process
+
+try:
+    import fcntl
+except ImportError:  # Fora do Linux não há reflink; os perfis são clonados por cópia
+    fcntl = None
+
+_MANIFEST_VERSION = 1
+
+# ioctl FICLONE (Linux): o destino compartilha os blocos da origem (copy-on-write), em btrfs/XFS.
+_FICLONE = 0x40049409
+_REFLINK_UNSUPPORTED = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS}
+_reflink_devices: Dict[int, bool] = {}
+
+
+class ProfileError(Exception):
+    """Levantada quando um perfil não pode ser exportado ou importado (ex.: arquivo corrompido)."""
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def state_files(profile_path: Path, phone_number: str) -> Dict[str, Path]:
+    """
+    Arquivos do perfil necessários para manter o login: settings.PROFILE_STATE_PATHS (IndexedDB,
+    Local Storage, cookies do Chrome) e os cookies e metadados salvos pela sessão.
+
+    :return: Dicionário caminho relativo (POSIX) -> caminho absoluto.
+    """
+    files: Dict[str, Path] = {}
+    roots = [phone_number + settings.METADATA_FILENAME, phone_number + settings.COOKIES_FILENAME]
+    for relative in roots + list(settings.PROFILE_STATE_PATHS):
+        path = profile_path / relative
+        if path.is_file():
+            files[PurePosixPath(relative).as_posix()] = path
+        elif path.is_dir():
+            for item in path.rglob("*"):
+                if item.is_file() and item.name != "LOCK":  # Arquivos de lock do LevelDB não são estado
+                    files[item.relative_to(profile_path).as_posix()] = item
+    return files
+
+
+def load_manifest(profile_path: Path) -> Optional[dict]:
+    """Manifesto da última exportação ou importação do perfil, ou None."""
+    path = Path(profile_path) / settings.PROFILE_MANIFEST
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _save_manifest(profile_path: Path, manifest: dict) -> None:
+    path = Path(profile_path) / settings.PROFILE_MANIFEST
+    temporary = path.with_suffix(".tmp")
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump({key: value for key, value in manifest.items() if key != "changed"}, file)
+    os.replace(temporary, path)
+
+
+def build_manifest(profile_path: Path, phone_number: str, previous: Optional[dict] = None) -> dict:
+    """
+    Calcula o manifesto (sha256, tamanho e mtime de cada arquivo de estado).
+
+    Arquivos com o mesmo tamanho e mtime do manifesto anterior reaproveitam o hash já calculado.
+    """
+    known = (previous or {}).get("files", {})
+    files = {}
+    for relative, path in sorted(state_files(profile_path, phone_number).items()):
+        stat = path.stat()
+        entry = known.get(relative)
+        if not entry or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            entry = {"sha256": _sha256(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        files[relative] = entry
+    identity = hashlib.sha256(json.dumps({r: e["sha256"] for r, e in files.items()}, sort_keys=True)
+                              .encode("utf-8")).hexdigest()[:16]
+    return {"version": _MANIFEST_VERSION, "phone_number": phone_number, "created_at": time.time(),
+            "id": identity, "base": None, "files": files}
+
+
+def export_profile(profile_path, phone_number: str, archive_path, incremental: bool = True) -> dict:
+    """
+    Exporta o estado de login do perfil num arquivo .tar.gz (manifest.json + arquivos alterados).
+
+    Com incremental=True e uma exportação/importação anterior registrada no perfil, o arquivo traz
+    apenas os arquivos alterados desde então; a importação exige a mesma base no destino.
+
+    :param profile_path: Diretório do perfil (sessions/<número>).
+    :param phone_number: Número da sessão.
+    :param archive_path: Arquivo de destino.
+    :param incremental: Se False, exporta o estado completo.
+    :return: Manifesto gravado (com "changed": arquivos incluídos no arquivo).
+    """
+    profile_path = Path(profile_path)
+    previous = load_manifest(profile_path)
+    manifest = build_manifest(profile_path, phone_number, previous)
+    if incremental and previous and previous.get("phone_number") == phone_number:
+        manifest["base"] = previous["id"]
+        old = previous.get("files", {})
+        manifest["changed"] = [r for r, e in manifest["files"].items()
+                               if r not in old or old[r]["sha256"] != e["sha256"]]
+    else:
+        manifest["changed"] = list(manifest["files"])
+    archive_path = Path(archive_path)
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = archive_path.with_name(archive_path.name + ".tmp")
+    with tarfile.open(temporary, "w:gz", compresslevel=settings.PROFILE_EXPORT_COMPRESSION) as archive:
+        data = json.dumps(manifest).encode("utf-8")
+        info = tarfile.TarInfo("manifest.json")
+        info.size = len(data)
+        info.mtime = int(manifest["created_at"])
+        archive.addfile(info, io.BytesIO(data))
+        for relative in manifest["changed"]:
+            archive.add(profile_path / relative, arcname=f"files/{relative}", recursive=False)
+    os.replace(temporary, archive_path)
+    _save_manifest(profile_path, manifest)
+    log_info(f"Perfil {phone_number} exportado em {archive_path} ({len(manifest['changed'])} de "
+             f"{len(manifest['files'])} arquivos, {archive_path.stat().st_size // 1024} KB).", name="Profiles")
+    return manifest
+
+
+def _safe_relative(relative: str) -> bool:
+    parts = PurePosixPath(relative).parts
+    return bool(parts) and not PurePosixPath(relative).is_absolute() and ".." not in parts
+
+
+def import_profile(archives: Iterable, profile_path, phone_number: str) -> dict:
+    """
+    Importa um ou mais arquivos exportados (completo seguido de incrementais, em ordem).
+
+    Cada arquivo é verificado antes de alterar o perfil: a base do incremental deve ser o estado
+    atual do perfil e o sha256 de cada arquivo deve conferir com o manifesto. Arquivos de estado
+    ausentes do manifesto (ex.: logs antigos do LevelDB) são removidos.
+
+    :param archives: Caminhos dos arquivos .tar.gz.
+    :param profile_path: Diretório do perfil (sessions/<número>).
+    :param phone_number: Número da sessão.
+    :return: Manifesto do estado importado.
+    :raises ProfileError: Se um arquivo for de outro número, de outra base ou estiver corrompido.
+    """
+    profile_path = Path(profile_path)
+    manifest: Optional[dict] = None
+    for archive_path in archives:
+        manifest = _import_archive(Path(archive_path), profile_path, phone_number)
+    if manifest is None:
+        raise ProfileError("Nenhum arquivo de perfil informado.")
+    return manifest
+
+
+def _import_archive(archive_path: Path, profile_path: Path, phone_number: str) -> dict:
+    """
+    Aplica um arquivo exportado ao perfil.
+
+    O novo estado completo é montado num diretório ao lado do perfil (arquivos não alterados
+    entram por hardlink, sem cópia) e só então troca de lugar com o perfil atual: uma falha no
+    meio da importação deixa o perfil anterior intacto, em vez de uma mistura dos dois estados.
+    """
+    _recover_swap(profile_path)
+    extracted = profile_path.parent / f".{phone_number}.import"
+    staging = profile_path.parent / f".{phone_number}.new"
+    for path in (extracted, staging):
+        shutil.rmtree(path, ignore_errors=True)
+    try:
+        with tarfile.open(archive_path, "r:gz") as archive:
+            try:
+                manifest = json.load(archive.extractfile("manifest.json"))
+            except (KeyError, ValueError) as e:
+                raise ProfileError(f"Manifesto ausente ou inválido em {archive_path}: {e}")
+            if manifest.get("version") != _MANIFEST_VERSION or manifest.get("phone_number") != phone_number:
+                raise ProfileError(f"{archive_path} não é uma exportação do perfil {phone_number}.")
+            current = load_manifest(profile_path)
+            if manifest["base"] and (current is None or current.get("id") != manifest["base"]):
+                raise ProfileError(f"{archive_path} é incremental sobre {manifest['base']}, mas o perfil "
+                                   f"está em {current.get('id') if current else 'nenhuma base'}.")
+            for relative in manifest["changed"]:
+                if not _safe_relative(relative) or relative not in manifest["files"]:
+                    raise ProfileError(f"Caminho inválido em {archive_path}: {relative}")
+                member = archive.extractfile(f"files/{relative}")
+                if member is None:
+                    raise ProfileError(f"Arquivo {relative} ausente em {archive_path}.")
+                target = extracted / relative
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with open(target, "wb") as out:
+                    shutil.copyfileobj(member, out, 1024 * 1024)
+                if _sha256(target) != manifest["files"][relative]["sha256"]:
+                    raise ProfileError(f"Hash de {relative} não confere em {archive_path}.")
+        existing = state_files(profile_path, phone_number)
+        for relative in manifest["files"]:
+            if relative not in manifest["changed"] and relative not in existing:
+                raise ProfileError(f"{relative} não existe no perfil para aplicar {archive_path}.")
+        # Estado removido (fora do manifesto) ou substituído não é levado para o novo perfil.
+        replaced = {relative for relative in existing if relative not in manifest["files"]}
+        replaced.update(manifest["changed"])
+        _link_tree(profile_path, staging, replaced)
+        for relative in manifest["changed"]:
+            target = staging / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(extracted / relative, target)
+        # Os hashes conferem com o manifesto; tamanhos e mtimes passam a ser os locais.
+        files = {}
+        for relative, entry in manifest["files"].items():
+            stat = (staging / relative).stat()
+            files[relative] = {**entry, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        _save_manifest(staging, {**manifest, "files": files})
+        _swap(staging, profile_path)
+    except (tarfile.TarError, OSError, EOFError) as e:
+        raise ProfileError(f"Erro ao ler {archive_path}: {e}")
+    finally:
+        for path in (extracted, staging):
+            shutil.rmtree(path, ignore_errors=True)
+    log_info(f"Perfil {phone_number} importado de {archive_path} ({len(manifest['changed'])} arquivos).",
+             name="Profiles")
+    return manifest
+
+
+def _link_tree(source: Path, target: Path, skip: set) -> None:
+    """Replica o diretório em target por hardlinks (cópia em outro sistema de arquivos), exceto skip."""
+    target.mkdir(parents=True)
+    if not source.is_dir():
+        return
+    for item in source.rglob("*"):
+        if item.is_symlink():
+            continue  # SingletonLock/SingletonSocket de um Chrome anterior
+        relative = item.relative_to(source).as_posix()
+        destination = target / relative
+        if item.is_dir():
+            destination.mkdir(parents=True, exist_ok=True)
+            continue
+        if relative in skip:
+            continue
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(item, destination)
+        except OSError:
+            shutil.copy2(item, destination)
+
+
+def _swap(staging: Path, profile_path: Path) -> None:
+    """Coloca staging no lugar do perfil; o perfil anterior só é apagado depois da troca."""
+    previous = profile_path.with_name(f".{profile_path.name}.old")
+    shutil.rmtree(previous, ignore_errors=True)
+    if profile_path.exists():
+        os.replace(profile_path, previous)
+    try:
+        os.replace(staging, profile_path)
+    except OSError:
+        if previous.exists():
+            os.replace(previous, profile_path)
+        raise
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+def _recover_swap(profile_path: Path) -> None:
+    """Restaura o perfil anterior se uma importação foi interrompida entre as duas renomeações de _swap."""
+    previous = profile_path.with_name(f".{profile_path.name}.old")
+    if previous.exists() and not profile_path.exists():
+        os.replace(previous, profile_path)
+        log_error(f"Importação interrompida do perfil {profile_path.name}; perfil anterior restaurado.",
+                  name="Profiles")
+
+
+def _reflink(source: Path, target: Path) -> bool:
+    """Clona o arquivo por reflink; False se o sistema de arquivos não suporta (lembrado por dispositivo)."""
+    device = source.stat().st_dev
+    if fcntl is None or _reflink_devices.get(device) is False:
+        return False
+    try:
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+    except OSError as e:
+        target.unlink(missing_ok=True)
+        if e.errno not in _REFLINK_UNSUPPORTED:
+            raise
+        _reflink_devices[device] = False
+        return False
+    _reflink_devices[device] = True
+    shutil.copystat(source, target)
+    return True
+
+
+def _shared(relative: str) -> bool:
+    return any(relative == path or relative.startswith(path + "/") for path in settings.PROFILE_SHARED_PATHS)
+
+
+def clone_profile(profile_path, base=None) -> Dict[str, int]:
+    """
+    Cria o perfil da sessão a partir do perfil base, sem sobrescrever arquivos existentes.
+
+    Cada arquivo é clonado por reflink (copy-on-write, quando o sistema de arquivos suporta); senão,
+    os componentes estáticos (settings.PROFILE_SHARED_PATHS) viram hardlinks e o restante é copiado,
+    pois o Chrome altera esses arquivos no lugar.
+
+    :param profile_path: Diretório do perfil da sessão.
+    :param base: Perfil base. Se None, usa settings.BASE_PROFILE_DIR.
+    :return: Quantidade de arquivos por método ({"reflink": n, "hardlink": n, "copy": n}).
+    :raises ProfileError: Se o perfil base não foi preparado.
+    """
+    base = Path(base or settings.BASE_PROFILE_DIR)
+    profile_path = Path(profile_path)
+    if not (base / "Local State").exists():
+        raise ProfileError(f"Perfil base não preparado em {base} (use prepare_base_profile).")
+    counts = {"reflink": 0, "hardlink": 0, "copy": 0}
+    for source in base.rglob("*"):
+        if source.is_symlink():
+            continue  # SingletonLock/SingletonSocket de um Chrome anterior
+        relative = source.relative_to(base).as_posix()
+        target = profile_path / relative
+        if source.is_dir():
+            target.mkdir(parents=True, exist_ok=True)
+            continue
+        if target.exists():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if _reflink(source, target):
+            counts["reflink"] += 1
+            continue
+        if _shared(relative):
+            try:
+                os.link(source, target)
+                counts["hardlink"] += 1
+                continue
+            except OSError:
+                pass  # Outro sistema de arquivos: copia
+        shutil.copy2(source, target)
+        counts["copy"] += 1
+    log_info(f"Perfil {profile_path.name} criado a partir do perfil base ({counts}).", name="Profiles")
+    return counts
+
+
+def prepare_base_profile(driver_factory=None, base=None, settle: float = settings.BASE_PROFILE_SETTLE) -> Path:
+    """
+    Prepara o perfil base: abre o Chrome num perfil vazio, carrega o WhatsApp Web (componentes do
+    Chrome e service worker do WhatsApp ficam prontos), encerra o navegador e remove o estado de
+    login e os caches. O perfil anterior só é substituído ao final.
+
+    :param driver_factory: Fábrica de drivers local. Se None, usa LocalChromeFactory().
+    :param base: Destino. Se None, usa settings.BASE_PROFILE_DIR.
+    :param settle: Tempo (s) com a página aberta antes de encerrar o navegador.
+    :return: Caminho do perfil base.
+    """
+    from selenium.webdriver.chrome.options import Options
+    from core.cronos.drivers import LocalChromeFactory
+
+    base = Path(base or settings.BASE_PROFILE_DIR)
+    staging = base.with_name(base.name + ".new")
+    shutil.rmtree(staging, ignore_errors=True)
+    options = Options()
+    options.add_argument(f"--user-data-dir={staging}")
+    options.add_argument("--profile-directory=Default")
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    driver = (driver_factory or LocalChromeFactory())(options)
+    try:
+        driver.get("https://web.whatsapp.com/")
+        time.sleep(settle)
+    finally:
+        driver.quit()
+    # O estado da página deslogada (chaves geradas pelo WhatsApp Web, cookies) é de cada sessão.
+    for relative in ("Default/IndexedDB", "Default/Local Storage", "Default/Session Storage",
+                     "Default/Cookies", "Default/Cookies-journal", "Default/Network"):
+        path = staging / relative
+        if path.is_dir():
+            shutil.rmtree(path)
+        elif path.exists():
+            path.unlink()
+    prune_profile(staging)
+    shutil.rmtree(base, ignore_errors=True)
+    os.replace(staging, base)
+    size = sum(f.stat().st_size for f in base.rglob("*") if f.is_file())
+    log_info(f"Perfil base preparado em {base} ({size // (1024 * 1024)} MB).", name="Profiles")
+    return base
+
+
+def prune_profile(profile_path) -> int:
+    """
+    Remove os caches do perfil (settings.PROFILE_PRUNE_PATHS), que o Chrome recria sob demanda.
+
+    :param profile_path: Diretório do perfil.
+    :return: Bytes liberados.
+    :raises ProfileError: Se o Chrome do perfil estiver em execução.
+    """
+    profile_path = Path(profile_path)
+    if find_process(f"--user-data-dir={profile_path}"):
+        raise ProfileError(f"O Chrome do perfil {profile_path.name} está em execução.")
+    freed = 0
+    for relative in settings.PROFILE_PRUNE_PATHS:
+        path = profile_path / relative
+        if not path.is_dir():
+            continue
+        for item in path.rglob("*"):
+            stat = item.lstat()
+            if item.is_file() and stat.st_nlink == 1:  # Hardlinks do perfil base não liberam espaço
+                freed += stat.st_size
+        shutil.rmtree(path, ignore_errors=True)
+    return freed
+
+
+def prune_profiles(root=None, skip: Iterable[str] = ()) -> Dict[str, int]:
+    """
+    Remove os caches de todos os perfis cujo Chrome não está em execução.
+
+    :param root: Diretório dos perfis. Se None, usa settings.COOKIE_DIR.
+    :param skip: Números a ignorar (ex.: sessões abertas).
+    :return: Dicionário número -> bytes liberados.
+    """
+    skip = set(skip)
+    freed: Dict[str, int] = {}
+    for profile_path in sorted(Path(root or settings.COOKIE_DIR).iterdir()):
+        if not profile_path.is_dir() or profile_path.name in skip or profile_path.name.startswith("."):
+            continue
+        try:
+            freed[profile_path.name] = prune_profile(profile_path)
+        except ProfileError:
+            continue
+        except OSError as e:
+            log_error(f"Erro ao limpar o perfil {profile_path.name}: {e}", name="Profiles")
+    log_info(f"Caches de {len(freed)} perfis removidos ({sum(freed.values()) // (1024 * 1024)} MB).",
+             name="Profiles")
+    return freed
@@ -0,0 +1,299 @@
+import bisect
+import heapq
+import mmap
+import os
+import re
+import tempfile
+import threading
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+from core.configs import settings
+from core.utils.logger import log_info
+
+# Cabeçalho do arquivo do índice de descadastro; o restante são inteiros de 64 bits ordenados.
+_INDEX_MAGIC = b"CRSUPP01"
+
+
+def normalize_e164(number, default_country: str = settings.DEFAULT_COUNTRY_CODE) -> Optional[str]:
+    """
+    Normaliza um número de telefone para o formato E.164 (ex.: "+5532988967108").
+
+    Aceita números com DDI ("+55 32 98896-7108", "005532988967108", "5532988967108") ou nacionais
+    ("(32) 98896-7108", "032988967108"), aos quais aplica default_country.
+
+    :param number: Número em qualquer formatação.
+    :param default_country: DDI dos números nacionais.
+    :return: Número em E.164, ou None se inválido.
+    """
+    text = str(number or "").strip()
+    international = text.startswith("+") or text.startswith("00")
+    digits = re.sub(r"\D", "", text)
+    if text.startswith("00"):
+        digits = digits[2:]
+    if not international:
+        national = digits.lstrip("0")  # Prefixo de longa distância (0, 0xx) dos números nacionais
+        if default_country and 10 <= len(national) <= 11:
+            digits = default_country + national
+        else:
+            digits = national
+    if not 8 <= len(digits) <= 15 or digits[0] == "0":
+        return None
+    return "+" + digits
+
+
+def _key(e164: str) -> int:
+    return int(e164.lstrip("+"))
+
+
+class NumberSet:
+    """
+    Conjunto de números E.164 com 8 bytes por posição (tabela hash de endereçamento aberto em array),
+    usado para remover destinatários repetidos sem o custo de um set de objetos Python.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        size = 1
+        while size < capacity * 2:
+            size *= 2
+        self._slots = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _probe(self, key: int) -> int:
+        index = (key * 0x9E3779B97F4A7C15 >> 17) & self._mask
+        while self._slots[index] not in (0, key):
+            index = (index + 1) & self._mask
+        return index
+
+    def __contains__(self, e164: str) -> bool:
+        key = _key(e164)
+        return self._slots[self._probe(key)] == key
+
+    def add(self, e164: str) -> bool:
+        """
+        Adiciona o número.
+
+        :return: True se o número era novo; False se já estava no conjunto.
+        """
+        key = _key(e164)
+        index = self._probe(key)
+        if self._slots[index] == key:
+            return False
+        self._slots[index] = key
+        self._count += 1
+        if self._count * 2 > len(self._slots):
+            self._grow()
+        return True
+
+    def _grow(self) -> None:
+        old = self._slots
+        self._slots = array("Q", bytes(16 * len(old)))
+        self._mask = len(self._slots) - 1
+        for key in old:
+            if key:
+                self._slots[self._probe(key)] = key
+
+
+class SuppressionIndex:
+    """
+    Lista de descadastro (opt-out) consultada antes de cada envio.
+
+    O índice principal é um arquivo com os números ordenados (inteiros de 64 bits), mapeado em
+    memória e consultado por busca binária: dezenas de milhões de números ocupam 8 bytes cada
+    no disco, quase nada na memória do processo, e cada consulta faz poucas leituras. Números
+    incluídos depois da construção ficam num arquivo de inclusões (.add) carregado em memória, até
+    a próxima compactação (compact), que os incorpora ao índice principal.
+    """
+
+    def __init__(self, path=None) -> None:
+        """
+        :param path: Arquivo do índice. Se None, usa settings.SUPPRESSION_INDEX.
+        """
+        self.path = Path(path or settings.SUPPRESSION_INDEX)
+        self.additions_path = self.path.with_suffix(self.path.suffix + ".add")
+        # Inclusões sendo incorporadas por compact(); as novas vão para um additions_path novo.
+        self.compacting_path = self.path.with_suffix(self.path.suffix + ".compacting")
+        self._additions = NumberSet()
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._mmap: Optional[mmap.mmap] = None
+        self._keys = None
+        self.reload()
+
+    def __len__(self) -> int:
+        return (len(self._keys) if self._keys is not None else 0) + len(self._additions)
+
+    def reload(self) -> None:
+        """(Re)abre o índice principal e os arquivos de inclusões."""
+        with self._lock:
+            self._open_index()
+            self._additions = NumberSet()
+            # O arquivo em compactação só existe aqui se um compact() anterior foi interrompido.
+            for path in (self.compacting_path, self.additions_path):
+                for e164 in self._read_additions(path):
+                    self._additions.add(e164)
+
+    def _open_index(self) -> None:
+        self._close_index()
+        if self.path.exists() and self.path.stat().st_size > len(_INDEX_MAGIC):
+            with open(self.path, "rb") as file:
+                index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if index[:len(_INDEX_MAGIC)] != _INDEX_MAGIC:
+                index.close()
+                raise Exception(f"Arquivo de descadastro inválido: {self.path}")
+            self._mmap = index
+            self._keys = memoryview(index)[len(_INDEX_MAGIC):].cast("Q")
+
+    def _close_index(self) -> None:
+        # Consultas em andamento podem estar usando a view antiga (__contains__ não usa o lock):
+        # apenas solta as referências; o mapeamento é desfeito quando a última consulta termina.
+        self._keys = None
+        self._mmap = None
+
+    @staticmethod
+    def _read_additions(path: Path) -> List[str]:
+        if not path.exists():
+            return []
+        with open(path, "r", encoding="utf-8") as file:
+            return [line.strip() for line in file if line.strip()]
+
+    def __contains__(self, e164: str) -> bool:
+        if e164 in self._additions:
+            return True
+        keys = self._keys
+        if keys is None:
+            return False
+        key = _key(e164)
+        index = bisect.bisect_left(keys, key)
+        return index < len(keys) and keys[index] == key
+
+    def add(self, number) -> bool:
+        """
+        Inclui um número no descadastro (ex.: resposta "SAIR"), com efeito imediato.
+
+        :param number: Número em qualquer formatação.
+        :return: True se o número foi incluído; False se é inválido ou já estava na lista.
+        """
+        e164 = normalize_e164(number)
+        if e164 is None:
+            return False
+        with self._lock:
+            if e164 in self:
+                return False
+            self._additions.add(e164)
+            with open(self.additions_path, "a", encoding="utf-8") as file:
+                file.write(e164 + "\n")
+        return True
+
+    def compact(self) -> int:
+        """
+        Incorpora as inclusões ao índice principal.
+
+        O arquivo de inclusões é renomeado antes da intercalação, de modo que add() concorrentes
+        continuam gravando num arquivo novo; até a troca do índice, as consultas seguem vendo o
+        índice antigo e todas as inclusões em memória.
+
+        :return: Quantidade de números no índice.
+        """
+        with self._compact_lock:
+            with self._lock:
+                keys = self._keys
+                if self.additions_path.exists():
+                    if self.compacting_path.exists():  # Sobra de um compact() interrompido
+                        with open(self.compacting_path, "a", encoding="utf-8") as out:
+                            out.writelines(line + "\n" for line in self._read_additions(self.additions_path))
+                        self.additions_path.unlink()
+                    else:
+                        os.replace(self.additions_path, self.compacting_path)
+            pending = [_key(e164) for e164 in self._read_additions(self.compacting_path)]
+            numbers = [keys, pending] if keys is not None else [pending]
+            total = self.build((key for chunk in numbers for key in chunk), self.path, keys=True)
+            with self._lock:
+                self._open_index()
+                self.compacting_path.unlink(missing_ok=True)
+                additions = NumberSet()
+                for e164 in self._read_additions(self.additions_path):
+                    additions.add(e164)
+                self._additions = additions
+        return total
+
+    @staticmethod
+    def build(numbers: Iterable, path=None, keys: bool = False,
+              chunk_size: int = settings.SUPPRESSION_SORT_CHUNK) -> int:
+        """
+        Constrói o índice a partir de uma sequência de números, com memória limitada: blocos de
+        chunk_size números são ordenados e gravados em arquivos temporários, depois intercalados.
+
+        :param numbers: Números em qualquer formatação (inválidos são ignorados).
+        :param path: Arquivo do índice. Se None, usa settings.SUPPRESSION_INDEX.
+        :param keys: True se numbers já são inteiros (uso interno de compact).
+        :param chunk_size: Números ordenados em memória por vez.
+        :return: Quantidade de números distintos gravados.
+        """
+        path = Path(path or settings.SUPPRESSION_INDEX)
+        runs: List[str] = []
+
+        def _flush(chunk: array) -> None:
+            handle, run = tempfile.mkstemp(dir=path.parent, suffix=".run")
+            with os.fdopen(handle, "wb") as file:
+                array("Q", sorted(chunk)).tofile(file)
+            runs.append(run)
+
+        chunk = array("Q")
+        for number in numbers:
+            if keys:
+                chunk.append(number)
+            else:
+                e164 = normalize_e164(number)
+                if e164 is None:
+                    continue
+                chunk.append(_key(e164))
+            if len(chunk) >= chunk_size:
+                _flush(chunk)
+                chunk = array("Q")
+        if chunk:
+            _flush(chunk)
+
+        total = 0
+        temporary = path.with_suffix(path.suffix + ".tmp")
+        try:
+            with open(temporary, "wb") as out:
+                out.write(_INDEX_MAGIC)
+                buffer, previous = array("Q"), None
+                for key in heapq.merge(*(SuppressionIndex._read_run(run) for run in runs)):
+                    if key == previous:
+                        continue
+                    buffer.append(key)
+                    previous = key
+                    total += 1
+                    if len(buffer) >= 65536:
+                        buffer.tofile(out)
+                        buffer = array("Q")
+                buffer.tofile(out)
+            os.replace(temporary, path)
+        finally:
+            for run in runs:
+                os.unlink(run)
+        log_info(f"Índice de descadastro gravado em {path} ({total} números).", name="SuppressionIndex")
+        return total
+
+    @staticmethod
+    def _read_run(run: str) -> Iterator[int]:
+        with open(run, "rb") as file:
+            while True:
+                block = array("Q")
+                try:
+                    block.fromfile(file, 65536)
+                except EOFError:
+                    pass
+                if not block:
+                    return
+                yield from block
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_index()
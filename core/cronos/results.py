@@ -0,0 +1,299 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from core.configs import settings
+from core.utils.logger import log_info, log_error
+
+_COLUMNS = ("created_at", "campaign", "job_id", "session_phone", "target", "kind", "step", "status",
+            "duration_ms", "error_class", "error")
+
+# Contexto do envio em andamento na thread (preenchido por SendJob.run, por exemplo).
+_context = threading.local()
+
+
+@contextmanager
+def send_context(**fields):
+    """
+    Associa campos (ex.: job_id, campaign) aos resultados gravados pela thread atual.
+
+    :param fields: Campos de _COLUMNS a preencher nos resultados.
+    """
+    previous = getattr(_context, "fields", {})
+    _context.fields = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _context.fields = previous
+
+
+class SQLiteBackend:
+    """Armazenamento dos resultados em SQLite (modo WAL), padrão para uma única máquina."""
+
+    placeholder = "?"
+
+    def __init__(self, path=None) -> None:
+        """
+        :param path: Arquivo do banco. Se None, usa settings.RESULTS_DB.
+        """
+        self.path = str(path or settings.RESULTS_DB)
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def create_schema(self, connection) -> None:
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS send_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                campaign TEXT,
+                job_id TEXT,
+                session_phone TEXT,
+                target TEXT,
+                kind TEXT,
+                step TEXT NOT NULL,
+                status TEXT NOT NULL,
+                duration_ms REAL,
+                error_class TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_results_campaign ON send_results (campaign, step, status);
+            CREATE INDEX IF NOT EXISTS idx_results_session ON send_results (session_phone, created_at);
+            CREATE INDEX IF NOT EXISTS idx_results_target ON send_results (target, created_at);
+        """)
+        connection.commit()
+
+
+class MySQLBackend:
+    """Armazenamento dos resultados em MySQL (mysql-connector-python), para vários hosts."""
+
+    placeholder = "%s"
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
+        """
+        :param config: Parâmetros de mysql.connector.connect. Se None, usa settings.RESULTS_MYSQL.
+        """
+        self.config = config or settings.RESULTS_MYSQL
+
+    def connect(self):
+        import mysql.connector  # Dependência necessária apenas com o backend MySQL
+        return mysql.connector.connect(**self.config)
+
+    def create_schema(self, connection) -> None:
+        cursor = connection.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS send_results (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                created_at DOUBLE NOT NULL,
+                campaign VARCHAR(128),
+                job_id CHAR(32),
+                session_phone VARCHAR(32),
+                target VARCHAR(255),
+                kind VARCHAR(16),
+                step VARCHAR(32) NOT NULL,
+                status VARCHAR(16) NOT NULL,
+                duration_ms DOUBLE,
+                error_class VARCHAR(128),
+                error TEXT,
+                INDEX idx_results_campaign (campaign, step, status),
+                INDEX idx_results_session (session_phone, created_at),
+                INDEX idx_results_target (target(64), created_at)
+            ) ENGINE=InnoDB
+        """)
+        connection.commit()
+        cursor.close()
+
+
+def default_backend():
+    """Retorna o backend conforme settings.RESULTS_BACKEND ("sqlite" ou "mysql")."""
+    if settings.RESULTS_BACKEND == "mysql":
+        return MySQLBackend()
+    return SQLiteBackend()
+
+
+class SendTrace:
+    """
+    Registra as etapas de um envio (tempo e resultado de cada uma) no ResultStore.
+
+    Uso: ``with trace.step("open_chat"): ...``; ao final, finish(ok) grava a etapa "total".
+    """
+
+    def __init__(self, store: "ResultStore", session_phone: str, target: str, kind: str) -> None:
+        self.store = store
+        self.fields = {**getattr(_context, "fields", {}), "session_phone": session_phone,
+                       "target": target, "kind": kind}
+        self.started = time.monotonic()
+        self.error: Optional[BaseException] = None
+
+    @contextmanager
+    def step(self, name: str):
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.error = e
+            self.store.record(step=name, status="error", duration_ms=(time.monotonic() - started) * 1000,
+                              error_class=type(e).__name__, error=str(e), **self.fields)
+            raise
+        self.store.record(step=name, status="ok", duration_ms=(time.monotonic() - started) * 1000, **self.fields)
+
+    def reject(self, stage: str, reason: str) -> None:
+        """
+        Registra um envio recusado antes do envio em si (etapa "total" com status "rejected").
+
+        :param stage: Verificação que recusou o envio ("number", "suppressed", "media", "circuit", "login").
+        :param reason: Descrição do motivo.
+        """
+        self.store.record(step="total", status="rejected", duration_ms=(time.monotonic() - self.started) * 1000,
+                          error_class=stage, error=reason, **self.fields)
+
+    def finish(self, ok: bool) -> None:
+        error = self.error
+        self.store.record(step="total", status="ok" if ok else "error",
+                          duration_ms=(time.monotonic() - self.started) * 1000,
+                          error_class=type(error).__name__ if error else None,
+                          error=str(error) if error else None, **self.fields)
+
+
+class ResultStore:
+    """
+    Registro append-only dos resultados de envio.
+
+    record() apenas coloca o resultado numa fila em memória (nunca bloqueia a thread de envio); uma
+    thread de gravação reúne os resultados em lotes de até batch_size linhas, gravados numa única
+    transação a cada flush_interval segundos. Se a fila encher (banco indisponível), os resultados
+    excedentes são descartados e contados em dropped.
+    """
+
+    def __init__(self, backend=None, batch_size: int = settings.RESULTS_BATCH_SIZE,
+                 flush_interval: float = settings.RESULTS_FLUSH_INTERVAL,
+                 queue_limit: int = settings.RESULTS_QUEUE_LIMIT) -> None:
+        """
+        :param backend: SQLiteBackend ou MySQLBackend. Se None, usa default_backend().
+        :param batch_size: Máximo de linhas por transação.
+        :param flush_interval: Intervalo máximo (s) entre duas gravações.
+        :param queue_limit: Máximo de resultados aguardando gravação.
+        """
+        self.backend = backend or default_backend()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=queue_limit)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._insert = (f"INSERT INTO send_results ({', '.join(_COLUMNS)}) "
+                        f"VALUES ({', '.join([self.backend.placeholder] * len(_COLUMNS))})")
+
+    def record(self, **fields) -> None:
+        """
+        Enfileira um resultado para gravação.
+
+        :param fields: Valores das colunas (step e status são obrigatórios).
+        """
+        fields = {**getattr(_context, "fields", {}), **fields}
+        fields.setdefault("created_at", time.time())
+        try:
+            self._queue.put_nowait(tuple(fields.get(column) for column in _COLUMNS))
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def trace(self, session_phone: str, target: str, kind: str) -> SendTrace:
+        """Cria o registro das etapas de um envio."""
+        return SendTrace(self, session_phone, target, kind)
+
+    def _drain(self, first: tuple) -> List[tuple]:
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        connection = None
+        pending: List[tuple] = []
+        while True:
+            if not pending:
+                try:
+                    # Após stop(), apenas esvazia a fila, sem esperar novos resultados.
+                    pending = self._drain(self._queue.get(block=not self._stop.is_set(),
+                                                          timeout=self.flush_interval))
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+                    continue
+            try:
+                if connection is None:
+                    connection = self.backend.connect()
+                    self.backend.create_schema(connection)
+                cursor = connection.cursor()
+                cursor.executemany(self._insert, pending)
+                connection.commit()
+                cursor.close()
+                pending = []
+            except Exception as e:
+                log_error(f"Erro ao gravar {len(pending)} resultado(s): {e}", name="ResultStore")
+                connection = None
+                if self._stop.wait(self.flush_interval):
+                    break
+            if not self._stop.is_set():
+                self._stop.wait(self.flush_interval if self._queue.qsize() < self.batch_size else 0)
+        if connection is not None:
+            connection.close()
+
+    def start(self) -> None:
+        """Inicia a thread de gravação."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="cronos-results")
+        self._thread.start()
+        log_info(f"Registro de resultados iniciado ({type(self.backend).__name__}).", name="ResultStore")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Grava os resultados pendentes e encerra a thread de gravação."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """
+        Executa uma consulta de leitura numa conexão própria (não concorre com a gravação).
+
+        :param sql: Consulta com os parâmetros marcados por self.backend.placeholder ("?" ou "%s").
+        :param params: Valores dos parâmetros.
+        """
+        connection = self.backend.connect()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+            return rows
+        finally:
+            connection.close()
+
+    def summary(self, campaign: Optional[str] = None, session_phone: Optional[str] = None) -> Dict[str, int]:
+        """
+        Totais de envios por status (etapa "total"), filtrados por campanha ou sessão.
+
+        :return: Dicionário status -> quantidade (ex.: {"ok": 950, "error": 30, "rejected": 20}).
+        """
+        mark = self.backend.placeholder
+        sql = "SELECT status, COUNT(*) FROM send_results WHERE step = 'total'"
+        params: tuple = ()
+        if campaign is not None:
+            sql += f" AND campaign = {mark}"
+            params += (campaign,)
+        if session_phone is not None:
+            sql += f" AND session_phone = {mark}"
+            params += (session_phone,)
+        return dict(self.query(sql + " GROUP BY status", params))
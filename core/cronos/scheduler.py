@@ -0,0 +1,276 @@
+import bisect
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from core.configs import settings
+from core.cronos.jobs import JobDispatcher, JobQueueFull, LaneQueue, SendJob
+from core.utils.logger import log_info, log_error
+
+
+class RateBudget:
+    """
+    Orçamento de envio de uma sessão.
+
+    Combina um intervalo mínimo (com variação aleatória) entre dois envios e limites por
+    janela deslizante (ex.: por minuto, hora e dia), seguindo os limites da plataforma.
+    """
+
+    def __init__(self, limits: Optional[Dict[int, int]] = None,
+                 min_interval: float = settings.SESSION_MIN_INTERVAL,
+                 jitter: float = settings.SESSION_INTERVAL_JITTER) -> None:
+        """
+        :param limits: Janela (s) -> máximo de envios. Se None, usa settings.SESSION_RATE_LIMITS.
+        :param min_interval: Intervalo mínimo (s) entre envios.
+        :param jitter: Variação aleatória máxima (s) somada ao intervalo mínimo.
+        """
+        self.limits = dict(limits if limits is not None else settings.SESSION_RATE_LIMITS)
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._sent: List[float] = []
+        self._not_before = 0.0
+
+    def next_available(self, now: Optional[float] = None, pacing: bool = True) -> float:
+        """
+        Retorna o instante (time.monotonic) a partir do qual um novo envio cabe no orçamento.
+
+        :param pacing: Se False, ignora o intervalo mínimo entre envios (mantém os limites por janela).
+        """
+        now = time.monotonic() if now is None else now
+        ready = max(now, self._not_before) if pacing else now
+        for window, limit in self.limits.items():
+            start = bisect.bisect_right(self._sent, now - window)
+            if len(self._sent) - start >= limit:
+                # Libera quando o envio mais antigo da janela sair dela.
+                ready = max(ready, self._sent[len(self._sent) - limit] + window)
+        return ready
+
+    def consume(self, now: Optional[float] = None) -> None:
+        """Registra um envio iniciado agora."""
+        now = time.monotonic() if now is None else now
+        self._sent.append(now)
+        self._not_before = now + self.min_interval + random.uniform(0, self.jitter)
+        if self.limits:
+            horizon = now - max(self.limits)
+            del self._sent[:bisect.bisect_right(self._sent, horizon)]
+
+
+class _SessionSlot:
+    """Estado de uma sessão no agendador."""
+
+    def __init__(self, phone: str, weight: int, budget: RateBudget, queue_limit: int) -> None:
+        self.phone = phone
+        self.weight = weight
+        self.budget = budget
+        self.current_weight = 0
+        self.busy = False
+        self.jobs = LaneQueue(queue_limit)
+
+
+class SendScheduler(JobDispatcher):
+    """
+    Agendador justo de envios entre várias sessões.
+
+    Jobs com sessão definida ficam na fila dessa sessão; jobs sem sessão (session_phone=None)
+    ficam num pool compartilhado e são atribuídos à sessão escolhida. A cada rodada, entre as
+    sessões livres e dentro do orçamento (RateBudget), a escolhida é definida por rodízio
+    ponderado suave (smooth weighted round-robin), de modo que nenhuma sessão fique parada
+    nem sobrecarregada. Mantém a mesma interface do JobDispatcher (submit/get/queue_size/stop).
+
+    As filas são separadas por prioridade (LaneQueue): um job "high" é enviado assim que a sessão
+    termina o envio atual, sem esperar o intervalo mínimo do RateBudget (os limites por janela
+    continuam valendo) nem o fim da campanha em andamento.
+    """
+
+    def __init__(self, manager, queue_limit: int = settings.SESSION_QUEUE_LIMIT,
+                 history_limit: int = settings.JOB_HISTORY_LIMIT,
+                 pool_limit: int = settings.SCHEDULER_POOL_LIMIT,
+                 max_concurrency: int = settings.SCHEDULER_MAX_CONCURRENCY) -> None:
+        """
+        :param manager: Instância de CronosManager usada para executar os jobs.
+        :param queue_limit: Máximo de jobs pendentes por sessão.
+        :param history_limit: Máximo de jobs mantidos em memória para consulta.
+        :param pool_limit: Máximo de jobs sem sessão definida aguardando distribuição.
+        :param max_concurrency: Máximo de envios simultâneos.
+        """
+        super().__init__(manager, queue_limit=queue_limit, history_limit=history_limit)
+        self.pool_limit = pool_limit
+        self._slots: Dict[str, _SessionSlot] = {}
+        self._pool = LaneQueue(pool_limit)
+        self._cond = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="cronos-scheduler")
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="cronos-scheduler")
+        self._thread.start()
+
+    def add_session(self, phone: str, weight: int = 1, budget: Optional[RateBudget] = None) -> None:
+        """
+        Registra (ou atualiza) uma sessão disponível para envios.
+
+        :param phone: Número da sessão.
+        :param weight: Peso no rodízio (sessões de peso 2 recebem o dobro de jobs do pool).
+        :param budget: Orçamento de envio. Se None, usa um RateBudget com os limites padrão.
+        """
+        with self._cond:
+            slot = self._slots.get(phone)
+            if slot is None:
+                self._slots[phone] = _SessionSlot(phone, weight, budget or RateBudget(), self.queue_limit)
+            else:
+                slot.weight = weight
+                if budget:
+                    slot.budget = budget
+            self._cond.notify_all()
+
+    def remove_session(self, phone: str) -> None:
+        """
+        Remove a sessão do rodízio; os jobs presos a ela são marcados como falhos.
+        """
+        with self._cond:
+            slot = self._slots.pop(phone, None)
+        if slot:
+            for job in slot.jobs.drain():
+                job.fail(f"Sessão {phone} removida do agendador.")
+
+    def submit(self, job: SendJob) -> SendJob:
+        """
+        Enfileira o job sem bloquear.
+
+        :param job: Job a ser executado. Se job.session_phone for None, qualquer sessão pode enviá-lo.
+        :return: O próprio job.
+        :raises JobQueueFull: Se a fila da sessão (ou o pool compartilhado) estiver cheia.
+        """
+        if not self._running:
+            raise Exception("Agendador encerrado.")
+        with self._cond:
+            if job.session_phone is None:
+                try:
+                    self._pool.put_nowait(job)
+                except JobQueueFull:
+                    raise JobQueueFull(f"Pool compartilhado ({job.priority}) cheio ({self.pool_limit} jobs).")
+            else:
+                if job.session_phone not in self._slots:
+                    self._slots[job.session_phone] = _SessionSlot(job.session_phone, 1, RateBudget(),
+                                                                  self.queue_limit)
+                try:
+                    self._slots[job.session_phone].jobs.put_nowait(job)
+                except JobQueueFull:
+                    raise JobQueueFull(f"Fila {job.priority} da sessão {job.session_phone} cheia ({self.queue_limit} jobs).")
+            self._remember(job)
+            self._cond.notify_all()
+        return job
+
+    def queue_size(self, phone: Optional[str] = None) -> int:
+        """
+        Quantidade de jobs pendentes na fila da sessão (ou no pool compartilhado, se phone for None).
+        """
+        with self._cond:
+            if phone is None:
+                return len(self._pool)
+            slot = self._slots.get(phone)
+            return len(slot.jobs) if slot else 0
+
+    def _next_priority(self, slot: _SessionSlot) -> Optional[str]:
+        """Prioridade do próximo job da sessão, considerando a fila dela e o pool."""
+        own, pooled = slot.jobs.peek_priority(), self._pool.peek_priority()
+        if own is None or pooled is None:
+            return own or pooled
+        return min(own, pooled, key=settings.JOB_PRIORITIES.index)
+
+    def _ready_at(self, slot: _SessionSlot, now: float) -> float:
+        high = self._next_priority(slot) == settings.JOB_PRIORITIES[0]
+        return slot.budget.next_available(now, pacing=not high)
+
+    def _eligible(self, now: float) -> List[_SessionSlot]:
+        eligible = []
+        for slot in self._slots.values():
+            if slot.busy or not (slot.jobs or self._pool):
+                continue
+            if self._ready_at(slot, now) > now:
+                continue
+            if self.manager.health.breaker(slot.phone).blocked:
+                continue
+            eligible.append(slot)
+        return eligible
+
+    def _next_wakeup(self, now: float) -> Optional[float]:
+        """
+        Tempo (s) até a próxima sessão com jobs ficar elegível, ou None se nenhuma tem previsão.
+
+        Sessões com circuito aberto só contam a partir do fim do circuito (CircuitBreaker.retry_at);
+        as que estão em teste (half_open) voltam pelo notify do fim do envio ou pela espera periódica.
+        """
+        times = []
+        for slot in self._slots.values():
+            if slot.busy or not (slot.jobs or self._pool):
+                continue
+            ready = self._ready_at(slot, now)
+            breaker = self.manager.health.breaker(slot.phone)
+            if breaker.blocked:
+                retry = breaker.retry_at()
+                if retry is None:
+                    continue
+                ready = max(ready, retry)
+            times.append(ready)
+        return min(times) - now if times else None
+
+    def _pick(self, eligible: List[_SessionSlot]) -> _SessionSlot:
+        """Rodízio ponderado suave (o mesmo algoritmo usado pelo nginx)."""
+        # Sessões com job "high" pendente são atendidas antes das demais.
+        urgent = [slot for slot in eligible if self._next_priority(slot) == settings.JOB_PRIORITIES[0]]
+        eligible = urgent or eligible
+        total = sum(slot.weight for slot in eligible)
+        for slot in eligible:
+            slot.current_weight += slot.weight
+        chosen = max(eligible, key=lambda slot: slot.current_weight)
+        chosen.current_weight -= total
+        return chosen
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                eligible = self._eligible(now)
+                if not eligible:
+                    wakeup = self._next_wakeup(now)
+                    # Sessões com circuito aberto voltam a ser avaliadas periodicamente.
+                    timeout = min(wakeup, 5.0) if wakeup is not None else 5.0
+                    self._cond.wait(timeout=max(timeout, settings.SCHEDULER_MIN_WAIT))
+                    continue
+                slot = self._pick(eligible)
+                own, pooled = slot.jobs.peek_priority(), self._pool.peek_priority()
+                if own is not None and (pooled is None or own == self._next_priority(slot)):
+                    job = slot.jobs.pop_nowait()
+                else:
+                    job = self._pool.pop_nowait()
+                job.session_phone = slot.phone
+                slot.busy = True
+                slot.budget.consume(now)
+            self._executor.submit(self._execute, slot, job)
+
+    def _execute(self, slot: _SessionSlot, job: SendJob) -> None:
+        try:
+            job.run(self.manager)
+            if job.status == "failed":
+                log_error(f"Job {job.id} da sessão {slot.phone} falhou: {job.error}", name="SendScheduler")
+            else:
+                log_info(f"Job {job.id} da sessão {slot.phone} concluído.", name="SendScheduler")
+        finally:
+            with self._cond:
+                slot.busy = False
+                self._cond.notify_all()
+
+    def stop(self) -> None:
+        """
+        Para de aceitar e distribuir jobs; os pendentes são marcados como falhos.
+        """
+        with self._cond:
+            self._running = False
+            pending = self._pool.drain()
+            for slot in self._slots.values():
+                pending.extend(slot.jobs.drain())
+            self._cond.notify_all()
+        for job in pending:
+            job.fail("Agendador encerrado.")
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,310 @@
+import bisect
+import hashlib
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, List, Optional
+from core.configs import settings
+from core.utils.logger import log_info, log_error
+
+
+class HashRing:
+    """
+    Anel de hash consistente usado para distribuir os números de sessão entre os workers.
+
+    Cada worker ocupa vários nós virtuais no anel, de forma que a distribuição fique
+    equilibrada e que a troca da quantidade de workers mova apenas uma fração das sessões.
+    """
+
+    def __init__(self, nodes: Iterable[int], replicas: int = settings.HASH_RING_REPLICAS) -> None:
+        """
+        Monta o anel com os nós informados.
+
+        :param nodes: Identificadores dos nós (ex.: índices dos workers).
+        :param replicas: Quantidade de nós virtuais por nó real.
+        """
+        self.replicas = replicas
+        self._keys: List[int] = []
+        self._ring: Dict[int, int] = {}
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+
+    def add_node(self, node: int) -> None:
+        """
+        Adiciona um nó (e suas réplicas virtuais) ao anel.
+
+        :param node: Identificador do nó.
+        """
+        for i in range(self.replicas):
+            key = self._hash(f"{node}:{i}")
+            self._ring[key] = node
+            bisect.insort(self._keys, key)
+
+    def get_node(self, key: str) -> int:
+        """
+        Retorna o nó responsável pela chave informada.
+
+        :param key: Chave a ser localizada (ex.: número da sessão).
+        :return: Identificador do nó.
+        :raises Exception: Se o anel estiver vazio.
+        """
+        if not self._keys:
+            raise Exception("Anel de hash vazio.")
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._ring[self._keys[index]]
+
+
+def _worker_main(shard: int, inbox, outbox, sessions: Dict[str, bool]) -> None:
+    """
+    Laço principal de um processo worker.
+
+    Cada worker possui o seu próprio CronosManager e uma thread por sessão, de modo que
+    os envios de sessões diferentes não se bloqueiam e os de uma mesma sessão são serializados.
+
+    :param shard: Índice do worker.
+    :param inbox: Fila de comandos vindos do supervisor.
+    :param outbox: Fila de resultados enviados ao supervisor.
+    :param sessions: Sessões (número -> use_vpn) que devem ser reabertas ao iniciar o worker.
+    """
+    # Importado aqui para que o supervisor não precise carregar o Selenium.
+    from core.cronos.manager import CronosManager
+
+    manager = CronosManager()
+    session_queues: Dict[str, queue.Queue] = {}
+    session_threads: List[threading.Thread] = []
+
+    def _session_loop(phone: str, jobs: queue.Queue) -> None:
+        while True:
+            item = jobs.get()
+            if item is None:
+                return
+            job_id, method, kwargs = item
+            try:
+                if method == "get_session":
+                    _, status = manager.get_session(phone, use_vpn=kwargs.get("use_vpn", False))
+                    outbox.put((shard, job_id, True, status))
+                else:
+                    result = getattr(manager, method)(**kwargs)
+                    outbox.put((shard, job_id, True, result))
+            except Exception as e:
+                log_error(f"Erro no worker {shard} ao executar {method} para {phone}: {e}", name="CronosSupervisor")
+                outbox.put((shard, job_id, False, str(e)))
+
+    def _dispatch(phone: str, item: tuple) -> None:
+        if phone not in session_queues:
+            session_queues[phone] = queue.Queue()
+            thread = threading.Thread(target=_session_loop, args=(phone, session_queues[phone]), daemon=True)
+            thread.start()
+            session_threads.append(thread)
+        session_queues[phone].put(item)
+
+    log_info(f"Worker {shard} iniciado com {len(sessions)} sessão(ões).", name="CronosSupervisor")
+    for phone, use_vpn in sessions.items():
+        _dispatch(phone, (None, "get_session", {"use_vpn": use_vpn}))
+
+    while True:
+        command = inbox.get()
+        if command is None:
+            break
+        phone, job_id, method, kwargs = command
+        _dispatch(phone, (job_id, method, kwargs))
+
+    for jobs in session_queues.values():
+        jobs.put(None)
+    # Aguarda os envios em andamento terminarem antes de fechar os drivers.
+    deadline = time.monotonic() + settings.SUPERVISOR_DRAIN_TIMEOUT
+    for thread in session_threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    busy = sum(thread.is_alive() for thread in session_threads)
+    if busy:
+        log_error(f"Worker {shard}: {busy} sessão(ões) ainda ocupada(s) após {settings.SUPERVISOR_DRAIN_TIMEOUT}s; "
+                  f"encerrando mesmo assim.", name="CronosSupervisor")
+    manager.shutdown()
+    log_info(f"Worker {shard} encerrado.", name="CronosSupervisor")
+
+
+class CronosSupervisor:
+    """
+    Distribui as sessões do WhatsApp entre vários processos worker.
+
+    Os números de sessão são particionados por hash consistente; cada worker executa o seu
+    próprio CronosManager e recebe os envios por filas locais (IPC). Se um worker cair, ele é
+    reiniciado com as mesmas sessões e os envios que estavam em andamento falham com erro.
+    """
+
+    def __init__(self, num_workers: Optional[int] = None) -> None:
+        """
+        Inicializa o supervisor (os processos só são criados em start()).
+
+        :param num_workers: Quantidade de processos worker. Se None, usa settings.SUPERVISOR_WORKERS.
+        """
+        self.num_workers: int = num_workers or settings.SUPERVISOR_WORKERS
+        self.ring = HashRing(range(self.num_workers))
+        self._ctx = multiprocessing.get_context(settings.SUPERVISOR_START_METHOD)
+        self._results = self._ctx.Queue()
+        self._workers: Dict[int, Any] = {}
+        self._inboxes: Dict[int, Any] = {}
+        self._sessions: Dict[int, Dict[str, bool]] = {shard: {} for shard in range(self.num_workers)}
+        self._pending: Dict[int, Dict[int, Future]] = {shard: {} for shard in range(self.num_workers)}
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._running = False
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def _start_worker(self, shard: int) -> None:
+        """Cria (ou recria) o processo worker do shard informado."""
+        inbox = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(shard, inbox, self._results, dict(self._sessions[shard])),
+            name=f"cronos-worker-{shard}",
+            daemon=True,
+        )
+        process.start()
+        self._inboxes[shard] = inbox
+        self._workers[shard] = process
+
+    def start(self) -> None:
+        """
+        Inicia os processos worker e as threads de coleta de resultados e de monitoramento.
+        """
+        if self._running:
+            return
+        self._running = True
+        self._stop.clear()
+        for shard in range(self.num_workers):
+            self._start_worker(shard)
+        for target in (self._collect_results, self._monitor_workers):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        log_info(f"Supervisor iniciado com {self.num_workers} worker(s).", name="CronosSupervisor")
+
+    def _collect_results(self) -> None:
+        """Resolve os Futures pendentes à medida que os workers devolvem resultados."""
+        while self._running:
+            try:
+                shard, job_id, ok, payload = self._results.get(timeout=1)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if job_id is None:
+                continue
+            with self._lock:
+                future = self._pending[shard].pop(job_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(Exception(payload))
+
+    def _monitor_workers(self) -> None:
+        """Reinicia workers que caíram, reabrindo as suas sessões."""
+        while self._running and not self._stop.wait(settings.SUPERVISOR_MONITOR_INTERVAL):
+            for shard, process in list(self._workers.items()):
+                if process.is_alive() or not self._running:
+                    continue
+                log_error(f"Worker {shard} caiu (exitcode={process.exitcode}); reiniciando.", name="CronosSupervisor")
+                with self._lock:
+                    lost = self._pending[shard]
+                    self._pending[shard] = {}
+                    self._start_worker(shard)
+                for future in lost.values():
+                    future.set_exception(Exception(f"Worker {shard} caiu durante a execução."))
+
+    def shard_for(self, phone_number: str) -> int:
+        """
+        Retorna o índice do worker responsável pelo número de sessão.
+
+        :param phone_number: Número da sessão.
+        :return: Índice do worker.
+        """
+        return self.ring.get_node(phone_number)
+
+    def _submit(self, phone_number: str, method: str, kwargs: Dict[str, Any]) -> Future:
+        if not self._running:
+            raise Exception("Supervisor não iniciado.")
+        shard = self.shard_for(phone_number)
+        future: Future = Future()
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._pending[shard][job_id] = future
+            self._inboxes[shard].put((phone_number, job_id, method, kwargs))
+        return future
+
+    def open_session(self, phone_number: str, use_vpn: bool = False) -> Future:
+        """
+        Abre (ou consulta) a sessão no worker responsável pelo número.
+
+        A sessão fica registrada no shard e é reaberta automaticamente caso o worker reinicie.
+
+        :param phone_number: Número da sessão.
+        :param use_vpn: Indica se a VPN deve ser aplicada para esta sessão.
+        :return: Future com o dicionário de status do login (mesmo formato de CronosManager.get_session).
+        """
+        with self._lock:
+            self._sessions[self.shard_for(phone_number)][phone_number] = use_vpn
+        return self._submit(phone_number, "get_session", {"use_vpn": use_vpn})
+
+    def send_complete_message(self, phone_number: str, chat_id: str, text_message: str = "",
+                              image_path: str = None, audio_path: str = None, document_path: str = None,
+                              use_vpn: bool = False) -> Future:
+        """
+        Encaminha um CronosManager.send_complete_message ao worker da sessão.
+
+        :return: Future com o booleano retornado pelo worker.
+        """
+        return self._submit(phone_number, "send_complete_message", {
+            "phone_number": phone_number, "chat_id": chat_id, "text_message": text_message,
+            "image_path": image_path, "audio_path": audio_path, "document_path": document_path,
+            "use_vpn": use_vpn,
+        })
+
+    def send_complete_message_to_non_contact(self, session_phone_number: str, target_phone_number: str,
+                                             text_message: str = "", image_path: str = None,
+                                             audio_path: str = None, document_path: str = None,
+                                             use_vpn: bool = False) -> Future:
+        """
+        Encaminha um CronosManager.send_complete_message_to_non_contact ao worker da sessão.
+
+        :return: Future com o booleano retornado pelo worker.
+        """
+        return self._submit(session_phone_number, "send_complete_message_to_non_contact", {
+            "session_phone_number": session_phone_number, "target_phone_number": target_phone_number,
+            "text_message": text_message, "image_path": image_path, "audio_path": audio_path,
+            "document_path": document_path, "use_vpn": use_vpn,
+        })
+
+    def stop(self, timeout: float = 30) -> None:
+        """
+        Encerra os workers (fechando as suas sessões) e as threads internas.
+
+        :param timeout: Tempo máximo (s) de espera por cada worker antes de forçar o término.
+        """
+        if not self._running:
+            return
+        self._running = False
+        self._stop.set()
+        for inbox in self._inboxes.values():
+            inbox.put(None)
+        for shard, process in self._workers.items():
+            process.join(timeout)
+            if process.is_alive():
+                log_error(f"Worker {shard} não encerrou a tempo; forçando término.", name="CronosSupervisor")
+                process.terminate()
+        with self._lock:
+            for pending in self._pending.values():
+                for future in pending.values():
+                    future.set_exception(Exception("Supervisor encerrado."))
+                pending.clear()
+        log_info("Supervisor encerrado.", name="CronosSupervisor")
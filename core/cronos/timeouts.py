@@ -0,0 +1,153 @@
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+from core.configs import settings
+
+# Limites superiores (s) dos baldes do histograma: progressão geométrica de 50 ms a ~10 min.
+_BUCKETS: List[float] = [0.05 * 1.25 ** i for i in range(43)]
+
+
+class LatencyHistogram:
+    """
+    Histograma móvel de latências em baldes geométricos.
+
+    Mantém a janela atual e a anterior (window amostras cada): ao encher a atual, a anterior é
+    descartada, de modo que os percentis refletem as últimas window a 2 * window amostras.
+    """
+
+    def __init__(self, window: int = settings.TIMEOUT_WINDOW) -> None:
+        self.window = window
+        self._current = [0] * (len(_BUCKETS) + 1)
+        self._previous = [0] * (len(_BUCKETS) + 1)
+        self._current_count = 0
+
+    @property
+    def count(self) -> int:
+        return self._current_count + sum(self._previous)
+
+    def observe(self, seconds: float) -> None:
+        self._current[bisect.bisect_left(_BUCKETS, seconds)] += 1
+        self._current_count += 1
+        if self._current_count >= self.window:
+            self._previous, self._current = self._current, [0] * (len(_BUCKETS) + 1)
+            self._current_count = 0
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Retorna o limite superior do balde que contém o percentil, ou None sem amostras.
+
+        :param fraction: Percentil entre 0 e 1 (ex.: 0.99).
+        """
+        total = self.count
+        if not total:
+            return None
+        rank = fraction * total
+        seen = 0
+        for index, (current, previous) in enumerate(zip(self._current, self._previous)):
+            seen += current + previous
+            if seen >= rank:
+                return _BUCKETS[index] if index < len(_BUCKETS) else _BUCKETS[-1]
+        return _BUCKETS[-1]
+
+
+class AdaptiveTimeouts:
+    """
+    Timeouts por sessão e etapa, derivados das latências observadas.
+
+    timeout = percentil(settings.TIMEOUT_PERCENTILE) * (1 + margem) + margem fixa, limitado por
+    settings.TIMEOUT_BOUNDS. Enquanto a etapa tem menos de settings.TIMEOUT_MIN_SAMPLES amostras,
+    usa settings.TIMEOUT_DEFAULTS; etapas sem entrada própria (ex.: os nomes de seletor usados por
+    WhatsAppMessenger) usam os valores de "element". Esperas que estouram o timeout não entram no
+    histograma (o valor registrado seria o próprio timeout, que empurraria o percentil até o limite
+    máximo): são contadas à parte (record_timeout) e aparecem em snapshot().
+    """
+
+    def __init__(self, defaults: Optional[Dict[str, float]] = None,
+                 bounds: Optional[Dict[str, Tuple[float, float]]] = None,
+                 percentile: float = settings.TIMEOUT_PERCENTILE,
+                 margin: float = settings.TIMEOUT_MARGIN,
+                 margin_seconds: float = settings.TIMEOUT_MARGIN_SECONDS,
+                 min_samples: int = settings.TIMEOUT_MIN_SAMPLES) -> None:
+        self.defaults = defaults or settings.TIMEOUT_DEFAULTS
+        self.bounds = bounds or settings.TIMEOUT_BOUNDS
+        self.percentile = percentile
+        self.margin = margin
+        self.margin_seconds = margin_seconds
+        self.min_samples = min_samples
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._timeouts: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, phone_number: str, step: str, seconds: float) -> None:
+        """Registra a latência (s) de uma etapa da sessão."""
+        with self._lock:
+            histogram = self._histograms.get((phone_number, step))
+            if histogram is None:
+                histogram = self._histograms[(phone_number, step)] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def record_timeout(self, phone_number: str, step: str) -> None:
+        """Conta uma espera da etapa que estourou o timeout."""
+        with self._lock:
+            key = (phone_number, step)
+            self._timeouts[key] = self._timeouts.get(key, 0) + 1
+
+    def timeout(self, phone_number: str, step: str) -> float:
+        """Timeout (s) atual da etapa para a sessão."""
+        if step in self.defaults:
+            default = self.defaults[step]
+            low, high = self.bounds.get(step, (default, default))
+        else:
+            default = self.defaults.get("element", 10)
+            low, high = self.bounds.get(step, self.bounds.get("element", (default, default)))
+        with self._lock:
+            histogram = self._histograms.get((phone_number, step))
+            if histogram is None or histogram.count < self.min_samples:
+                return default
+            base = histogram.percentile(self.percentile)
+        return min(high, max(low, base * (1 + self.margin) + self.margin_seconds))
+
+    def for_session(self, phone_number: str) -> "SessionTimeouts":
+        return SessionTimeouts(self, phone_number)
+
+    def snapshot(self) -> Dict[str, Dict[str, dict]]:
+        """
+        Métricas por sessão e etapa: amostras, p50, p99, esperas estouradas e timeout atual.
+
+        :return: {"<sessão>": {"<etapa>": {"samples": int, "p50": s, "p99": s, "timeouts": int,
+                 "timeout": s}}}; p50 e p99 são None enquanto a etapa só tem esperas estouradas.
+        """
+        with self._lock:
+            keys = set(self._histograms) | set(self._timeouts)
+            items = []
+            for key in keys:
+                hist = self._histograms.get(key)
+                p50, p99 = (hist.percentile(0.5), hist.percentile(0.99)) if hist else (None, None)
+                items.append((key, hist.count if hist else 0, p50, p99, self._timeouts.get(key, 0)))
+        metrics: Dict[str, Dict[str, dict]] = {}
+        for (phone, step), count, p50, p99, timeouts in items:
+            metrics.setdefault(phone, {})[step] = {
+                "samples": count,
+                "p50": round(p50, 3) if p50 is not None else None,
+                "p99": round(p99, 3) if p99 is not None else None,
+                "timeouts": timeouts,
+                "timeout": round(self.timeout(phone, step), 3),
+            }
+        return metrics
+
+
+class SessionTimeouts:
+    """Visão de AdaptiveTimeouts restrita a uma sessão (usada por WhatsAppSession e WhatsAppMessenger)."""
+
+    def __init__(self, timeouts: AdaptiveTimeouts, phone_number: str) -> None:
+        self.timeouts = timeouts
+        self.phone_number = phone_number
+
+    def timeout(self, step: str) -> float:
+        return self.timeouts.timeout(self.phone_number, step)
+
+    def observe(self, step: str, seconds: float) -> None:
+        self.timeouts.observe(self.phone_number, step, seconds)
+
+    def record_timeout(self, step: str) -> None:
+        self.timeouts.record_timeout(self.phone_number, step)
@@ -0,0 +1,152 @@
+import threading
+import time
+from typing import Dict, Optional
+from core.configs import settings
+from core.utils.logger import log_info, log_error
+from core.utils.procfs import tree_rss
+
+
+class MemoryWatchdog:
+    """
+    Acompanha a memória de cada sessão do CronosManager e recicla os navegadores que crescem demais.
+
+    A cada medição são lidos a RSS da árvore de processos do navegador (via /proc, somente drivers
+    locais) e o heap JavaScript da página. Sessões acima do orçamento, ou com o navegador mais velho
+    que settings.SESSION_MAX_AGE, são recicladas: o navegador é encerrado e reaberto no mesmo perfil
+    quando nenhum envio está em andamento (com o lock da sessão). Se a soma das sessões passar de
+    settings.HOST_RSS_BUDGET, a maior delas também é reciclada.
+    """
+
+    def __init__(self, manager, interval: float = settings.MEMORY_CHECK_INTERVAL,
+                 rss_budget: Optional[int] = settings.SESSION_RSS_BUDGET,
+                 heap_budget: Optional[int] = settings.SESSION_JS_HEAP_BUDGET,
+                 max_age: Optional[float] = settings.SESSION_MAX_AGE,
+                 host_budget: Optional[int] = settings.HOST_RSS_BUDGET,
+                 concurrency: int = settings.RECYCLE_CONCURRENCY) -> None:
+        """
+        :param manager: CronosManager cujas sessões serão acompanhadas.
+        :param interval: Intervalo (s) entre medições.
+        :param rss_budget: RSS máxima (bytes) por sessão. None desativa o limite.
+        :param heap_budget: Heap JavaScript máximo (bytes) por sessão. None desativa o limite.
+        :param max_age: Idade máxima (s) do navegador. None desativa o limite.
+        :param host_budget: RSS máxima (bytes) somando todas as sessões. None desativa o limite.
+        :param concurrency: Máximo de sessões recicladas ao mesmo tempo.
+        """
+        self.manager = manager
+        self.interval = interval
+        self.rss_budget = rss_budget
+        self.heap_budget = heap_budget
+        self.max_age = max_age
+        self.host_budget = host_budget
+        self.samples: Dict[str, dict] = {}
+        self._recycling: set = set()
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self, session) -> dict:
+        """
+        Mede a sessão.
+
+        :param session: Instância de WhatsAppSession.
+        :return: {"rss": bytes | None, "js_heap": bytes | None, "age": s | None}.
+        """
+        pid = session.browser_pid
+        try:
+            heap = session.js_heap_size()
+        except Exception:
+            heap = None
+        return {"rss": tree_rss(pid) if pid else None, "js_heap": heap, "age": session.browser_age}
+
+    def over_budget(self, sample: dict) -> Optional[str]:
+        """Retorna o motivo da reciclagem, ou None se a sessão está dentro dos limites."""
+        if self.rss_budget and sample["rss"] and sample["rss"] > self.rss_budget:
+            return f"RSS {sample['rss'] // (1024 * 1024)} MB"
+        if self.heap_budget and sample["js_heap"] and sample["js_heap"] > self.heap_budget:
+            return f"heap JS {sample['js_heap'] // (1024 * 1024)} MB"
+        if self.max_age and sample["age"] and sample["age"] > self.max_age:
+            return f"idade {sample['age'] / 3600:.1f} h"
+        return None
+
+    def check(self) -> Dict[str, str]:
+        """
+        Mede todas as sessões e agenda a reciclagem das que estão fora dos limites.
+
+        :return: Dicionário número -> motivo, das sessões agendadas para reciclagem.
+        """
+        recycle: Dict[str, str] = {}
+        for phone, session in list(self.manager.sessions.items()):
+            if session.driver is None or phone in self._recycling:
+                continue
+            try:
+                sample = self.samples[phone] = self.sample(session)
+            except Exception as e:
+                log_error(f"Erro ao medir a memória da sessão {phone}: {e}", name="MemoryWatchdog")
+                continue
+            reason = self.over_budget(sample)
+            if reason:
+                recycle[phone] = reason
+        if self.host_budget:
+            sizes = {p: s["rss"] for p, s in self.samples.items()
+                     if s["rss"] and p in self.manager.sessions and p not in recycle}
+            total = sum(sizes.values())
+            if total > self.host_budget and sizes:
+                largest = max(sizes, key=sizes.get)
+                recycle[largest] = f"RSS do host {total // (1024 * 1024)} MB"
+        for phone, reason in recycle.items():
+            self.recycle(phone, reason)
+        return recycle
+
+    def recycle(self, phone_number: str, reason: str = "manual") -> None:
+        """
+        Recicla a sessão em segundo plano, entre dois envios.
+
+        :param phone_number: Número da sessão.
+        :param reason: Motivo registrado no log.
+        """
+        with self._lock:
+            if phone_number in self._recycling:
+                return
+            self._recycling.add(phone_number)
+        threading.Thread(target=self._recycle, args=(phone_number, reason), daemon=True,
+                         name=f"cronos-recycle-{phone_number}").start()
+
+    def _recycle(self, phone_number: str, reason: str) -> None:
+        try:
+            with self._slots, self.manager.session_lock(phone_number):
+                session = self.manager.sessions.get(phone_number)
+                if session is None:
+                    return
+                log_info(f"Reciclando o navegador da sessão {phone_number} ({reason}).", name="MemoryWatchdog")
+                started = time.monotonic()
+                session.close()
+                status = session.ensure_logged_in()
+                self.samples.pop(phone_number, None)
+                log_info(f"Sessão {phone_number} reciclada em {time.monotonic() - started:.1f}s "
+                         f"({status.get('status')}).", name="MemoryWatchdog")
+        except Exception as e:
+            log_error(f"Erro ao reciclar a sessão {phone_number}: {e}", name="MemoryWatchdog")
+            self.manager.health.record_failure(phone_number, f"falha na reciclagem: {e}")
+        finally:
+            with self._lock:
+                self._recycling.discard(phone_number)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                log_error(f"Erro no watchdog de memória: {e}", name="MemoryWatchdog")
+
+    def start(self) -> None:
+        """Inicia as medições periódicas."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="cronos-watchdog")
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Interrompe as medições periódicas."""
+        self._stop.set()
@@ -0,0 +1,74 @@
+import argparse
+import time
+import sys
+import os
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+from core.cronos.session import WhatsAppSession
+from core.utils.procfs import tree_rss, tree_cpu_seconds
+
+
+def main() -> None:
+    """
+    Benchmark do custo por sessão (memória e CPU) de cada perfil de navegador.
+
+    Funcionamento:
+      1. Abre as sessões informadas com o perfil escolhido ("default" ou "lean").
+      2. Durante o período de amostragem, mede a RSS e o tempo de CPU da árvore de processos
+         de cada navegador (via /proc, somente Linux).
+      3. Exibe, por sessão e no total, a RSS média/máxima e o uso médio de CPU.
+      4. Encerra as sessões ao final.
+    """
+    parser = argparse.ArgumentParser(description="Mede memória e CPU por sessão do navegador.")
+    parser.add_argument("--phones", nargs="+", required=True, help="Números das sessões a abrir")
+    parser.add_argument("--profile", choices=["default", "lean"], default="lean", help="Perfil do navegador")
+    parser.add_argument("--duration", type=int, default=60, help="Tempo de amostragem (s)")
+    parser.add_argument("--interval", type=float, default=2.0, help="Intervalo entre amostras (s)")
+    args = parser.parse_args()
+
+    sessions = []
+    for phone in args.phones:
+        session = WhatsAppSession(phone, browser_profile=args.profile)
+        status = session.ensure_logged_in()
+        print(f"[{phone}] sessão aberta ({status.get('status')}).")
+        if session.service_pid is None:
+            print(f"[{phone}] driver remoto; sessão ignorada na medição.")
+            session.close()
+            continue
+        sessions.append(session)
+
+    samples = {s.phone_number: [] for s in sessions}
+    cpu_start = {s.phone_number: tree_cpu_seconds(s.service_pid) for s in sessions}
+    started = time.monotonic()
+    while time.monotonic() - started < args.duration:
+        for s in sessions:
+            samples[s.phone_number].append(tree_rss(s.service_pid))
+        time.sleep(args.interval)
+    elapsed = time.monotonic() - started
+
+    total_rss = 0.0
+    total_cpu = 0.0
+    print(f"\nPerfil: {args.profile} | {len(sessions)} sessão(ões) | {elapsed:.0f}s de amostragem")
+    for s in sessions:
+        rss = samples[s.phone_number]
+        avg_mb = sum(rss) / len(rss) / (1024 * 1024) if rss else 0.0
+        max_mb = max(rss) / (1024 * 1024) if rss else 0.0
+        cpu = (tree_cpu_seconds(s.service_pid) - cpu_start[s.phone_number]) / elapsed * 100
+        total_rss += avg_mb
+        total_cpu += cpu
+        print(f"[{s.phone_number}] RSS média {avg_mb:.0f} MB | máxima {max_mb:.0f} MB | CPU média {cpu:.1f}%")
+    if sessions:
+        print(f"Média por sessão: {total_rss / len(sessions):.0f} MB | {total_cpu / len(sessions):.1f}% CPU")
+
+    for s in sessions:
+        s.close()
+
+
+if __name__ == "__main__":
+    main()
+
+#python3 tests/bench_footprint.py \
+#  --phones "5532988967108" "5532988765432" \
+#  --profile lean \
+#  --duration 120
@@ -0,0 +1,108 @@
+import pytest
+from core.configs import settings
+
+pytest.importorskip("httpx")
+from fastapi import WebSocketDisconnect  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from core.api.server import create_app  # noqa: E402
+
+TOKEN = "segredo"
+AUTH = {"Authorization": f"Bearer {TOKEN}"}
+
+
+class FakeDispatcher:
+    """Dispatcher que apenas guarda os jobs recebidos."""
+
+    def __init__(self):
+        self.jobs = {}
+
+    def submit(self, job):
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def queue_size(self, phone):
+        return 0
+
+    def stop(self):
+        pass
+
+
+class FakeManager:
+    sessions = {}
+
+    def __init__(self):
+        self.shut_down = False
+
+    def timeout_metrics(self):
+        return {}
+
+    def shutdown(self):
+        self.shut_down = True
+        return {}
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", tmp_path)
+    dispatcher = FakeDispatcher()
+    return TestClient(create_app(FakeManager(), dispatcher, token=TOKEN)), dispatcher
+
+
+def test_requires_token(monkeypatch):
+    monkeypatch.setattr(settings, "API_TOKEN", None)
+    with pytest.raises(Exception):
+        create_app(FakeManager(), FakeDispatcher())
+
+
+def test_lifespan_shuts_manager_down(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", tmp_path)
+    manager = FakeManager()
+    with TestClient(create_app(manager, FakeDispatcher(), token=TOKEN)):
+        assert not manager.shut_down
+    assert manager.shut_down
+
+
+def test_rejects_missing_or_wrong_token(api):
+    client, _ = api
+    assert client.get("/sessions/5511").status_code == 401
+    assert client.get("/sessions/5511", headers={"Authorization": "Bearer errado"}).status_code == 401
+    assert client.get("/sessions/5511", headers=AUTH).status_code == 200
+
+
+def test_websocket_requires_token(api):
+    client, _ = api
+    with pytest.raises(WebSocketDisconnect) as denied:
+        with client.websocket_connect("/jobs/x/ws"):
+            pass
+    assert denied.value.code == 1008
+
+
+def test_upload_then_send_uses_stored_file(api, tmp_path):
+    client, dispatcher = api
+    response = client.put("/uploads/foto.JPG", content=b"conteudo", headers=AUTH)
+    assert response.status_code == 201
+    name = response.json()["name"]
+    assert name.endswith(".jpg") and (tmp_path / name).read_bytes() == b"conteudo"
+    response = client.post("/sessions/5511/messages", json={"target": "x", "image_path": name}, headers=AUTH)
+    assert response.status_code == 202
+    job = dispatcher.get(response.json()["job_id"])
+    assert job.image_path == str((tmp_path / name).resolve())
+
+
+def test_oversized_upload_is_rejected_and_discarded(api, tmp_path, monkeypatch):
+    client, _ = api
+    monkeypatch.setattr(settings, "API_UPLOAD_MAX_BYTES", 4)
+    response = client.put("/uploads/grande.pdf", content=b"conteudo", headers=AUTH)
+    assert response.status_code == 413
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize("path", ["/etc/passwd", "../.env", "sub/../../x", "inexistente.pdf"])
+def test_rejects_paths_outside_upload_dir(api, path):
+    client, dispatcher = api
+    response = client.post("/sessions/5511/messages", json={"target": "x", "document_path": path}, headers=AUTH)
+    assert response.status_code == 422
+    assert not dispatcher.jobs
@@ -0,0 +1,146 @@
+import json
+import time
+import pytest
+from core.cronos.cluster import ClusterNode, get_job_result, session_owner, submit_job
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class FakeManager:
+    """CronosManager mínimo: registra as sessões abertas e os envios executados."""
+
+    def __init__(self, open_time=0.0):
+        self.open_time = open_time
+        self.opened = []
+        self.closed = []
+        self.sent = []
+
+    def get_session(self, phone_number, use_vpn=False):
+        time.sleep(self.open_time)
+        self.opened.append(phone_number)
+        return None, {"status": "logged_in"}
+
+    def close_session(self, phone_number):
+        self.closed.append(phone_number)
+
+    def destroy_session(self, phone_number):
+        raise AssertionError("destroy_session não pode ser chamado por um job do cluster")
+
+    def send_complete_message(self, **kwargs):
+        self.sent.append(kwargs)
+        return True
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis()
+
+
+def _node(client, node_id, **kwargs):
+    return ClusterNode(manager=FakeManager(), client=client, node_id=node_id, lease_ttl=5, **kwargs)
+
+
+def test_claim_is_exclusive(client):
+    a, b = _node(client, "a"), _node(client, "b")
+    assert a.claim_session("5511")
+    assert not b.claim_session("5511")
+    assert session_owner(client, "5511") == "a"
+    assert b.manager.opened == []
+
+
+def test_release_lets_other_node_claim(client):
+    a, b = _node(client, "a"), _node(client, "b")
+    a.claim_session("5511")
+    a.release_session("5511")
+    assert session_owner(client, "5511") is None
+    assert b.claim_session("5511")
+
+
+def test_reclaim_refreshes_redis_ttl(client):
+    a = _node(client, "a")
+    client.set("cronos:lease:5511", "a", px=500)
+    assert a.claim_session("5511")
+    assert client.pttl("cronos:lease:5511") > 4000
+
+
+def test_capacity_limit(client):
+    a = _node(client, "a", max_sessions=1)
+    assert a.claim_available(["1", "2", "3"]) == ["1"]
+
+
+def test_job_runs_on_owner_and_leaves_processing_list(client):
+    a = _node(client, "a")
+    a.claim_session("5511")
+    a.start()
+    try:
+        job_id = submit_job(client, "5511", "send_complete_message", {"phone_number": "5511", "chat_id": "x"})
+        deadline = time.monotonic() + 5
+        while get_job_result(client, job_id) is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert get_job_result(client, job_id) == {"ok": True, "result": True, "node": "a"}
+        assert client.llen("cronos:processing:5511:a") == 0
+    finally:
+        a.stop()
+
+
+def test_orphaned_job_is_requeued_for_new_owner(client):
+    # Nó "a" caiu depois de retirar o job da fila: o job ficou na sua lista de processamento.
+    payload = json.dumps({"id": "j1", "method": "send_complete_message", "kwargs": {}})
+    client.rpush("cronos:processing:5511:a", payload)
+    client.rpush("cronos:jobs:5511", json.dumps({"id": "j2", "method": "send_complete_message", "kwargs": {}}))
+    b = _node(client, "b")
+    assert b.claim_session("5511")
+    queued = [json.loads(item)["id"] for item in client.lrange("cronos:jobs:5511", 0, -1)]
+    assert queued == ["j1", "j2"]
+    assert client.llen("cronos:processing:5511:a") == 0
+
+
+def test_submit_rejects_methods_outside_whitelist(client):
+    with pytest.raises(ValueError):
+        submit_job(client, "5511", "destroy_session", {"phone_number": "5511"})
+    assert client.llen("cronos:jobs:5511") == 0
+
+
+def test_execute_rejects_payload_written_directly(client):
+    a = _node(client, "a")
+    payload = json.dumps({"id": "j1", "method": "destroy_session", "kwargs": {"phone_number": "5511"}})
+    client.rpush("cronos:processing:5511:a", payload)
+    a._execute(payload, "cronos:processing:5511:a")
+    result = get_job_result(client, "j1")
+    assert result["ok"] is False and "não permitido" in result["error"]
+    assert client.llen("cronos:processing:5511:a") == 0
+
+
+def test_job_started_by_previous_owner_is_not_replayed(client):
+    # Nó "a" perdeu o lease no meio do envio: o job ficou na sua lista de processamento, já iniciado.
+    payload = json.dumps({"id": "j1", "method": "send_complete_message", "kwargs": {"chat_id": "x"}})
+    client.rpush("cronos:processing:5511:a", payload)
+    client.set("cronos:started:j1", "a")
+    b = _node(client, "b")
+    assert b.claim_session("5511")
+    b._execute(client.lpop("cronos:jobs:5511").decode())
+    assert b.manager.sent == []
+    result = get_job_result(client, "j1")
+    assert result["ok"] is False and "não é repetido" in result["error"]
+
+
+def test_replayed_job_keeps_the_original_result(client):
+    a = _node(client, "a")
+    payload = json.dumps({"id": "j1", "method": "send_complete_message", "kwargs": {"chat_id": "x"}})
+    a._execute(payload)
+    a._execute(payload)
+    assert len(a.manager.sent) == 1
+    assert get_job_result(client, "j1") == {"ok": True, "result": True, "node": "a"}
+
+
+def test_lease_is_renewed_while_session_opens(client):
+    # Abrir a sessão leva mais que o TTL do lease, e o nó ainda não foi iniciado (start()).
+    a = ClusterNode(manager=FakeManager(open_time=1.5), client=client, node_id="a", lease_ttl=0.6)
+    b = _node(client, "b")
+    try:
+        assert a.claim_session("5511")
+        assert a.owns("5511")
+        assert session_owner(client, "5511") == "a"
+        assert not b.claim_session("5511")
+    finally:
+        a.stop()
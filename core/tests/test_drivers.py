@@ -0,0 +1,89 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from core.cronos.drivers import RemoteChromeFactory, UploadCache
+
+
+class FakeRemoteDriver:
+    """Driver remoto mínimo: conta os uploads recebidos pelo comando UPLOAD_FILE."""
+
+    _is_remote = True
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.uploads = 0
+
+    def execute(self, command, params):
+        self.uploads += 1
+        return {"value": f"/tmp/{self.session_id}/upload-{self.uploads}/file"}
+
+
+@pytest.fixture
+def attachment(tmp_path):
+    path = tmp_path / "anexo.pdf"
+    path.write_bytes(b"%PDF conteudo")
+    return str(path)
+
+
+def test_upload_is_shared_by_sessions_on_the_same_node(attachment):
+    nodes = {"a": "http://node-1:5555", "b": "http://node-1:5555", "c": "http://node-2:5555"}
+    cache = UploadCache(lambda driver: nodes[driver.session_id])
+    a, b, c = FakeRemoteDriver("a"), FakeRemoteDriver("b"), FakeRemoteDriver("c")
+    first = cache.remote_path(a, attachment)
+    assert cache.remote_path(a, attachment) == first
+    assert cache.remote_path(b, attachment) == first
+    cache.remote_path(c, attachment)
+    assert (a.uploads, b.uploads, c.uploads) == (1, 0, 1)
+
+
+def test_forget_drops_paths_owned_by_the_closed_session(attachment):
+    cache = UploadCache(lambda driver: "http://node-1:5555")
+    a, b = FakeRemoteDriver("a"), FakeRemoteDriver("b")
+    cache.remote_path(a, attachment)
+    cache.forget(a)
+    cache.remote_path(b, attachment)
+    assert b.uploads == 1
+
+
+def test_default_resolver_is_per_session(attachment):
+    cache = UploadCache()
+    a, b = FakeRemoteDriver("a"), FakeRemoteDriver("b")
+    cache.remote_path(a, attachment)
+    cache.remote_path(b, attachment)
+    assert (a.uploads, b.uploads) == (1, 1)
+
+
+@pytest.fixture
+def grid():
+    """Servidor HTTP local que responde à consulta GraphQL do Grid."""
+    queries = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            queries.append((self.path, body["query"]))
+            found = '"s1"' in body["query"]
+            payload = {"data": {"session": {"nodeUri": "http://node-7:5555"} if found else None}}
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", queries
+    server.shutdown()
+
+
+def test_node_uri_from_grid_graphql(grid):
+    url, queries = grid
+    factory = RemoteChromeFactory(command_executor=f"{url}/wd/hub")
+    assert factory.node_uri(FakeRemoteDriver("s1")) == "http://node-7:5555"
+    assert factory.node_uri(FakeRemoteDriver("s2")) == "s2"  # Grid sem o nó: cache por sessão
+    assert queries[0][0] == "/graphql"
@@ -0,0 +1,97 @@
+import threading
+import time
+from core.cronos.health import CircuitBreaker, SessionHealthMonitor
+from core.cronos.locators import LocatorCache
+
+
+class FakeSession:
+    """Sessão cuja página responde após 'delay' segundos (ou nunca, com hang=True)."""
+
+    def __init__(self, phone_number, delay=0.1, hang=False):
+        self.phone_number = phone_number
+        self.driver = object()
+        self.locators = LocatorCache()
+        self.delay = delay
+        self.release = threading.Event()
+        self.hang = hang
+        self.calls = 0
+
+    def evaluate(self, script, *args):
+        self.calls += 1
+        if self.hang:
+            self.release.wait()
+        time.sleep(self.delay)
+        return {"ready": "complete", "logged_in": True, "qr": False, "disconnected": False}
+
+
+class FakeManager:
+    def __init__(self, sessions):
+        self.sessions = {s.phone_number: s for s in sessions}
+        self._locks = {}
+
+    def session_lock(self, phone):
+        return self._locks.setdefault(phone, threading.Lock())
+
+
+def test_concurrent_checks_do_not_starve_probes():
+    sessions = [FakeSession(str(i), delay=0.3) for i in range(8)]
+    monitor = SessionHealthMonitor(FakeManager(sessions), probe_timeout=2)
+    futures = [monitor._executor.submit(monitor.check, s.phone_number) for s in sessions]
+    assert all(f.result(timeout=5)["healthy"] for f in futures)
+
+
+def test_hung_probe_is_reused_and_does_not_block_others():
+    stuck, healthy = FakeSession("stuck", hang=True), FakeSession("ok")
+    monitor = SessionHealthMonitor(FakeManager([stuck, healthy]), probe_timeout=0.2)
+    monitor.restart = lambda phone: None
+    assert monitor.check("stuck")["reason"] == "page_stuck"
+    assert monitor.check("stuck")["reason"] == "page_stuck"
+    assert stuck.calls == 1
+    assert monitor.check("ok")["healthy"]
+    stuck.release.set()
+
+
+def test_restart_waits_for_the_send_in_progress():
+    session = FakeSession("5511")
+    events = []
+    session.close = lambda: events.append("close")
+    session.ensure_logged_in = lambda: {"status": "logged_in"}
+    manager = FakeManager([session])
+    monitor = SessionHealthMonitor(manager)
+    with manager.session_lock("5511"):
+        monitor.restart("5511")
+        time.sleep(0.2)
+        assert events == []
+    deadline = time.monotonic() + 2
+    while not events and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert events == ["close"]
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow() and breaker.blocked
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == "half_open"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and not breaker.blocked
+
+
+def test_release_returns_the_half_open_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.release("login: qr_required")
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == "half_open"
+    breaker.release("login: qr_required")
+    assert breaker.state == "open" and breaker.reason == "login: qr_required"
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == "half_open"
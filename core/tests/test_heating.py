@@ -72,8 +72,8 @@ def main() -> None:
 
         time.sleep(random.randint(1, 5))
 
-    cronos1.close_all_sessions()
-    cronos2.close_all_sessions()
+    cronos1.shutdown()
+    cronos2.shutdown()
     log_info("Simulação de conversa encerrada.", name="SimConversa")
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+import threading
+import time
+import pytest
+from core.cronos.jobs import JobDispatcher, JobQueueFull, LaneQueue, SendJob
+
+
+def _job(priority, target="x"):
+    return SendJob("5511", kind="contact", target=target, priority=priority)
+
+
+def test_strict_mode_always_serves_high_first():
+    lanes = LaneQueue(10, mode="strict")
+    for i in range(3):
+        lanes.put_nowait(_job("bulk", f"b{i}"))
+    lanes.put_nowait(_job("high", "h0"))
+    assert [lanes.pop_nowait().target for _ in range(4)] == ["h0", "b0", "b1", "b2"]
+    assert lanes.pop_nowait() is None
+
+
+def test_weighted_mode_keeps_bulk_moving():
+    lanes = LaneQueue(20, mode="weighted", weights={"high": 3, "bulk": 1})
+    for i in range(8):
+        lanes.put_nowait(_job("high", f"h{i}"))
+        lanes.put_nowait(_job("bulk", f"b{i}"))
+    order = [lanes.pop_nowait().priority for _ in range(8)]
+    assert order == ["high", "high", "high", "bulk", "high", "high", "high", "bulk"]
+
+
+def test_each_lane_has_its_own_limit():
+    lanes = LaneQueue(2)
+    lanes.put_nowait(_job("bulk"))
+    lanes.put_nowait(_job("bulk"))
+    with pytest.raises(JobQueueFull):
+        lanes.put_nowait(_job("bulk"))
+    lanes.put_nowait(_job("high"))  # Campanha cheia não bloqueia o transacional
+    assert len(lanes) == 3
+
+
+def test_get_returns_none_after_close():
+    lanes = LaneQueue(1)
+    result = []
+    consumer = threading.Thread(target=lambda: result.append(lanes.get()))
+    consumer.start()
+    lanes.close()
+    consumer.join(2)
+    assert result == [None]
+
+
+class BlockingManager:
+    """Manager cujo primeiro envio fica bloqueado até o teste liberá-lo."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.order = []
+
+    def send_complete_message(self, phone_number, chat_id, text_message="", **kwargs):
+        self.release.wait(5)
+        self.order.append(chat_id)
+        return True
+
+
+def test_high_priority_job_goes_next_after_current_send():
+    manager = BlockingManager()
+    dispatcher = JobDispatcher(manager)
+    try:
+        first = dispatcher.submit(SendJob("5511", target="campanha-0"))
+        while first.status == "queued":
+            time.sleep(0.01)
+        bulk = [dispatcher.submit(SendJob("5511", target=f"campanha-{i}")) for i in range(1, 4)]
+        urgent = dispatcher.submit(SendJob("5511", target="otp", priority="high"))
+        manager.release.set()
+        assert all(job.wait(5) for job in bulk + [urgent])
+        assert manager.order[:2] == ["campanha-0", "otp"]
+    finally:
+        dispatcher.stop()
@@ -0,0 +1,71 @@
+import os
+import time
+import pytest
+from core.configs import settings
+from core.cronos.media import MediaCache, MediaError
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return MediaCache(cache_dir=tmp_path / "cache", max_bytes=10 ** 9, convert_audio=False)
+
+
+def _jpeg(path, size=(100, 50), orientation=None):
+    img = Image.new("RGB", size, "red")
+    exif = img.getexif()
+    if orientation:
+        exif[0x0112] = orientation
+    img.save(path, format="JPEG", exif=exif.tobytes())
+    return str(path)
+
+
+def test_compliant_image_is_passed_through(cache, tmp_path):
+    path = _jpeg(tmp_path / "ok.jpg")
+    assert cache.prepare(path, "image") == path
+    assert not list((tmp_path / "cache").rglob("*.jpg"))
+
+
+def test_exif_rotation_is_applied(cache, tmp_path):
+    path = _jpeg(tmp_path / "rotated.jpg", orientation=6)  # 90° no sentido horário
+    output = cache.prepare(path, "image")
+    assert output != path
+    with Image.open(output) as img:
+        assert img.size == (50, 100)
+        assert img.getexif().get(0x0112, 1) == 1
+
+
+def test_large_image_is_reduced(cache, tmp_path):
+    side = settings.MEDIA_IMAGE_MAX_SIDE * 2
+    output = cache.prepare(_jpeg(tmp_path / "big.jpg", size=(side, side // 2)), "image")
+    with Image.open(output) as img:
+        assert max(img.size) == settings.MEDIA_IMAGE_MAX_SIDE
+
+
+def test_animated_gif_is_left_alone(cache, tmp_path):
+    path = tmp_path / "anim.gif"
+    side = settings.MEDIA_IMAGE_MAX_SIDE + 10
+    frames = [Image.new("RGB", (side, 10), color) for color in ("red", "green", "blue")]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+    assert cache.prepare(str(path), "image") == str(path)
+
+
+def test_corrupt_image_leaves_no_temporary_files(cache, tmp_path):
+    path = tmp_path / "broken.jpg"
+    path.write_bytes(b"\xff\xd8\xff" + b"\x00" * 64)
+    with pytest.raises(MediaError):
+        cache.prepare(str(path), "image")
+    assert not [f for f in (tmp_path / "cache").rglob("*") if ".tmp" in f.name]
+
+
+def test_recently_used_files_are_not_evicted(tmp_path):
+    cache = MediaCache(cache_dir=tmp_path / "cache", max_bytes=1, convert_audio=False)
+    side = settings.MEDIA_IMAGE_MAX_SIDE * 2
+    first = cache.prepare(_jpeg(tmp_path / "a.jpg", size=(side, 10)), "image")
+    second = cache.prepare(_jpeg(tmp_path / "b.jpg", size=(side, 20)), "image")
+    assert os.path.exists(first) and os.path.exists(second)
+    old = time.time() - settings.MEDIA_CACHE_EVICT_GRACE - 1
+    os.utime(first, (old, old))
+    cache.prepare(_jpeg(tmp_path / "c.jpg", size=(side, 30)), "image")
+    assert not os.path.exists(first) and os.path.exists(second)
@@ -96,8 +96,8 @@ def main():
 
    
 
-    # Encerra todas as sessões ativas.
-    manager.close_all_sessions()
+    # Encerra todas as sessões ativas e grava os resultados pendentes.
+    manager.shutdown()
     logging.info("Teste concluído.")
 
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+import pytest
+from core.configs import settings
+from core.cronos.messaging import WhatsAppMessenger
+
+
+class FakeDriver:
+    """Driver mínimo: registra os scripts executados."""
+
+    def __init__(self, remote):
+        self._is_remote = remote
+        self.scripts = []
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        return True
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "foto.jpg"
+    path.write_bytes(b"\xff\xd8\xff" + b"0" * 1024)
+    return str(path)
+
+
+def _messenger(driver, monkeypatch):
+    messenger = WhatsAppMessenger(driver)
+    monkeypatch.setattr(messenger.locators, "find", lambda driver, name, *args, **fields: object())
+    monkeypatch.setattr(settings, "ATTACH_MODE", "direct")
+    return messenger
+
+
+def test_remote_driver_never_drops_files(image, monkeypatch):
+    driver = FakeDriver(remote=True)
+    messenger = _messenger(driver, monkeypatch)
+    assert messenger._inject_file(image, "IMAGE_INPUT") is None
+    assert messenger._attach_direct(image, "IMAGE_INPUT") is None  # Segue pelo menu (UploadCache)
+    assert driver.scripts == []
+
+
+def test_local_driver_drops_images_but_not_documents(image, monkeypatch):
+    driver = FakeDriver(remote=False)
+    messenger = _messenger(driver, monkeypatch)
+    assert messenger._inject_file(image, "DOCUMENT_INPUT") is None
+    assert driver.scripts == []
+    assert messenger._inject_file(image, "IMAGE_INPUT") == "drop"
+    assert len(driver.scripts) == 1
@@ -0,0 +1,97 @@
+import threading
+import pytest
+from core.cronos.recipients import NumberSet, SuppressionIndex, normalize_e164
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("+55 32 98896-7108", "+5532988967108"),
+    ("005532988967108", "+5532988967108"),
+    ("(32) 98896-7108", "+5532988967108"),
+    ("032988967108", "+5532988967108"),
+    ("+1 415 555 0100", "+14155550100"),
+    ("123", None),
+    ("", None),
+    (None, None),
+])
+def test_normalize_e164(raw, expected):
+    assert normalize_e164(raw, default_country="55") == expected
+
+
+def test_number_set_grows_and_deduplicates():
+    numbers = NumberSet(capacity=4)
+    phones = [f"+55329{n:08d}" for n in range(1000)]
+    assert all(numbers.add(phone) for phone in phones)
+    assert not numbers.add(phones[0])
+    assert len(numbers) == 1000
+    assert all(phone in numbers for phone in phones)
+    assert "+5511999999999" not in numbers
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "suppression.idx"
+    SuppressionIndex.build(["+5532988967108", "(32) 98896-7109", "invalido"], path, chunk_size=1)
+    index = SuppressionIndex(path)
+    yield index
+    index.close()
+
+
+def test_build_and_lookup(index):
+    assert len(index) == 2
+    assert "+5532988967108" in index
+    assert "+5532988967109" in index
+    assert "+5532988967100" not in index
+
+
+def test_add_survives_reload(index):
+    assert index.add("(32) 98896-7100")
+    assert not index.add("+5532988967100")
+    assert not index.add("+5532988967108")
+    index.reload()
+    assert "+5532988967100" in index
+
+
+def test_compact_merges_additions(index):
+    index.add("+5532988967100")
+    assert index.compact() == 3
+    assert not index.additions_path.exists()
+    assert not index.compacting_path.exists()
+    reopened = SuppressionIndex(index.path)
+    assert len(reopened) == 3 and "+5532988967100" in reopened
+    reopened.close()
+
+
+def test_compact_keeps_concurrent_additions(index, monkeypatch):
+    """Inclusões feitas durante a intercalação continuam valendo e vão para o novo arquivo."""
+    build = SuppressionIndex.build
+    index.add("+5532988967100")
+
+    def slow_build(*args, **kwargs):
+        thread = threading.Thread(target=index.add, args=("+5532988967101",))
+        thread.start()
+        thread.join()
+        assert "+5532988967101" in index
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(SuppressionIndex, "build", staticmethod(slow_build))
+    index.compact()
+    assert "+5532988967100" in index and "+5532988967101" in index
+    reopened = SuppressionIndex(index.path)
+    assert "+5532988967101" in reopened
+    reopened.close()
+
+
+def test_interrupted_compact_is_recovered(index):
+    index.compacting_path.write_text("+5532988967100\n", encoding="utf-8")
+    index.reload()
+    assert "+5532988967100" in index
+    index.add("+5532988967101")
+    assert index.compact() == 4
+    assert not index.compacting_path.exists()
+
+
+def test_old_view_stays_valid_after_compact(index):
+    keys = index._keys
+    index.add("+5532988967100")
+    index.compact()
+    assert list(keys) == [5532988967108, 5532988967109]
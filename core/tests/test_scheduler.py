@@ -0,0 +1,100 @@
+import threading
+import time
+import pytest
+from core.cronos.health import CircuitBreaker
+from core.cronos.jobs import SendJob
+from core.cronos.scheduler import RateBudget, SendScheduler
+
+
+class FakeHealth:
+    def __init__(self):
+        self.breakers = {}
+
+    def breaker(self, phone):
+        return self.breakers.setdefault(phone, CircuitBreaker())
+
+
+class FakeManager:
+    """Executa os jobs sem navegador, registrando a sessão que enviou cada um."""
+
+    def __init__(self, send_time=0.0):
+        self.health = FakeHealth()
+        self.send_time = send_time
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_complete_message(self, phone_number, chat_id, text_message="", **kwargs):
+        with self.lock:
+            self.sent.append((phone_number, chat_id))
+        time.sleep(self.send_time)
+        return True
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = SendScheduler(FakeManager())
+    yield scheduler
+    scheduler.stop()
+
+
+def _job(target, phone=None, priority="bulk"):
+    return SendJob(phone, kind="contact", target=target, text_message="oi", priority=priority)
+
+
+def test_rate_budget_min_interval_and_window():
+    budget = RateBudget(limits={60: 2}, min_interval=5, jitter=0)
+    assert budget.next_available(now=100) == 100
+    budget.consume(now=100)
+    assert budget.next_available(now=101) == 105
+    assert budget.next_available(now=101, pacing=False) == 101
+    budget.consume(now=105)
+    assert budget.next_available(now=106) == 160  # Janela de 60 s com 2 envios: libera quando o primeiro sair
+    assert budget.next_available(now=161) == 161
+
+
+def test_pick_is_smooth_weighted_round_robin(scheduler):
+    scheduler.add_session("a", weight=2, budget=RateBudget(limits={}, min_interval=0, jitter=0))
+    scheduler.add_session("b", weight=1, budget=RateBudget(limits={}, min_interval=0, jitter=0))
+    slots = [scheduler._slots["a"], scheduler._slots["b"]]
+    picks = [scheduler._pick(slots).phone for _ in range(6)]
+    assert picks == ["a", "b", "a", "a", "b", "a"]
+
+
+def test_pick_prefers_sessions_with_high_priority_jobs(scheduler):
+    scheduler.add_session("a", weight=5)
+    scheduler.add_session("b", weight=1)
+    with scheduler._cond:  # O laço do agendador não roda enquanto o lock estiver com o teste
+        a, b = scheduler._slots["a"], scheduler._slots["b"]
+        a.jobs.put_nowait(_job("x", "a"))
+        b.jobs.put_nowait(_job("y", "b", priority="high"))
+        assert scheduler._pick([a, b]).phone == "b"
+
+
+def test_pool_jobs_are_spread_across_sessions(scheduler):
+    # Envios instantâneos deixariam a mesma sessão livre de novo antes da outra ser escolhida.
+    scheduler.manager.send_time = 0.05
+    for phone in ("a", "b"):
+        scheduler.add_session(phone, budget=RateBudget(limits={}, min_interval=0, jitter=0))
+    jobs = [scheduler.submit(_job(f"t{i}")) for i in range(6)]
+    assert all(job.wait(5) for job in jobs)
+    senders = [phone for phone, _ in scheduler.manager.sent]
+    assert senders.count("a") == senders.count("b") == 3
+
+
+def test_open_circuit_does_not_busy_spin(scheduler):
+    scheduler.manager.health.breaker("a").trip("driver_dead")
+    scheduler.add_session("a", budget=RateBudget(limits={}, min_interval=0, jitter=0))
+    scheduler.submit(_job("x", "a"))
+    calls = []
+    original = scheduler._eligible
+
+    def counting(now):
+        calls.append(now)
+        return original(now)
+
+    scheduler._eligible = counting
+    with scheduler._cond:
+        scheduler._cond.notify_all()
+    time.sleep(0.5)
+    assert len(calls) < 20
+    assert scheduler._next_wakeup(time.monotonic()) > 60  # Acorda no fim do circuito (CIRCUIT_RESET_TIMEOUT)
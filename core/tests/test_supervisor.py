@@ -0,0 +1,33 @@
+from collections import Counter
+import pytest
+from core.cronos.supervisor import HashRing
+
+_PHONES = [f"55329{n:08d}" for n in range(4000)]
+
+
+def test_mapping_is_stable():
+    first, second = HashRing(range(4)), HashRing([3, 1, 0, 2])
+    assert all(first.get_node(phone) == second.get_node(phone) for phone in _PHONES)
+
+
+def test_distribution_is_balanced():
+    ring = HashRing(range(4))
+    counts = Counter(ring.get_node(phone) for phone in _PHONES)
+    assert set(counts) == {0, 1, 2, 3}
+    average = len(_PHONES) / 4
+    assert all(0.6 * average < count < 1.4 * average for count in counts.values())
+
+
+def test_adding_a_node_moves_only_its_share():
+    ring = HashRing(range(4))
+    before = {phone: ring.get_node(phone) for phone in _PHONES}
+    ring.add_node(4)
+    moved = [phone for phone in _PHONES if ring.get_node(phone) != before[phone]]
+    # Só as chaves assumidas pelo novo nó mudam de lugar (cerca de 1/5 do total).
+    assert all(ring.get_node(phone) == 4 for phone in moved)
+    assert 0.1 * len(_PHONES) < len(moved) < 0.3 * len(_PHONES)
+
+
+def test_empty_ring_raises():
+    with pytest.raises(Exception, match="vazio"):
+        HashRing([]).get_node("5532988967108")
@@ -0,0 +1,84 @@
+import pytest
+from core.cronos.timeouts import AdaptiveTimeouts, LatencyHistogram
+
+
+def _timeouts(**kwargs):
+    return AdaptiveTimeouts(defaults={"element": 10, "login": 50},
+                            bounds={"element": (3, 30), "login": (15, 120)},
+                            percentile=0.99, margin=0.5, margin_seconds=1.0, min_samples=5, **kwargs)
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram(window=1000)
+    assert histogram.percentile(0.5) is None
+    for _ in range(90):
+        histogram.observe(0.1)
+    for _ in range(10):
+        histogram.observe(2.0)
+    assert histogram.count == 100
+    assert 0.1 <= histogram.percentile(0.5) < 0.13
+    assert 2.0 <= histogram.percentile(0.99) < 2.5
+
+
+def test_histogram_window_forgets_old_samples():
+    histogram = LatencyHistogram(window=10)
+    for _ in range(10):
+        histogram.observe(5.0)
+    for _ in range(20):
+        histogram.observe(0.1)
+    assert histogram.count == 10
+    assert histogram.percentile(0.99) < 0.13
+
+
+def test_default_until_min_samples():
+    timeouts = _timeouts()
+    for _ in range(4):
+        timeouts.observe("a", "login", 1.0)
+    assert timeouts.timeout("a", "login") == 50
+    timeouts.observe("a", "login", 1.0)
+    assert timeouts.timeout("a", "login") == 15  # Limite mínimo
+
+
+def test_timeout_is_clamped_to_bounds():
+    timeouts = _timeouts()
+    for _ in range(5):
+        timeouts.observe("a", "element", 100.0)
+    assert timeouts.timeout("a", "element") == 30
+
+
+def test_unknown_step_uses_element_settings():
+    timeouts = _timeouts()
+    assert timeouts.timeout("a", "SEND_BUTTON") == 10
+    for _ in range(5):
+        timeouts.observe("a", "SEND_BUTTON", 0.1)
+    assert timeouts.timeout("a", "SEND_BUTTON") == 3
+
+
+def test_steps_and_sessions_are_independent():
+    timeouts = _timeouts()
+    for _ in range(5):
+        timeouts.observe("a", "SEND_BUTTON", 10.0)
+    assert timeouts.timeout("a", "SEND_BUTTON") > 10
+    assert timeouts.timeout("a", "CONTACT_ROW") == 10
+    assert timeouts.timeout("b", "SEND_BUTTON") == 10
+
+
+def test_timeouts_do_not_ratchet_the_percentile():
+    timeouts = _timeouts()
+    for _ in range(20):
+        timeouts.observe("a", "SEND_BUTTON", 1.0)
+    before = timeouts.timeout("a", "SEND_BUTTON")
+    session = timeouts.for_session("a")
+    for _ in range(50):
+        session.record_timeout("SEND_BUTTON")
+    assert timeouts.timeout("a", "SEND_BUTTON") == before
+    metrics = timeouts.snapshot()["a"]["SEND_BUTTON"]
+    assert metrics["samples"] == 20 and metrics["timeouts"] == 50
+    assert metrics["timeout"] == pytest.approx(before, abs=1e-3)
+
+
+def test_snapshot_lists_steps_with_only_timeouts():
+    timeouts = _timeouts()
+    timeouts.record_timeout("a", "CONTACT_ROW")
+    assert timeouts.snapshot() == {"a": {"CONTACT_ROW": {"samples": 0, "p50": None, "p99": None,
+                                                         "timeouts": 1, "timeout": 10}}}
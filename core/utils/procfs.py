@@ -0,0 +1,108 @@
+import os
+from typing import Dict, List, Optional
+
+# Leitura de uso de memória/CPU de árvores de processos via /proc (somente Linux).
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _read_stat(pid: int) -> List[str]:
+    """Retorna os campos de /proc/<pid>/stat a partir do estado (o nome pode conter espaços)."""
+    with open(f"/proc/{pid}/stat", "r") as f:
+        data = f.read()
+    return data[data.rindex(")") + 2:].split()
+
+
+def _children_map() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            ppid = int(_read_stat(int(entry))[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def process_tree(pid: int) -> List[int]:
+    """
+    Retorna o pid informado e todos os seus descendentes.
+
+    :param pid: Processo raiz (ex.: chromedriver ou Chrome).
+    :return: Lista de pids ainda vivos da árvore.
+    """
+    if not os.path.exists(f"/proc/{pid}"):
+        return []
+    children = _children_map()
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def tree_rss(pid: int) -> int:
+    """
+    Soma a memória residente (RSS, em bytes) da árvore de processos.
+
+    :param pid: Processo raiz.
+    """
+    total = 0
+    for child in process_tree(pid):
+        try:
+            total += int(_read_stat(child)[21]) * _PAGE_SIZE
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+
+def tree_cpu_seconds(pid: int) -> float:
+    """
+    Soma o tempo de CPU (usuário + sistema, em segundos) consumido pela árvore de processos.
+
+    :param pid: Processo raiz.
+    """
+    total = 0
+    for child in process_tree(pid):
+        try:
+            fields = _read_stat(child)
+            total += int(fields[11]) + int(fields[12])
+        except (OSError, ValueError, IndexError):
+            continue
+    return total / _CLOCK_TICKS
+
+
+def process_cmdline(pid: int) -> List[str]:
+    """
+    Retorna os argumentos da linha de comando do processo.
+
+    :param pid: Processo.
+    :return: Lista de argumentos, vazia se o processo não existir.
+    """
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().decode("utf-8", "replace").split("\0")
+    except OSError:
+        return []
+
+
+def find_process(argument: str, exclude: str = "--type=") -> Optional[int]:
+    """
+    Procura o processo cuja linha de comando contém o argumento informado.
+
+    :param argument: Argumento a procurar (ex.: "--remote-debugging-port=9222").
+    :param exclude: Processos cuja linha de comando contém este texto são ignorados
+                    (por padrão, os subprocessos do Chrome: renderer, gpu etc.).
+    :return: Pid do processo, ou None se não encontrado.
+    """
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        args = process_cmdline(int(entry))
+        if argument in args and not any(exclude in arg for arg in args):
+            return int(entry)
+    return None